@@ -0,0 +1,137 @@
+"""
+Admission control for expensive routes - bounded concurrency with a short wait queue.
+When the queue is full requests are shed immediately (429); requests that wait
+longer than the queue timeout, or than their request deadline allows, get 503.
+Both carry Retry-After.
+
+Config (env):
+  RECOMMENDATIONS_MAX_IN_FLIGHT   concurrent LLM-backed requests (default 32)
+  RECOMMENDATIONS_MAX_QUEUE       requests allowed to wait for a slot (default 64)
+  RECOMMENDATIONS_QUEUE_TIMEOUT   seconds a request may wait (default 2.0)
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from backend.config import get_float_env, get_int_env
+from backend.llm.retry import current_deadline
+from backend.metrics import Counter, Gauge, Histogram
+
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Requests holding an admission slot.", ("route",))
+ADMISSION_QUEUE_DEPTH = Gauge("admission_queue_depth", "Requests waiting for an admission slot.", ("route",))
+ADMISSION_SHED = Counter("admission_shed_total", "Requests rejected by admission control.", ("route", "reason"))
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds", "Time spent waiting for an admission slot.", ("route",)
+)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed. Carries the HTTP status and Retry-After seconds."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Async concurrency limiter with a bounded FIFO wait queue."""
+
+    def __init__(self, route: str, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.route = route
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.retry_after = max(1, math.ceil(queue_timeout))
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _update_gauges(self) -> None:
+        ADMISSION_IN_FLIGHT.set(self._in_flight, route=self.route)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters), route=self.route)
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._update_gauges()
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the queue if needed. Raises AdmissionRejected when shed."""
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self._update_gauges()
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            ADMISSION_SHED.inc(route=self.route, reason="queue_full")
+            raise AdmissionRejected(429, "Too many requests in progress. Try again shortly.", self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        started = time.perf_counter()
+        deadline = current_deadline()
+        try:
+            await asyncio.wait_for(waiter, deadline.clamp(self.queue_timeout) if deadline else self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            ADMISSION_SHED.inc(route=self.route, reason="queue_timeout")
+            raise AdmissionRejected(503, "Server is busy. Try again shortly.", self.retry_after) from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # slot was handed over just before cancellation
+            else:
+                self._discard(waiter)
+            raise
+        finally:
+            ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - started, route=self.route)
+
+    def release(self) -> None:
+        """Give the slot to the next waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # slot transfers; in-flight count unchanged
+                self._update_gauges()
+                return
+        self._in_flight -= 1
+        self._update_gauges()
+
+    @asynccontextmanager
+    async def slot(self):
+        """async with controller.slot(): ... - holds a slot for the block."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_recommendations_controller: AdmissionController | None = None
+
+
+def get_recommendations_admission() -> AdmissionController:
+    """Process-wide controller for POST /recommendations, configured from env on first use."""
+    global _recommendations_controller
+    if _recommendations_controller is None:
+        _recommendations_controller = AdmissionController(
+            "/recommendations",
+            max_in_flight=get_int_env("RECOMMENDATIONS_MAX_IN_FLIGHT", 32),
+            max_queue=get_int_env("RECOMMENDATIONS_MAX_QUEUE", 64),
+            queue_timeout=get_float_env("RECOMMENDATIONS_QUEUE_TIMEOUT", 2.0),
+        )
+    return _recommendations_controller
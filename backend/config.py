@@ -24,3 +24,19 @@ def get_db_url() -> str:
     data_dir = Path(__file__).resolve().parent.parent / "data"
     data_dir.mkdir(exist_ok=True)
     return f"sqlite:///{data_dir / 'restaurants.db'}"
+
+
+def get_int_env(name: str, default: int) -> int:
+    """Read an integer env var, falling back to default when unset or invalid."""
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def get_float_env(name: str, default: float) -> float:
+    """Read a float env var, falling back to default when unset or invalid."""
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
@@ -2,10 +2,13 @@
 SQLAlchemy engine and session management.
 """
 
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 
 from backend.config import get_db_url
+from backend.metrics import DB_QUERY_DURATION
 from backend.models import Base
 
 _engine = None
@@ -20,9 +23,23 @@ def _get_engine():
         if "sqlite" in url:
             kwargs["connect_args"] = {"check_same_thread": False}
         _engine = create_engine(url, **kwargs)
+        _instrument(_engine)
     return _engine
 
 
+def _instrument(engine) -> None:
+    """Record statement execution time in db_query_duration_seconds."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_DURATION.observe(time.perf_counter() - context._query_started, operation=operation)
+
+
 def get_db() -> Session:
     """FastAPI dependency for database session."""
     global _SessionLocal
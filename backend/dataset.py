@@ -0,0 +1,71 @@
+"""
+Dataset version - a content hash of the ingested rows, written by ingest.
+Caches and precomputed results are keyed on it so a re-ingest with changed
+data invalidates them, while re-ingesting identical data does not. Row ids are
+part of the hash because stored reasons are keyed on restaurant id.
+"""
+
+import hashlib
+import json
+import time
+
+from sqlalchemy import select
+
+from backend.models import DatasetMeta
+
+VERSION_KEY = "version"
+UNKNOWN_VERSION = "unknown"
+_CHECK_INTERVAL = 30.0  # seconds between DB reads; picks up re-ingest by other processes
+
+_cached: tuple[float, str] | None = None
+
+_VERSION_FIELDS = (
+    "id", "name", "city", "location", "rating", "cost_for_two", "price_category", "has_online_delivery", "cuisines",
+)
+
+
+def compute_dataset_version(records: list[dict]) -> str:
+    """Stable hash of the normalized rows with their ids (order-sensitive, like ingest)."""
+    digest = hashlib.sha256()
+    for record in records:
+        row = [record.get(f) for f in _VERSION_FIELDS]
+        digest.update(json.dumps(row, default=str).encode())
+        digest.update(b"\n")
+    return digest.hexdigest()[:16]
+
+
+def save_dataset_version(session, version: str) -> None:
+    """Upsert the version row (caller commits)."""
+    session.merge(DatasetMeta(key=VERSION_KEY, value=version))
+    invalidate_dataset_version()
+
+
+def invalidate_dataset_version() -> None:
+    """Forget the in-process copy so the next read hits the DB."""
+    global _cached
+    _cached = None
+
+
+def read_dataset_version(session) -> str:
+    """Version stored in the session's database (no in-process caching)."""
+    value = session.execute(select(DatasetMeta.value).where(DatasetMeta.key == VERSION_KEY)).scalar()
+    return value or UNKNOWN_VERSION
+
+
+def get_dataset_version() -> str:
+    """Current dataset version (re-read from the DB at most every 30s)."""
+    global _cached
+    now = time.monotonic()
+    if _cached is not None and now - _cached[0] < _CHECK_INTERVAL:
+        return _cached[1]
+
+    from backend.database import _get_engine
+
+    try:
+        with _get_engine().connect() as conn:
+            value = conn.execute(select(DatasetMeta.value).where(DatasetMeta.key == VERSION_KEY)).scalar()
+    except Exception:
+        value = None
+    version = value or UNKNOWN_VERSION
+    _cached = (now, version)
+    return version
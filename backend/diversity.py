@@ -0,0 +1,74 @@
+"""
+Diversity-aware candidate selection (maximal marginal relevance).
+
+The top restaurants by rating are often near-duplicates: outlets of one chain,
+or the same cuisine in the same locality. select_diverse() picks a smaller set
+from a larger pool, trading each restaurant's relevance (its place in the pool)
+against its similarity to those already picked, so the LLM sees fewer but more
+distinct options and the prompt stays short.
+
+Config (env):
+  RECOMMENDATIONS_CANDIDATES_PER_PICK  candidates sent per requested pick (default 2; 0 = always 20)
+  RECOMMENDATIONS_CANDIDATE_POOL       restaurants considered before selection (default 60)
+  RECOMMENDATIONS_DIVERSITY_LAMBDA     1 = relevance only, lower = more diverse (default 0.7)
+"""
+
+import re
+
+from backend.config import get_float_env, get_int_env
+
+MAX_CANDIDATES = 20
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def candidate_count(limit: int | None) -> int:
+    """How many candidates to send to the LLM for limit picks."""
+    per_pick = get_float_env("RECOMMENDATIONS_CANDIDATES_PER_PICK", 2.0)
+    if limit is None or per_pick <= 0:
+        return MAX_CANDIDATES
+    return max(limit, min(MAX_CANDIDATES, round(limit * per_pick)))
+
+
+def pool_size(count: int) -> int:
+    return max(count, get_int_env("RECOMMENDATIONS_CANDIDATE_POOL", 60))
+
+
+def _cuisines(row: dict) -> frozenset[str]:
+    return frozenset(c.strip().lower() for c in (row.get("cuisines") or "").split(",") if c.strip())
+
+
+def _key(value: str | None) -> str:
+    return _NON_ALNUM.sub("", (value or "").lower())
+
+
+def similarity(a: dict, b: dict) -> float:
+    """0-1: same chain (name) counts as identical; otherwise shared cuisines and same locality."""
+    if _key(a.get("name")) and _key(a.get("name")) == _key(b.get("name")):
+        return 1.0
+    ca, cb = _cuisines(a), _cuisines(b)
+    cuisine = len(ca & cb) / len(ca | cb) if ca and cb else 0.0
+    location = 1.0 if _key(a.get("location")) and _key(a.get("location")) == _key(b.get("location")) else 0.0
+    return 0.6 * cuisine + 0.4 * location
+
+
+def select_diverse(rows: list[dict], count: int, lambda_: float | None = None) -> list[dict]:
+    """
+    count rows from rows (best first) by maximal marginal relevance; the result
+    keeps pool order so the most relevant candidates still get the lowest ids.
+    """
+    if lambda_ is None:
+        lambda_ = get_float_env("RECOMMENDATIONS_DIVERSITY_LAMBDA", 0.7)
+    if len(rows) <= count or lambda_ >= 1:
+        return rows[:count]
+    n = len(rows)
+    relevance = [1 - i / n for i in range(n)]
+    max_sim = [0.0] * n
+    chosen: list[int] = []
+    remaining = set(range(n))
+    while remaining and len(chosen) < count:
+        best = max(remaining, key=lambda i: (lambda_ * relevance[i] - (1 - lambda_) * max_sim[i], -i))
+        chosen.append(best)
+        remaining.discard(best)
+        for i in remaining:
+            max_sim[i] = max(max_sim[i], similarity(rows[i], rows[best]))
+    return [rows[i] for i in sorted(chosen)]
@@ -8,7 +8,9 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
 from backend.config import get_db_url
+from backend.dataset import compute_dataset_version, save_dataset_version
 from backend.models import Base, Restaurant
+from backend.retrieval import build_index, reset_index, save_index
 from scripts.transform import transform_row
 
 logger = logging.getLogger(__name__)
@@ -45,6 +47,7 @@ def run_ingest(db_url: str | None = None) -> tuple[int, int, int]:
     processed = 0
     skipped = 0
     records = []
+    rows = []
 
     for row in dataset:
         processed += 1
@@ -53,6 +56,7 @@ def run_ingest(db_url: str | None = None) -> tuple[int, int, int]:
             skipped += 1
             continue
         raw = transformed.pop("raw_data")
+        rows.append(transformed)
         records.append(Restaurant(**transformed, raw_data=raw))
 
     if not records:
@@ -62,7 +66,15 @@ def run_ingest(db_url: str | None = None) -> tuple[int, int, int]:
     Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
     with Session() as session:
         session.add_all(records)
+        session.flush()  # assign ids, which are part of the version
+        version = compute_dataset_version([dict(row, id=record.id) for row, record in zip(rows, records)])
+        save_dataset_version(session, version)
         session.commit()
+        try:
+            save_index(build_index(session, version))
+            reset_index()
+        except OSError as e:
+            logger.warning("Could not save retrieval index: %s (it will be built on first query)", e)
 
     logger.info("Rows processed: %d, skipped: %d, inserted: %d", processed, skipped, len(records))
     return processed, skipped, len(records)
@@ -0,0 +1,62 @@
+"""
+Append-only line files written off the caller's thread.
+
+Lines are queued and appended by one daemon thread per writer, so async code
+never blocks the event loop on disk I/O. flush() waits for pending lines and is
+registered at process exit; app shutdown and tests call it directly. Used by
+the LLM usage log and the jsonl trace exporter.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class LineWriter:
+    """Appends queued lines to their files from one daemon thread."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._queue: queue.Queue[tuple[str, str]] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def write(self, path: str | Path, line: str) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+        self._queue.put((str(path), line))
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines: dict[str, list[str]] = defaultdict(list)
+            for path, line in batch:
+                lines[path].append(line)
+            for path, items in lines.items():
+                try:
+                    Path(path).parent.mkdir(parents=True, exist_ok=True)
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write("".join(item + "\n" for item in items))
+                except OSError as e:
+                    logger.warning("%s: could not write %s: %s", self.name, path, e)
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued line is written."""
+        if self._thread is not None:
+            self._queue.join()
@@ -0,0 +1,159 @@
+"""
+Per-provider circuit breaker.
+
+closed     calls go through; outcomes fill a sliding window of recent calls
+open       calls are rejected at once (caller falls back) for LLM_BREAKER_OPEN_SECONDS
+half_open  one probe call is let through; success closes, failure re-opens
+
+allow() hands out a permit that the caller passes back to record() or
+release_probe(); only the holder of the current probe permit resolves it.
+
+The breaker opens when, over at least LLM_BREAKER_MIN_CALLS recent calls, the
+failure rate or the slow-call rate reaches its threshold.
+
+Config (env):
+  LLM_BREAKER                   false to disable (default true)
+  LLM_BREAKER_WINDOW            recent calls considered (default 20)
+  LLM_BREAKER_MIN_CALLS         calls needed before tripping (default 5)
+  LLM_BREAKER_FAILURE_RATE      0-1 failure ratio that opens (default 0.5)
+  LLM_BREAKER_SLOW_CALL_SECONDS calls slower than this count as slow (default 30)
+  LLM_BREAKER_SLOW_CALL_RATE    0-1 slow ratio that opens (default 0.8)
+  LLM_BREAKER_OPEN_SECONDS      time before a probe is allowed (default 30)
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+from backend.config import get_float_env, get_int_env
+from backend.metrics import Counter, Gauge
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+LLM_CIRCUIT_STATE = Gauge("llm_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open).", ("provider",))
+LLM_CIRCUIT_REJECTED = Counter("llm_circuit_rejected_total", "Calls skipped because the circuit was open.", ("provider",))
+LLM_CIRCUIT_TRANSITIONS = Counter("llm_circuit_transitions_total", "Circuit state changes.", ("provider", "state"))
+
+
+class CircuitBreaker:
+    """Failure-rate and slow-call-rate breaker for one provider."""
+
+    def __init__(
+        self,
+        provider: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30.0,
+    ):
+        self.provider = provider
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self._calls: deque[tuple[bool, bool]] = deque(maxlen=window)  # (failed, slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe: int | None = None  # permit of the probe in flight
+        self._probe_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        LLM_CIRCUIT_STATE.set(0, provider=provider)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state == CLOSED:
+            self._calls.clear()
+        LLM_CIRCUIT_STATE.set(_STATE_VALUES[state], provider=self.provider)
+        LLM_CIRCUIT_TRANSITIONS.inc(provider=self.provider, state=state)
+
+    def allow(self) -> int | None:
+        """
+        Permit for a call now, or None if rejected: 0 while closed, a fresh probe
+        permit in half-open (only one probe is allowed at a time).
+        """
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self._state == CLOSED:
+                return 0
+            if self._state == HALF_OPEN and self._probe is None:
+                self._probe = next(self._probe_ids)
+                return self._probe
+        LLM_CIRCUIT_REJECTED.inc(provider=self.provider)
+        return None
+
+    def record(self, success: bool, seconds: float, permit: int = 0) -> None:
+        """Report the outcome of an allowed call, with the permit allow() returned for it."""
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if permit and permit == self._probe:
+                    self._probe = None
+                    self._transition(CLOSED if success and not slow else OPEN)
+                return  # a call let through before the circuit opened does not decide the probe
+            self._calls.append((not success, slow))
+            if self._state == CLOSED and len(self._calls) >= self.min_calls:
+                n = len(self._calls)
+                failures = sum(1 for failed, _ in self._calls if failed)
+                slows = sum(1 for _, s in self._calls if s)
+                if failures / n >= self.failure_rate or slows / n >= self.slow_call_rate:
+                    self._transition(OPEN)
+
+    def release_probe(self, permit: int) -> None:
+        """Give back a probe that never completed (e.g. cancelled by hedging), if permit holds it."""
+        with self._lock:
+            if permit and permit == self._probe:
+                self._probe = None
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breakers_enabled() -> bool:
+    return os.getenv("LLM_BREAKER", "true").strip().lower() not in ("0", "false", "no", "off")
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Process-wide breaker for provider, configured from env on first use."""
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(provider)
+            if breaker is None:
+                breaker = _breakers[provider] = CircuitBreaker(
+                    provider,
+                    window=get_int_env("LLM_BREAKER_WINDOW", 20),
+                    min_calls=get_int_env("LLM_BREAKER_MIN_CALLS", 5),
+                    failure_rate=get_float_env("LLM_BREAKER_FAILURE_RATE", 0.5),
+                    slow_call_seconds=get_float_env("LLM_BREAKER_SLOW_CALL_SECONDS", 30.0),
+                    slow_call_rate=get_float_env("LLM_BREAKER_SLOW_CALL_RATE", 0.8),
+                    open_seconds=get_float_env("LLM_BREAKER_OPEN_SECONDS", 30.0),
+                )
+    return breaker
+
+
+def breaker_states() -> dict[str, str]:
+    """Current state of every provider breaker that has seen traffic."""
+    return {name: breaker.state for name, breaker in sorted(_breakers.items())}
+
+
+def reset_breakers() -> None:
+    """Drop all breakers (used by tests)."""
+    with _breakers_lock:
+        _breakers.clear()
@@ -0,0 +1,177 @@
+"""
+LLM response cache. Providers run at temperature 0 on prompts fully determined by
+the request, so identical prompts can reuse the parsed response.
+
+Keys hash (provider, model, dataset version, system prompt, user prompt); a new
+dataset version therefore never reads stale entries, and the SQLite tier drops
+rows from older versions when it first sees a new one.
+
+Tiers: in-memory LRU + TTL (per process), then optional SQLite file shared by
+all worker processes on the host.
+
+Config (env):
+  LLM_CACHE               false to disable (default true)
+  LLM_CACHE_TTL           seconds an entry stays valid (default 3600)
+  LLM_CACHE_MAX_ENTRIES   in-memory LRU size (default 1024)
+  LLM_CACHE_SQLITE_PATH   enable the persistent tier at this path (default off)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from backend.config import get_float_env, get_int_env
+from backend.metrics import Counter
+
+LLM_CACHE_REQUESTS = Counter("llm_cache_requests_total", "LLM response cache lookups.", ("tier", "result"))
+
+
+def cache_key(provider: str, model: str, dataset_version: str, system_prompt: str, user_prompt: str) -> str:
+    """sha256 over everything that determines the provider's answer."""
+    digest = hashlib.sha256()
+    for part in (provider, model, dataset_version, system_prompt, user_prompt):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class MemoryCache:
+    """Thread-safe LRU with per-entry TTL."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, dataset_version: str = "") -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """Persistent tier in a local SQLite file (WAL mode, safe across processes)."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str | Path, ttl: float = 3600.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._local = threading.local()
+        self._seen_version: str | None = None
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, dataset_version TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5.0)
+        return conn
+
+    def get(self, key: str) -> Any | None:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, dataset_version: str = "") -> None:
+        conn = self._conn()
+        if dataset_version and dataset_version != self._seen_version:
+            conn.execute("DELETE FROM llm_cache WHERE dataset_version != ?", (dataset_version,))
+            self._seen_version = dataset_version
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, dataset_version, expires_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), dataset_version, time.time() + self.ttl),
+        )
+        conn.commit()
+
+    def clear(self) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM llm_cache")
+        conn.commit()
+
+
+class ResponseCache:
+    """Looks up tiers in order; a hit in a slower tier is copied into the faster ones."""
+
+    def __init__(self, tiers: list):
+        self.tiers = tiers
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.tiers)
+
+    def get(self, key: str) -> Any | None:
+        for i, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                LLM_CACHE_REQUESTS.inc(tier=tier.name, result="hit")
+                for faster in self.tiers[:i]:
+                    faster.set(key, value)
+                return value
+            LLM_CACHE_REQUESTS.inc(tier=tier.name, result="miss")
+        return None
+
+    def set(self, key: str, value: Any, dataset_version: str = "") -> None:
+        for tier in self.tiers:
+            tier.set(key, value, dataset_version)
+
+    def clear(self) -> None:
+        for tier in self.tiers:
+            tier.clear()
+
+
+_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache configured from env on first use (no tiers when disabled)."""
+    global _cache
+    if _cache is None:
+        tiers = []
+        if os.getenv("LLM_CACHE", "true").strip().lower() not in ("0", "false", "no", "off"):
+            ttl = get_float_env("LLM_CACHE_TTL", 3600.0)
+            tiers.append(MemoryCache(get_int_env("LLM_CACHE_MAX_ENTRIES", 1024), ttl))
+            sqlite_path = os.getenv("LLM_CACHE_SQLITE_PATH", "").strip()
+            if sqlite_path:
+                tiers.append(SQLiteCache(sqlite_path, ttl))
+        _cache = ResponseCache(tiers)
+    return _cache
@@ -1,99 +1,154 @@
 """
 LLM client - Gemini (default) with Grok fallback; optional Ollama (local).
-Try Gemini first; if it fails and GROK_API_KEY is set, try Grok.
-Set LLM_PROVIDER=gemini (default), grok, or ollama.
+Set LLM_PROVIDER=gemini (default), grok, ollama, a comma-separated chain, or local
+(no network, see backend.llm.local). Providers are registered in backend.llm.providers,
+which orders each request's chain by observed latency and error rate.
+Every provider call has a sync and an async (httpx.AsyncClient) variant.
 """
 
+import asyncio
 import json
 import logging
 import os
-import re
+import time
 from typing import Any
 
 import httpx
 
-from backend.llm.prompts import build_system_prompt, build_user_prompt
+from backend.config import get_float_env, get_int_env
+from backend.dataset import get_dataset_version
+from backend.llm.batching import batching_enabled, get_batcher
+from backend.llm.breaker import breakers_enabled, get_breaker
+from backend.llm.cache import cache_key, get_response_cache
+from backend.llm.context_cache import cache_hint_headers
+from backend.llm.hedging import hedge_delay, hedged, hedging_enabled, latencies
+from backend.llm.http import get_async_client, get_client
+from backend.llm.local import LOCAL_RANKINGS, rank_locally
+from backend.llm.prompts import (
+    build_batch_user_prompt,
+    build_compact_user_prompt,
+    build_system_prompt,
+    build_user_prompt,
+    estimate_tokens,
+    max_output_tokens,
+)
+from backend.llm.providers import (
+    Provider,
+    get_provider,
+    load_providers,
+    primary_provider,
+    register_provider,
+    route,
+    routing_settings,
+)
+from backend.llm.providers import stats as provider_stats
+from backend.llm.reasons import get_reason_store
+from backend.llm.retry import (
+    LLM_DEADLINE_EXCEEDED,
+    LLM_RETRIES,
+    MIN_ATTEMPT_SECONDS,
+    RETRYABLE_STATUSES,
+    current_deadline,
+    get_retry_policy,
+    parse_retry_after,
+)
+from backend.llm.scheduler import get_scheduler, priority_scope
+from backend.llm.singleflight import AsyncSingleFlight, SingleFlight
+from backend.llm.streaming import ChatStream
+from backend.llm.structured import extract_json, json_mode, response_model_scope, response_schema
+from backend.llm.usage import parse_cached_tokens, parse_usage, record_usage
+from backend.metrics import LLM_FALLBACKS, LLM_PARSE_FAILURES, LLM_PROMPT_TOKENS, LLM_REQUEST_DURATION
+from backend.schemas import LLMBatchRanking
+from backend.tracing import span
 
 logger = logging.getLogger(__name__)
 
-# Default: Gemini, with Grok as fallback when Gemini fails
-LLM_PROVIDER_DEFAULT = "gemini"
-
-
 def _get_ollama_config() -> tuple[str, str]:
-    """Read Ollama (local) config. No API key needed."""
-    base_url = (os.getenv("OLLAMA_BASE_URL") or "http://localhost:11434/v1").rstrip("/")
-    model = (os.getenv("OLLAMA_MODEL") or "llama3.2").strip()
-    return base_url, model
+    """Ollama (local) config. No API key needed."""
+    provider = get_provider("ollama")
+    return provider.settings["base_url"], provider.model
 
 
-def _get_gemini_config() -> tuple[str, str]:
-    """Read Gemini config from environment."""
-    api_key = os.getenv("GEMINI_API_KEY", "")
-    model = os.getenv("GEMINI_MODEL", "gemini-flash-latest").strip()
-    return api_key, model
+def _get_gemini_config() -> tuple[str, str, str]:
+    """Gemini config, as parsed at load time."""
+    provider = get_provider("gemini")
+    return provider.settings["api_key"], provider.model, provider.settings["base_url"]
 
 
 def _get_grok_config() -> tuple[str, str, str]:
-    """Read Grok config from environment."""
-    api_key = os.getenv("GROK_API_KEY", "")
-    model = os.getenv("GROK_MODEL", "grok-4")
-    base_url = os.getenv("GROK_BASE_URL", "https://api.x.ai/v1").rstrip("/")
-    return api_key, model, base_url
-
-
-def _is_grok_configured() -> bool:
-    """True if Grok can be used (for fallback)."""
-    api_key = os.getenv("GROK_API_KEY", "").strip()
-    return bool(api_key and api_key != "dummy-key-replace-me")
+    """Grok config, as parsed at load time."""
+    provider = get_provider("grok")
+    return provider.settings["api_key"], provider.model, provider.settings["base_url"]
 
 
 def _extract_json(text: str) -> dict | None:
-    """Extract JSON object from response, handling markdown code blocks."""
-    text = text.strip()
-    match = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", text)
-    if match:
-        text = match.group(1).strip()
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        return None
-
-
-def _call_gemini(system_prompt: str, user_prompt: str) -> dict[str, Any]:
-    """Call Gemini generateContent API. Returns {'text': str} or {'error': str}."""
-    api_key, model = _get_gemini_config()
+    """Extract the JSON object from a response (fences, prose and truncated arrays tolerated)."""
+    return extract_json(text)
+
+
+def _status_error(label: str, e: httpx.HTTPStatusError) -> dict[str, str]:
+    """Turn a non-2xx provider response into an error dict."""
+    body = (e.response.text or "").strip()[:500]
+    logger.exception("%s API error: %s", label, body)
+    return {"error": f"LLM API error: {e.response.status_code}. {body}" if body else f"LLM API error: {e.response.status_code}"}
+
+
+def _gemini_json_config() -> dict[str, Any]:
+    """generationConfig fields for Gemini's native JSON mode (LLM_JSON_MODE)."""
+    mode = json_mode()
+    if mode == "off":
+        return {}
+    config = {"responseMimeType": "application/json"}
+    if mode == "schema":
+        config["responseSchema"] = response_schema("gemini")
+    return config
+
+
+def _chat_json_config() -> dict[str, Any]:
+    """response_format for OpenAI-compatible chat/completions (Grok, Ollama)."""
+    mode = json_mode()
+    if mode == "schema":
+        return {
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": "recommendations", "strict": True, "schema": response_schema("openai")},
+            }
+        }
+    if mode == "json":
+        return {"response_format": {"type": "json_object"}}
+    return {}
+
+
+def _gemini_request(system_prompt: str, user_prompt: str, max_tokens: int | None = None) -> dict[str, Any]:
+    """Build the Gemini generateContent request. Returns request kwargs or {'error': str}."""
+    api_key, model, base_url = _get_gemini_config()
     if not api_key:
         return {"error": "GEMINI_API_KEY is not configured. Set it in .env (get a key from https://aistudio.google.com/apikey)."}
     if api_key.strip().lower() in ("dummy", "your-api-key-here", ""):
         return {"error": "GEMINI_API_KEY is still the placeholder. Replace it in .env with a real key from https://aistudio.google.com/apikey."}
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-    headers = {
-        "x-goog-api-key": api_key,
-        "Content-Type": "application/json",
-    }
-    payload = {
-        "system_instruction": {"parts": [{"text": system_prompt}]},
-        "contents": [{"parts": [{"text": user_prompt}]}],
-        "generationConfig": {"temperature": 0},
+    return {
+        "provider": "gemini",
+        "model": model,
+        "url": f"{base_url}/models/{model}:generateContent",
+        "headers": {
+            "x-goog-api-key": api_key,
+            "Content-Type": "application/json",
+        },
+        "json": {
+            "system_instruction": {"parts": [{"text": system_prompt}]},
+            "contents": [{"parts": [{"text": user_prompt}]}],
+            "generationConfig": {
+                "temperature": 0,
+                **({"maxOutputTokens": max_tokens} if max_tokens else {}),
+                **_gemini_json_config(),
+            },
+        },
     }
 
-    verify_ssl = os.getenv("LLM_VERIFY_SSL", "true").strip().lower() not in ("0", "false", "no")
 
-    try:
-        with httpx.Client(timeout=60.0, verify=verify_ssl) as client:
-            response = client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-    except httpx.HTTPStatusError as e:
-        body = (e.response.text or "").strip()[:500]
-        logger.exception("Gemini API error: %s", body)
-        return {"error": f"LLM API error: {e.response.status_code}. {body}" if body else f"LLM API error: {e.response.status_code}"}
-    except httpx.RequestError as e:
-        logger.exception("Gemini request failed: %s", e)
-        return {"error": f"LLM request failed: {e!s}"}
-
-    data = response.json()
+def _parse_gemini_response(data: dict) -> dict[str, Any]:
+    """Pull the text out of a generateContent response."""
     candidates = data.get("candidates") or []
     if not candidates:
         return {"error": "Empty LLM response (no candidates)"}
@@ -106,124 +161,757 @@ def _call_gemini(system_prompt: str, user_prompt: str) -> dict[str, Any]:
     return {"text": text}
 
 
-def _call_ollama(system_prompt: str, user_prompt: str) -> dict[str, Any]:
-    """Call local Ollama (OpenAI-compatible). No API key. Returns {'text': str} or {'error': str}."""
+def _ollama_request(system_prompt: str, user_prompt: str, max_tokens: int | None = None) -> dict[str, Any]:
+    """Build the Ollama (OpenAI-compatible) chat/completions request."""
     base_url, model = _get_ollama_config()
-    url = f"{base_url}/chat/completions"
-    headers = {"Content-Type": "application/json"}
-    payload = {
+    settings = get_provider("ollama").settings
+    stream = settings["stream"] == "true"
+    return {
+        "provider": "ollama",
         "model": model,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        "temperature": 0,
-        "stream": False,
+        "url": f"{base_url}/chat/completions",
+        "headers": {"Content-Type": "application/json"},
+        "json": {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": 0,
+            "stream": stream,
+            **({"stream_options": {"include_usage": True}} if stream else {}),
+            **({"keep_alive": settings["keep_alive"]} if settings["keep_alive"] else {}),
+            **({"max_tokens": max_tokens} if max_tokens else {}),
+            **_chat_json_config(),
+        },
     }
 
-    try:
-        # Local LLM can be slower; use 120s timeout
-        with httpx.Client(timeout=120.0) as client:
-            response = client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-    except httpx.ConnectError as e:
-        logger.exception("Ollama connection failed: %s", e)
-        return {"error": "Cannot connect to Ollama. Start it with: ollama serve (and run 'ollama pull <model>')."}
-    except httpx.HTTPStatusError as e:
-        body = (e.response.text or "").strip()[:500]
-        logger.exception("Ollama API error: %s", body)
-        return {"error": f"LLM API error: {e.response.status_code}. {body}" if body else f"LLM API error: {e.response.status_code}"}
-    except httpx.RequestError as e:
-        logger.exception("Ollama request failed: %s", e)
-        return {"error": f"LLM request failed: {e!s}"}
-
-    data = response.json()
-    content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-    if not content:
-        return {"error": "Empty LLM response"}
-    return {"text": content}
 
-
-def _call_grok(system_prompt: str, user_prompt: str) -> dict[str, Any]:
-    """Call Grok (OpenAI-compatible) chat/completions. Returns {'text': str} or {'error': str}."""
+def _grok_request(system_prompt: str, user_prompt: str, max_tokens: int | None = None) -> dict[str, Any]:
+    """Build the Grok (OpenAI-compatible) chat/completions request. Returns request kwargs or {'error': str}."""
     api_key, model, base_url = _get_grok_config()
     if not api_key:
         return {"error": "GROK_API_KEY is not configured. Set it in .env (get a key from https://console.x.ai)."}
     if api_key.strip() == "dummy-key-replace-me":
         return {"error": "GROK_API_KEY is still the placeholder. Replace it in .env with a real key from https://console.x.ai."}
 
-    url = f"{base_url}/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
-    payload = {
+    return {
+        "provider": "grok",
         "model": model,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        "temperature": 0,
+        "url": f"{base_url}/chat/completions",
+        "headers": {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            **cache_hint_headers("grok", system_prompt),
+        },
+        "json": {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": 0,
+            **({"max_tokens": max_tokens} if max_tokens else {}),
+            **_chat_json_config(),
+        },
     }
 
-    verify_ssl = os.getenv("LLM_VERIFY_SSL", "true").strip().lower() not in ("0", "false", "no")
 
-    try:
-        with httpx.Client(timeout=60.0, verify=verify_ssl) as client:
-            response = client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-    except httpx.HTTPStatusError as e:
-        body = (e.response.text or "").strip()[:500]
-        logger.exception("Grok API error: %s", body)
-        return {"error": f"LLM API error: {e.response.status_code}. {body}" if body else f"LLM API error: {e.response.status_code}"}
-    except httpx.RequestError as e:
-        logger.exception("Grok request failed: %s", e)
-        return {"error": "LLM request failed"}
-
-    data = response.json()
+def _parse_chat_response(data: dict) -> dict[str, Any]:
+    """Pull the message content out of an OpenAI-compatible chat/completions response."""
     content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
     if not content:
         return {"error": "Empty LLM response"}
     return {"text": content}
 
 
-def rank_restaurants(
-    restaurants: list[dict],
-    city: str,
-    price_category: str,
-    limit: int,
+def _request_tokens(request: dict[str, Any]) -> int:
+    """Rough prompt + output tokens of a provider request, for the tokens-per-minute bucket."""
+    body = request["json"]
+    output = body.get("max_tokens") or body.get("generationConfig", {}).get("maxOutputTokens") or 0
+    return estimate_tokens(json.dumps(body)) + output
+
+
+def _circuit_open_error(label: str, request: dict[str, Any]) -> dict[str, str] | None:
+    """Error dict if the provider's breaker rejects the call, else None (the permit goes in request)."""
+    request["permit"] = 0
+    if breakers_enabled():
+        permit = get_breaker(request["provider"]).allow()
+        if permit is None:
+            return {"error": f"{label} is temporarily unavailable (circuit open)"}
+        request["permit"] = permit
+    return None
+
+
+def _release_probe(request: dict[str, Any]) -> None:
+    """Give back a half-open probe taken by _circuit_open_error when no outcome gets recorded."""
+    if breakers_enabled():
+        get_breaker(request["provider"]).release_probe(request.get("permit", 0))
+
+
+def _record_llm_call(
+    request: dict[str, Any], started: float, result: dict[str, Any], ttfb: float | None = None
+) -> None:
+    elapsed = time.perf_counter() - started
+    outcome = "error" if "error" in result else "ok"
+    LLM_REQUEST_DURATION.observe(elapsed, provider=request["provider"], model=request["model"], outcome=outcome)
+    prompt_tokens, completion_tokens = parse_usage(result.get("data"))
+    record_usage(
+        request["provider"], request["model"], outcome, elapsed, ttfb,
+        prompt_tokens, completion_tokens, parse_cached_tokens(result.get("data")),
+    )
+    if prompt_tokens is not None and completion_tokens is not None and "tokens" in request:
+        get_scheduler().settle(request["provider"], request["tokens"], prompt_tokens + completion_tokens)
+    if outcome == "ok":
+        latencies.record(request["provider"], elapsed)
+    provider_stats.record(request["provider"], elapsed, outcome == "ok")
+    if breakers_enabled():
+        get_breaker(request["provider"]).record(outcome == "ok", elapsed, request.get("permit", 0))
+
+
+def _streams(request: dict[str, Any], response: httpx.Response) -> bool:
+    """Whether response is a successful SSE stream we asked for (errors are read as plain bodies)."""
+    return bool(request["json"].get("stream")) and response.is_success
+
+
+def _stream_timeout_error(request: dict[str, Any]) -> dict[str, str]:
+    """Error for a stream still sending when the attempt's time (clamped to the deadline) ran out."""
+    if current_deadline() is not None and current_deadline().remaining() <= 0:
+        LLM_DEADLINE_EXCEEDED.inc(provider=request["provider"])
+        return {"error": "LLM request deadline exceeded"}
+    return {"error": "LLM request failed: stream timed out"}
+
+
+def _attempt(
+    label: str,
+    request: dict[str, Any],
+    timeout: float,
+    connect_error: str | None,
+    attempt: int,
+) -> tuple[dict[str, Any], bool, float | None]:
+    """One HTTP attempt. Returns (result, retryable, Retry-After seconds)."""
+    retryable, retry_after, ttfb = False, None, None
+    started = time.perf_counter()
+    with span("llm.call", provider=request["provider"], model=request["model"], attempt=attempt) as call_span:
+        try:
+            client = get_client(request["provider"])
+            with client.stream(
+                "POST", request["url"], headers=request["headers"], json=request["json"], timeout=timeout
+            ) as response:
+                ttfb = time.perf_counter() - started
+                if _streams(request, response):
+                    stream = ChatStream(request["provider"], request["model"], started)
+                    result = None
+                    for line in response.iter_lines():
+                        if time.perf_counter() - started > timeout:  # the read timeout is per chunk
+                            result, retryable = _stream_timeout_error(request), True
+                            break
+                        stream.feed(line)
+                    result = result or {"data": stream.data()}
+                else:
+                    response.read()
+            response.raise_for_status()
+            if not _streams(request, response):
+                result = {"data": response.json()}
+        except httpx.ConnectError as e:
+            logger.exception("%s connection failed: %s", label, e)
+            result = {"error": connect_error or f"LLM request failed: {e!s}"}
+            retryable = True
+        except httpx.HTTPStatusError as e:
+            result = _status_error(label, e)
+            retryable = e.response.status_code in RETRYABLE_STATUSES
+            retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+        except httpx.RequestError as e:
+            logger.exception("%s request failed: %s", label, e)
+            result = {"error": f"LLM request failed: {e!s}"}
+            retryable = isinstance(e, httpx.TransportError)
+        call_span.set_attribute("outcome", "error" if "error" in result else "ok")
+    _record_llm_call(request, started, result, ttfb)
+    return result, retryable, retry_after
+
+
+def _post_json(
+    label: str,
+    request: dict[str, Any],
+    timeout: float,
+    connect_error: str | None = None,
 ) -> dict[str, Any]:
     """
-    Call LLM: Gemini (default) with Grok fallback; or grok/ollama only.
-    Returns parsed recommendations or error dict.
+    POST a provider request on its pooled client. Returns {'data': dict} or {'error': str}.
+    Transient failures are retried with backoff; every attempt is clamped to the
+    request deadline (see backend.llm.retry). Skipped while the circuit breaker is open.
     """
-    if not restaurants:
-        return {"error": "No restaurants to rank"}
+    policy = get_retry_policy()
+    deadline = current_deadline()
+    request["tokens"] = _request_tokens(request)
+    attempt = 1
+    while True:
+        rejected = _circuit_open_error(label, request)
+        if rejected:
+            return rejected
+        recorded = False
+        try:
+            if not get_scheduler().acquire(request["provider"], request["tokens"]):
+                LLM_DEADLINE_EXCEEDED.inc(provider=request["provider"])
+                return {"error": f"{label} rate limit: no capacity left before the deadline"}
+            attempt_timeout = deadline.clamp(timeout) if deadline else timeout
+            if attempt_timeout < MIN_ATTEMPT_SECONDS:
+                LLM_DEADLINE_EXCEEDED.inc(provider=request["provider"])
+                return {"error": "LLM request deadline exceeded"}
+            result, retryable, retry_after = _attempt(
+                label, request, attempt_timeout, connect_error, attempt
+            )
+            recorded = True
+        finally:
+            if not recorded:  # queue timeout, deadline, cancelled hedge loser or unexpected error
+                _release_probe(request)
+        delay = policy.next_delay(attempt, retryable, retry_after, deadline)
+        if delay is None:
+            return result
+        LLM_RETRIES.inc(provider=request["provider"], reason="retry_after" if retry_after is not None else "backoff")
+        logger.info("%s attempt %d failed, retrying in %.2fs", label, attempt, delay)
+        time.sleep(delay)
+        attempt += 1
+
+
+async def _attempt_async(
+    label: str,
+    request: dict[str, Any],
+    timeout: float,
+    connect_error: str | None,
+    attempt: int,
+) -> tuple[dict[str, Any], bool, float | None]:
+    """Async variant of _attempt."""
+    retryable, retry_after, ttfb = False, None, None
+    started = time.perf_counter()
+    with span("llm.call", provider=request["provider"], model=request["model"], attempt=attempt) as call_span:
+        try:
+            client = get_async_client(request["provider"])
+            async with client.stream(
+                "POST", request["url"], headers=request["headers"], json=request["json"], timeout=timeout
+            ) as response:
+                ttfb = time.perf_counter() - started
+                if _streams(request, response):
+                    stream = ChatStream(request["provider"], request["model"], started)
+                    result = None
+                    async for line in response.aiter_lines():
+                        if time.perf_counter() - started > timeout:  # the read timeout is per chunk
+                            result, retryable = _stream_timeout_error(request), True
+                            break
+                        stream.feed(line)
+                    result = result or {"data": stream.data()}
+                else:
+                    await response.aread()
+            response.raise_for_status()
+            if not _streams(request, response):
+                result = {"data": response.json()}
+        except httpx.ConnectError as e:
+            logger.exception("%s connection failed: %s", label, e)
+            result = {"error": connect_error or f"LLM request failed: {e!s}"}
+            retryable = True
+        except httpx.HTTPStatusError as e:
+            result = _status_error(label, e)
+            retryable = e.response.status_code in RETRYABLE_STATUSES
+            retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+        except httpx.RequestError as e:
+            logger.exception("%s request failed: %s", label, e)
+            result = {"error": f"LLM request failed: {e!s}"}
+            retryable = isinstance(e, httpx.TransportError)
+        call_span.set_attribute("outcome", "error" if "error" in result else "ok")
+    _record_llm_call(request, started, result, ttfb)
+    return result, retryable, retry_after
+
+
+async def _post_json_async(
+    label: str,
+    request: dict[str, Any],
+    timeout: float,
+    connect_error: str | None = None,
+) -> dict[str, Any]:
+    """Async variant of _post_json."""
+    policy = get_retry_policy()
+    deadline = current_deadline()
+    request["tokens"] = _request_tokens(request)
+    attempt = 1
+    while True:
+        rejected = _circuit_open_error(label, request)
+        if rejected:
+            return rejected
+        recorded = False
+        try:
+            if not await get_scheduler().acquire_async(request["provider"], request["tokens"]):
+                LLM_DEADLINE_EXCEEDED.inc(provider=request["provider"])
+                return {"error": f"{label} rate limit: no capacity left before the deadline"}
+            attempt_timeout = deadline.clamp(timeout) if deadline else timeout
+            if attempt_timeout < MIN_ATTEMPT_SECONDS:
+                LLM_DEADLINE_EXCEEDED.inc(provider=request["provider"])
+                return {"error": "LLM request deadline exceeded"}
+            result, retryable, retry_after = await _attempt_async(
+                label, request, attempt_timeout, connect_error, attempt
+            )
+            recorded = True
+        finally:
+            if not recorded:  # queue timeout, deadline, cancelled hedge loser or unexpected error
+                _release_probe(request)
+        delay = policy.next_delay(attempt, retryable, retry_after, deadline)
+        if delay is None:
+            return result
+        LLM_RETRIES.inc(provider=request["provider"], reason="retry_after" if retry_after is not None else "backoff")
+        logger.info("%s attempt %d failed, retrying in %.2fs", label, attempt, delay)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+OLLAMA_CONNECT_ERROR = "Cannot connect to Ollama. Start it with: ollama serve (and run 'ollama pull <model>')."
+
+
+def _call_gemini(system_prompt: str, user_prompt: str, max_tokens: int | None = None) -> dict[str, Any]:
+    """Call Gemini generateContent API. Returns {'text': str} or {'error': str}."""
+    request = _gemini_request(system_prompt, user_prompt, max_tokens)
+    if "error" in request:
+        return request
+    response = _post_json("Gemini", request, timeout=60.0)
+    if "error" in response:
+        return response
+    return _parse_gemini_response(response["data"])
+
+
+async def _call_gemini_async(system_prompt: str, user_prompt: str, max_tokens: int | None = None) -> dict[str, Any]:
+    """Async variant of _call_gemini."""
+    request = _gemini_request(system_prompt, user_prompt, max_tokens)
+    if "error" in request:
+        return request
+    response = await _post_json_async("Gemini", request, timeout=60.0)
+    if "error" in response:
+        return response
+    return _parse_gemini_response(response["data"])
+
+
+def _call_ollama(system_prompt: str, user_prompt: str, max_tokens: int | None = None) -> dict[str, Any]:
+    """Call local Ollama (OpenAI-compatible). No API key. Returns {'text': str} or {'error': str}."""
+    request = _ollama_request(system_prompt, user_prompt, max_tokens)
+    # Local LLM can be slower; use 120s timeout
+    response = _post_json("Ollama", request, timeout=120.0, connect_error=OLLAMA_CONNECT_ERROR)
+    if "error" in response:
+        return response
+    return _parse_chat_response(response["data"])
+
+
+async def _call_ollama_async(system_prompt: str, user_prompt: str, max_tokens: int | None = None) -> dict[str, Any]:
+    """Async variant of _call_ollama."""
+    request = _ollama_request(system_prompt, user_prompt, max_tokens)
+    response = await _post_json_async("Ollama", request, timeout=120.0, connect_error=OLLAMA_CONNECT_ERROR)
+    if "error" in response:
+        return response
+    return _parse_chat_response(response["data"])
+
+
+def _call_grok(system_prompt: str, user_prompt: str, max_tokens: int | None = None) -> dict[str, Any]:
+    """Call Grok (OpenAI-compatible) chat/completions. Returns {'text': str} or {'error': str}."""
+    request = _grok_request(system_prompt, user_prompt, max_tokens)
+    if "error" in request:
+        return request
+    response = _post_json("Grok", request, timeout=60.0)
+    if "error" in response:
+        return response
+    return _parse_chat_response(response["data"])
+
+
+async def _call_grok_async(system_prompt: str, user_prompt: str, max_tokens: int | None = None) -> dict[str, Any]:
+    """Async variant of _call_grok."""
+    request = _grok_request(system_prompt, user_prompt, max_tokens)
+    if "error" in request:
+        return request
+    response = await _post_json_async("Grok", request, timeout=60.0)
+    if "error" in response:
+        return response
+    return _parse_chat_response(response["data"])
+
+
+def _load_gemini() -> Provider:
+    api_key = os.getenv("GEMINI_API_KEY", "")
+    return Provider(
+        "gemini",
+        os.getenv("GEMINI_MODEL", "gemini-flash-latest").strip(),
+        lambda *args: _call_gemini(*args),
+        lambda *args: _call_gemini_async(*args),
+        configured=api_key.strip().lower() not in ("", "dummy", "your-api-key-here"),
+        settings={
+            "api_key": api_key,
+            "base_url": os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta").rstrip("/"),
+        },
+    )
+
+
+def _load_grok() -> Provider:
+    api_key = os.getenv("GROK_API_KEY", "")
+    return Provider(
+        "grok",
+        os.getenv("GROK_MODEL", "grok-4"),
+        lambda *args: _call_grok(*args),
+        lambda *args: _call_grok_async(*args),
+        configured=api_key.strip() not in ("", "dummy-key-replace-me"),
+        settings={"api_key": api_key, "base_url": os.getenv("GROK_BASE_URL", "https://api.x.ai/v1").rstrip("/")},
+    )
+
+
+def _load_ollama() -> Provider:
+    return Provider(
+        "ollama",
+        (os.getenv("OLLAMA_MODEL") or "llama3.2").strip(),
+        lambda *args: _call_ollama(*args),
+        lambda *args: _call_ollama_async(*args),
+        settings={
+            "base_url": (os.getenv("OLLAMA_BASE_URL") or "http://localhost:11434/v1").rstrip("/"),
+            "keep_alive": os.getenv("OLLAMA_KEEP_ALIVE", "30m").strip(),
+            "stream": "true" if os.getenv("OLLAMA_STREAM", "true").strip().lower() in ("1", "true", "yes") else "false",
+            "warmup": "true" if os.getenv("OLLAMA_WARMUP", "true").strip().lower() in ("1", "true", "yes") else "false",
+        },
+    )
+
+
+async def warm_up_ollama(timeout: float = 120.0) -> bool:
+    """
+    Load the Ollama model into memory (native /api/generate with no prompt) so the
+    first request does not pay the load time. Keeps it resident for OLLAMA_KEEP_ALIVE.
+    """
+    provider = get_provider("ollama")
+    if provider is None or provider.settings["warmup"] != "true":
+        return False
+    base_url = provider.settings["base_url"].removesuffix("/v1")
+    body = {"model": provider.model}
+    if provider.settings["keep_alive"]:
+        body["keep_alive"] = provider.settings["keep_alive"]
+    with priority_scope("background"):
+        if not await get_scheduler().acquire_async("ollama"):
+            logger.warning("Ollama warm-up of %s skipped: no capacity under LLM_RPM", provider.model)
+            return False
+    started = time.perf_counter()
+    try:
+        response = await get_async_client("ollama").post(f"{base_url}/api/generate", json=body, timeout=timeout)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.warning("Ollama warm-up of %s failed: %s", provider.model, e)
+        return False
+    logger.info("Ollama model %s loaded in %.1fs", provider.model, time.perf_counter() - started)
+    return True
+
+
+async def warm_up_providers() -> None:
+    """Preload local models for the providers in LLM_PROVIDER (call from the app lifespan)."""
+    if "ollama" in load_providers() and "ollama" in routing_settings().chain:
+        await warm_up_ollama(get_float_env("OLLAMA_WARMUP_TIMEOUT", 120.0))
+
+
+# Calls go through the module-level _call_* functions so they can be patched in tests
+register_provider("gemini", _load_gemini)
+register_provider("grok", _load_grok)
+register_provider("ollama", _load_ollama)
+
+
+def _get_provider() -> str:
+    """First provider in LLM_PROVIDER (default: gemini), or 'local'."""
+    return primary_provider()
+
+
+def _provider_model(provider: str) -> str:
+    """Configured model name for provider."""
+    configured = get_provider(provider)
+    return configured.model if configured else ""
+
+
+def _cache_lookup(provider: str, system_prompt: str, user_prompt: str) -> tuple[str | None, str, dict | None]:
+    """Returns (cache key, dataset version, cached response). Key is None when caching is off."""
+    cache = get_response_cache()
+    if not cache.enabled:
+        return None, "", None
+    version = get_dataset_version()
+    key = cache_key(provider, _provider_model(provider), version, system_prompt, user_prompt)
+    return key, version, cache.get(key)
+
 
-    provider = (os.getenv("LLM_PROVIDER") or LLM_PROVIDER_DEFAULT).strip().lower()
-    system_prompt = build_system_prompt()
-    user_prompt = build_user_prompt(restaurants, city, price_category, limit)
-
-    if provider == "grok":
-        result = _call_grok(system_prompt, user_prompt)
-    elif provider == "ollama":
-        result = _call_ollama(system_prompt, user_prompt)
-    else:
-        # default: Gemini first, then Grok fallback
-        result = _call_gemini(system_prompt, user_prompt)
-        if "error" in result and _is_grok_configured():
-            logger.info("Gemini failed, trying Grok fallback: %s", result.get("error", "")[:80])
-            result = _call_grok(system_prompt, user_prompt)
+def _cache_store(key: str | None, version: str, parsed: dict[str, Any]) -> None:
+    """Cache successful parses only; errors are always retried."""
+    if key is not None and "error" not in parsed:
+        get_response_cache().set(key, parsed, version)
 
+
+def _parse_recommendations(result: dict[str, Any], provider: str) -> dict[str, Any]:
+    """Turn a provider {'text'|'error'} result into parsed recommendations or an error dict."""
     if "error" in result:
         return result
 
     content = result.get("text", "")
-    parsed = _extract_json(content)
+    with span("llm.parse", provider=provider, chars=len(content)):
+        parsed = _extract_json(content)
     if not parsed:
+        LLM_PARSE_FAILURES.inc(provider=provider)
         return {"error": "Invalid JSON in LLM response"}
 
     if "recommendations" not in parsed or not isinstance(parsed["recommendations"], list):
         return {"error": "LLM response missing recommendations array"}
 
     return parsed
+
+
+def _call_with_fallback(
+    system_prompt: str, user_prompt: str, max_tokens: int | None = None
+) -> tuple[dict[str, Any], str]:
+    """Try the routed providers in order. Returns (provider result, provider that produced it)."""
+    chain = route()
+    for i, provider in enumerate(chain):
+        result = provider.call(system_prompt, user_prompt, max_tokens)
+        if "error" not in result or i == len(chain) - 1:
+            return result, provider.name
+        logger.info("%s failed, trying %s: %s", provider.name, chain[i + 1].name, result["error"][:80])
+        LLM_FALLBACKS.inc(from_provider=provider.name, to_provider=chain[i + 1].name)
+    return {"error": "no LLM provider configured"}, primary_provider()
+
+
+async def _call_with_fallback_async(
+    system_prompt: str, user_prompt: str, max_tokens: int | None = None
+) -> tuple[dict[str, Any], str]:
+    """Async variant of _call_with_fallback."""
+    chain = route()
+    for i, provider in enumerate(chain):
+        result = await provider.acall(system_prompt, user_prompt, max_tokens)
+        if "error" not in result or i == len(chain) - 1:
+            return result, provider.name
+        logger.info("%s failed, trying %s: %s", provider.name, chain[i + 1].name, result["error"][:80])
+        LLM_FALLBACKS.inc(from_provider=provider.name, to_provider=chain[i + 1].name)
+    return {"error": "no LLM provider configured"}, primary_provider()
+
+
+async def _rank_single_async(system_prompt: str, user_prompt: str, max_tokens: int | None = None) -> dict[str, Any]:
+    """One prompt through the routed chain, parsed."""
+    result, used = await _call_with_fallback_async(system_prompt, user_prompt, max_tokens)
+    return _parse_recommendations(result, used)
+
+
+def _parse_batch(result: dict[str, Any], provider: str, size: int) -> list[dict[str, Any] | None]:
+    """Per-task parsed recommendations from a batched reply; None where a task is missing or malformed."""
+    parsed: list[dict[str, Any] | None] = [None] * size
+    with span("llm.parse", provider=provider, chars=len(result.get("text", "")), tasks=size):
+        data = _extract_json(result.get("text", ""))
+    if not data or not isinstance(data.get("results"), list):
+        LLM_PARSE_FAILURES.inc(provider=provider)
+        return parsed
+    for item in data["results"]:
+        if not isinstance(item, dict) or not isinstance(item.get("recommendations"), list):
+            continue
+        try:
+            task = int(item.get("task"))
+        except (TypeError, ValueError):
+            continue
+        if 1 <= task <= size and parsed[task - 1] is None:
+            parsed[task - 1] = {"recommendations": item["recommendations"]}
+    return parsed
+
+
+async def _rank_batch(system_prompt: str, tasks: list[tuple[str, int | None]]) -> list[dict[str, Any]]:
+    """
+    Rank several user prompts with one provider call (run function of the micro-batcher).
+    Tasks the reply leaves out are ranked on their own.
+    """
+    if len(tasks) == 1:
+        return [await _rank_single_async(system_prompt, *tasks[0])]
+    budgets = [tokens for _, tokens in tasks]
+    max_tokens = None if None in budgets else sum(budgets)
+    user_prompt = build_batch_user_prompt([user for user, _ in tasks])
+    with response_model_scope(LLMBatchRanking):
+        result, used = await _call_with_fallback_async(system_prompt, user_prompt, max_tokens)
+    if "error" in result:
+        return [result] * len(tasks)
+    parsed = _parse_batch(result, used, len(tasks))
+    missing = [i for i, p in enumerate(parsed) if p is None]
+    if missing:
+        logger.info("Batched reply from %s missed %d of %d tasks; ranking them separately", used, len(missing), len(tasks))
+        retried = await asyncio.gather(*(_rank_single_async(system_prompt, *tasks[i]) for i in missing))
+        for i, p in zip(missing, retried):
+            parsed[i] = p
+    return parsed
+
+
+async def _rank_hedged(
+    primary: Provider, backup: Provider, system_prompt: str, user_prompt: str, max_tokens: int | None = None
+) -> tuple[dict[str, Any], str]:
+    """primary, hedged with backup after the p95-based delay; first valid parsed response wins."""
+
+    async def attempt(provider: Provider) -> dict[str, Any]:
+        return _parse_recommendations(await provider.acall(system_prompt, user_prompt, max_tokens), provider.name)
+
+    return await hedged(
+        (primary.name, lambda: attempt(primary)),
+        (backup.name, lambda: attempt(backup)),
+        hedge_delay(primary.name),
+    )
+
+
+# Identical in-flight prompts share one provider call (sync and async callers)
+_flights = SingleFlight()
+_async_flights = AsyncSingleFlight()
+
+
+def _flight_key(provider: str, system_prompt: str, user_prompt: str) -> str:
+    return cache_key(provider, _provider_model(provider), "", system_prompt, user_prompt)
+
+
+def _build_prompts(
+    restaurants: list[dict],
+    city: str,
+    price_category: str,
+    limit: int,
+    provider: str,
+    known_ids: list[int] | None = None,
+    query: str | None = None,
+) -> tuple[str, str]:
+    """
+    (system, user) prompts. LLM_PROMPT_FORMAT=compact (default) fits the candidates
+    into LLM_PROMPT_MAX_TOKENS; verbose keeps the original one-line-per-field layout.
+    """
+    with span("llm.build_prompt", candidates=len(restaurants)) as prompt_span:
+        if os.getenv("LLM_PROMPT_FORMAT", "compact").strip().lower() == "verbose":
+            system_prompt = build_system_prompt()
+            user_prompt = build_user_prompt(restaurants, city, price_category, limit, known_ids, query)
+        else:
+            system_prompt = build_system_prompt(compact=True)
+            max_tokens = get_int_env("LLM_PROMPT_MAX_TOKENS", 1500) - estimate_tokens(system_prompt)
+            user_prompt = build_compact_user_prompt(
+                restaurants, city, price_category, limit, max_tokens, known_ids, query
+            )
+        tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        prompt_span.set_attribute("input_tokens", tokens)
+    LLM_PROMPT_TOKENS.observe(tokens, provider=provider)
+    logger.info("LLM prompt for %s / %s: ~%d input tokens", city, price_category, tokens)
+    return system_prompt, user_prompt
+
+
+def _output_budget(limit: int, unexplained: int | None = None) -> int | None:
+    """Max output tokens for limit picks (LLM_OUTPUT_TOKENS_PER_ITEM, 0 = provider default)."""
+    return max_output_tokens(limit, get_int_env("LLM_OUTPUT_TOKENS_PER_ITEM", 60), unexplained)
+
+
+def _known_reasons(restaurants: list[dict], query: str | None) -> tuple[dict[int, str], str | None]:
+    """
+    (stored reasons by candidate id, dataset version) for the candidate list.
+    Version is None when the store is off for this call: disabled, or a free-text
+    query is set (its reasons answer that query and are not reusable).
+    """
+    store = get_reason_store()
+    if not store.enabled or query:
+        return {}, None
+    version = get_dataset_version()
+    return store.lookup(restaurants, version), version
+
+
+def _merge_reasons(
+    parsed: dict[str, Any], restaurants: list[dict], known: dict[int, str], version: str | None
+) -> dict[str, Any]:
+    """Fill blank reasons from the store and remember newly written ones. Returns a new dict."""
+    if "error" in parsed or version is None:
+        return parsed
+    store = get_reason_store()
+    picks = []
+    for pick in parsed.get("recommendations", []):
+        if isinstance(pick, dict):
+            pick = dict(pick)
+            try:
+                i = int(pick.get("id"))
+            except (TypeError, ValueError):
+                i = None
+            reason = str(pick.get("reason") or "").strip()
+            if not reason and i in known:
+                pick["reason"] = known[i]
+            elif reason and i not in known and i is not None and 1 <= i <= len(restaurants):
+                restaurant_id = restaurants[i - 1].get("restaurant_id")
+                if restaurant_id is not None:
+                    store.set(restaurant_id, version, reason)
+        picks.append(pick)
+    return {**parsed, "recommendations": picks}
+
+
+def rank_restaurants(
+    restaurants: list[dict],
+    city: str,
+    price_category: str,
+    limit: int,
+    query: str | None = None,
+) -> dict[str, Any]:
+    """
+    Call the routed provider chain (default Gemini, then Grok), or rank locally for LLM_PROVIDER=local.
+    Served from the response cache when possible; concurrent identical calls are coalesced.
+    query (free-text preference) is passed to the model with the candidates.
+    Returns parsed recommendations or error dict.
+    """
+    if not restaurants:
+        return {"error": "No restaurants to rank"}
+
+    provider = _get_provider()
+    if provider == "local":
+        LOCAL_RANKINGS.inc(reason="provider")
+        return rank_locally(restaurants, limit)
+    known, reasons_version = _known_reasons(restaurants, query)
+    system_prompt, user_prompt = _build_prompts(
+        restaurants, city, price_category, limit, provider, sorted(known), query
+    )
+    max_tokens = _output_budget(limit, len(restaurants) - len(known))
+
+    key, version, cached = _cache_lookup(provider, system_prompt, user_prompt)
+    if cached is not None:
+        return _merge_reasons(cached, restaurants, known, reasons_version)
+
+    def compute() -> dict[str, Any]:
+        result, used = _call_with_fallback(system_prompt, user_prompt, max_tokens)
+        parsed = _parse_recommendations(result, used)
+        _cache_store(key, version, parsed)
+        return parsed
+
+    parsed = _flights.do(_flight_key(provider, system_prompt, user_prompt), compute)
+    return _merge_reasons(parsed, restaurants, known, reasons_version)
+
+
+async def rank_restaurants_async(
+    restaurants: list[dict],
+    city: str,
+    price_category: str,
+    limit: int,
+    query: str | None = None,
+) -> dict[str, Any]:
+    """
+    Async variant of rank_restaurants, for use from async endpoints.
+    Waiting on the provider does not hold a worker thread.
+    With LLM_HEDGE=true the routed backup races a slow primary instead of waiting for it to fail;
+    with LLM_BATCH=true concurrent rankings share one provider call (backend.llm.batching).
+    Cache, reason store and dataset version lookups run in worker threads.
+    """
+    if not restaurants:
+        return {"error": "No restaurants to rank"}
+
+    provider = _get_provider()
+    if provider == "local":
+        LOCAL_RANKINGS.inc(reason="provider")
+        return rank_locally(restaurants, limit)
+    # The dataset version and the cache/reason SQLite tiers may hit disk: keep them off the loop
+    known, reasons_version = await asyncio.to_thread(_known_reasons, restaurants, query)
+    system_prompt, user_prompt = _build_prompts(
+        restaurants, city, price_category, limit, provider, sorted(known), query
+    )
+    max_tokens = _output_budget(limit, len(restaurants) - len(known))
+
+    key, version, cached = await asyncio.to_thread(_cache_lookup, provider, system_prompt, user_prompt)
+    if cached is not None:
+        return await asyncio.to_thread(_merge_reasons, cached, restaurants, known, reasons_version)
+
+    async def compute() -> dict[str, Any]:
+        chain = route() if hedging_enabled() else []
+        if len(chain) > 1:
+            parsed, _ = await _rank_hedged(chain[0], chain[1], system_prompt, user_prompt, max_tokens)
+        elif batching_enabled():
+            parsed = await get_batcher(_rank_batch).submit(system_prompt, user_prompt, max_tokens)
+        else:
+            parsed = await _rank_single_async(system_prompt, user_prompt, max_tokens)
+        await asyncio.to_thread(_cache_store, key, version, parsed)
+        return parsed
+
+    parsed = await _async_flights.do(_flight_key(provider, system_prompt, user_prompt), compute)
+    return await asyncio.to_thread(_merge_reasons, parsed, restaurants, known, reasons_version)
@@ -0,0 +1,27 @@
+"""
+Provider-side prompt caching hints for the static system prompt.
+
+OpenAI-compatible providers cache prompt prefixes on their own. Grok requests
+get a stable x-grok-conv-id derived from the system prompt so they reach the
+same cache. Gemini caches repeated prefixes implicitly; an explicit
+cachedContents resource is not used because Gemini only accepts content of at
+least 1024 tokens and both system prompts are far smaller. Cached prompt tokens
+reported by any provider are counted in backend.llm.usage.
+
+Config (env):
+  LLM_CONTEXT_CACHE   true to send prompt cache hints (default false)
+"""
+
+import hashlib
+import os
+
+
+def context_cache_enabled() -> bool:
+    return os.getenv("LLM_CONTEXT_CACHE", "false").strip().lower() in ("1", "true", "yes")
+
+
+def cache_hint_headers(provider: str, system_prompt: str) -> dict[str, str]:
+    """Headers that route OpenAI-compatible requests with the same system prompt to the same prompt cache."""
+    if provider != "grok" or not context_cache_enabled():
+        return {}
+    return {"x-grok-conv-id": hashlib.sha256(system_prompt.encode()).hexdigest()[:32]}
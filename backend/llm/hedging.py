@@ -0,0 +1,113 @@
+"""
+Hedged requests: start the primary provider and, if it has not produced a usable
+answer within the hedge delay, start the backup in parallel. The first usable
+answer wins and the other call is cancelled.
+
+The delay tracks the primary's observed latency percentile, so hedges fire only
+for the slow tail.
+
+Config (env):
+  LLM_HEDGE               true to hedge Gemini with Grok in the default provider mode
+  LLM_HEDGE_DELAY         seconds to wait before hedging until enough samples exist (default 2.0)
+  LLM_HEDGE_PERCENTILE    percentile of primary latency used as the delay (default 95)
+  LLM_HEDGE_MIN_SAMPLES   samples needed before the percentile is trusted (default 20)
+"""
+
+import asyncio
+import os
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from backend.config import get_float_env, get_int_env
+from backend.metrics import LLM_FALLBACKS, Counter
+
+LLM_HEDGES = Counter("llm_hedges_total", "Backup provider calls started by hedging.", ("primary", "backup"))
+LLM_HEDGE_WINS = Counter("llm_hedge_wins_total", "Hedged requests by the provider that answered first.", ("provider",))
+
+MIN_DELAY = 0.05
+
+
+class LatencyWindow:
+    """Recent successful call latencies per provider (bounded)."""
+
+    def __init__(self, size: int = 200):
+        self.size = size
+        self._samples: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(provider, deque(maxlen=self.size)).append(seconds)
+
+    def percentile(self, provider: str, pct: float, min_samples: int = 1) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples.get(provider, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+latencies = LatencyWindow()
+
+
+def hedging_enabled() -> bool:
+    return os.getenv("LLM_HEDGE", "false").strip().lower() in ("1", "true", "yes")
+
+
+def hedge_delay(primary: str) -> float:
+    """Seconds to wait for primary before starting the backup."""
+    observed = latencies.percentile(
+        primary, get_float_env("LLM_HEDGE_PERCENTILE", 95.0), get_int_env("LLM_HEDGE_MIN_SAMPLES", 20)
+    )
+    delay = observed if observed is not None else get_float_env("LLM_HEDGE_DELAY", 2.0)
+    return max(MIN_DELAY, delay)
+
+
+async def hedged(
+    primary: tuple[str, Callable[[], Awaitable[dict[str, Any]]]],
+    backup: tuple[str, Callable[[], Awaitable[dict[str, Any]]]],
+    delay: float,
+) -> tuple[dict[str, Any], str]:
+    """
+    Run primary, hedging with backup after delay (or at once if primary fails first).
+    Each callable returns a parsed result dict ('error' key on failure).
+    Returns (result, provider name); the last error if both fail.
+    """
+    primary_name, primary_call = primary
+    backup_name, backup_call = backup
+    names: dict[asyncio.Future, str] = {}
+
+    first = asyncio.ensure_future(primary_call())
+    names[first] = primary_name
+    pending = {first}
+    last_error: tuple[dict[str, Any], str] | None = None
+    backup_started = False
+    hedge_fired = False
+    try:
+        while pending:
+            timeout = None if backup_started else delay
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if "error" not in result:
+                    if hedge_fired:
+                        LLM_HEDGE_WINS.inc(provider=names[task])
+                    return result, names[task]
+                last_error = (result, names[task])
+            if not backup_started:
+                backup_started = True
+                if done:
+                    # primary failed before the hedge delay: plain fallback
+                    LLM_FALLBACKS.inc(from_provider=primary_name, to_provider=backup_name)
+                else:
+                    hedge_fired = True
+                    LLM_HEDGES.inc(primary=primary_name, backup=backup_name)
+                second = asyncio.ensure_future(backup_call())
+                names[second] = backup_name
+                pending.add(second)
+    finally:
+        for task in pending:
+            task.cancel()
+    return last_error
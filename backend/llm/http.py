@@ -0,0 +1,107 @@
+"""
+Process-wide pooled HTTP clients for LLM providers.
+One keep-alive pool per provider, so repeat calls reuse TCP + TLS connections.
+httpx has separate sync and async clients; both are kept per provider and
+opened/closed together in the app lifespan. Async pools are per event loop
+(connections cannot cross loops, e.g. Streamlit's asyncio.run per call).
+
+Config (env):
+  LLM_HTTP_MAX_CONNECTIONS     max open connections per provider (default 100)
+  LLM_HTTP_MAX_KEEPALIVE       idle connections kept per provider (default 20)
+  LLM_HTTP_KEEPALIVE_EXPIRY    seconds an idle connection is kept (default 30)
+  LLM_HTTP2                    true to negotiate HTTP/2 (needs: pip install h2)
+  LLM_VERIFY_SSL               false disables TLS verification
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import weakref
+
+import httpx
+
+from backend.config import get_float_env, get_int_env
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ("gemini", "grok", "ollama")
+
+_lock = threading.Lock()
+_clients: dict[str, httpx.Client] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _verify_ssl() -> bool:
+    return os.getenv("LLM_VERIFY_SSL", "true").strip().lower() not in ("0", "false", "no")
+
+
+def _http2_enabled() -> bool:
+    if os.getenv("LLM_HTTP2", "false").strip().lower() not in ("1", "true", "yes"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("LLM_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def _client_kwargs(provider: str) -> dict:
+    limits = httpx.Limits(
+        max_connections=get_int_env("LLM_HTTP_MAX_CONNECTIONS", 100),
+        max_keepalive_connections=get_int_env("LLM_HTTP_MAX_KEEPALIVE", 20),
+        keepalive_expiry=get_float_env("LLM_HTTP_KEEPALIVE_EXPIRY", 30.0),
+    )
+    # Ollama is local plain HTTP; TLS settings only matter for hosted providers
+    verify = True if provider == "ollama" else _verify_ssl()
+    return {"limits": limits, "verify": verify, "http2": _http2_enabled(), "timeout": 60.0}
+
+
+def get_client(provider: str) -> httpx.Client:
+    """Shared sync client for provider (created on first use)."""
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        with _lock:
+            client = _clients.get(provider)
+            if client is None or client.is_closed:
+                client = _clients[provider] = httpx.Client(**_client_kwargs(provider))
+    return client
+
+
+def get_async_client(provider: str) -> httpx.AsyncClient:
+    """Shared async client for provider on the running event loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.get(loop)
+    if clients is None:
+        clients = _async_clients[loop] = {}
+    client = clients.get(provider)
+    if client is None or client.is_closed:
+        client = clients[provider] = httpx.AsyncClient(**_client_kwargs(provider))
+    return client
+
+
+def init_clients(providers: tuple[str, ...] = PROVIDERS) -> None:
+    """Create sync and async pools up front (call from the app lifespan)."""
+    for provider in providers:
+        get_client(provider)
+        get_async_client(provider)
+
+
+def close_clients() -> None:
+    """Close all sync pools."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_clients() -> None:
+    """Close the async pools of the running loop and all sync pools."""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+    close_clients()
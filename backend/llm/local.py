@@ -0,0 +1,75 @@
+"""
+Deterministic local ranker - no network, microseconds per call.
+
+Scores candidates on rating, vote count (from raw_data), online ordering and
+value within the candidate set, and writes a templated reason for each pick.
+Returns the same {"recommendations": [{rank, id, reason}]} shape as the LLM, so
+the router joins it with the candidate rows the same way.
+
+Used for LLM_PROVIDER=local (load tests without providers) and by the router
+as a degrade path when providers fail or admission control sheds the request.
+"""
+
+import math
+
+from backend.metrics import Counter
+
+LOCAL_RANKINGS = Counter("llm_local_rankings_total", "Rankings produced by the local scorer.", ("reason",))
+
+RATING_WEIGHT = 0.6
+VOTES_WEIGHT = 0.25
+VALUE_WEIGHT = 0.1
+DELIVERY_WEIGHT = 0.05
+
+
+def _votes(r: dict) -> int:
+    try:
+        return max(0, int(r.get("votes") or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _score(r: dict, max_votes: int, min_cost: int, max_cost: int) -> float:
+    rating = (r.get("rating") or 0) / 5
+    votes = math.log1p(_votes(r)) / math.log1p(max_votes) if max_votes else 0.0
+    cost = r.get("cost_for_two")
+    value = 1 - (cost - min_cost) / (max_cost - min_cost) if cost is not None and max_cost > min_cost else 0.5
+    delivery = 1.0 if r.get("has_online_delivery") else 0.0
+    return RATING_WEIGHT * rating + VOTES_WEIGHT * votes + VALUE_WEIGHT * value + DELIVERY_WEIGHT * delivery
+
+
+def _reason(r: dict, cheapest: bool) -> str:
+    parts = []
+    if r.get("rating"):
+        votes = _votes(r)
+        parts.append(f"Rated {r['rating']:g}" + (f" by {votes:,} diners" if votes else ""))
+    cuisines = ", ".join(c.strip() for c in (r.get("cuisines") or "").split(",")[:2] if c.strip())
+    if cuisines:
+        parts.append(f"serves {cuisines}" + (f" in {r['location']}" if r.get("location") else ""))
+    if r.get("cost_for_two"):
+        parts.append(("best value here at" if cheapest else "about") + f" ₹{r['cost_for_two']} for two")
+    if r.get("has_online_delivery"):
+        parts.append("online ordering available")
+    return ("; ".join(parts) or "Popular local choice") + "."
+
+
+def rank_locally(restaurants: list[dict], limit: int) -> dict:
+    """Top limit candidates by score; ids are 1-based positions in restaurants."""
+    costs = [r["cost_for_two"] for r in restaurants if r.get("cost_for_two") is not None]
+    min_cost, max_cost = (min(costs), max(costs)) if costs else (0, 0)
+    max_votes = max((_votes(r) for r in restaurants), default=0)
+
+    scored = sorted(
+        enumerate(restaurants, 1),
+        key=lambda pair: (-_score(pair[1], max_votes, min_cost, max_cost), pair[0]),
+    )
+    return {
+        "recommendations": [
+            {
+                "rank": rank,
+                "id": i,
+                "reason": _reason(r, r.get("cost_for_two") is not None and r["cost_for_two"] == min_cost < max_cost),
+            }
+            for rank, (i, r) in enumerate(scored[:limit], 1)
+        ]
+    }
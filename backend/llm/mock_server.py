@@ -0,0 +1,212 @@
+"""
+Local stand-in for the LLM providers, for offline load and chaos testing.
+
+Speaks Gemini generateContent / streamGenerateContent and OpenAI-compatible
+chat/completions (Grok, Ollama), with or without streaming, plus Ollama's model
+preload (/api/generate). Replies are valid rankings of the ids in the prompt, so
+the whole request path can be exercised; latency, 5xx errors, 429s and malformed
+JSON are injected at configurable rates.
+
+Run: python scripts/mock_llm_server.py --port 8090, then point the app at it:
+  GEMINI_BASE_URL=http://127.0.0.1:8090/v1beta
+  GROK_BASE_URL=http://127.0.0.1:8090/v1
+  OLLAMA_BASE_URL=http://127.0.0.1:8090/v1
+"""
+
+import asyncio
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from backend.llm.prompts import estimate_tokens
+
+_ROW_ID = re.compile(r"^(\d+)[|.]", re.MULTILINE)
+_TOP_N = re.compile(r"top (\d+)")
+_TASK = re.compile(r"^Task (\d+):$", re.MULTILINE)
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 200.0
+    jitter_ms: float = 50.0
+    distribution: str = "normal"  # fixed, normal, uniform, exponential
+    tail_rate: float = 0.0  # share of calls that take tail_ms instead
+    tail_ms: float = 5000.0
+    error_rate: float = 0.0  # 500
+    rate_limit_rate: float = 0.0  # 429 with Retry-After
+    malformed_rate: float = 0.0  # truncated JSON text
+    retry_after: int = 1
+    stream_chunks: int = 4
+    seed: int | None = None
+
+
+class _Chaos:
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+
+    def latency(self) -> float:
+        c = self.config
+        if c.tail_rate and self.random.random() < c.tail_rate:
+            return c.tail_ms / 1000
+        if c.distribution == "fixed":
+            ms = c.latency_ms
+        elif c.distribution == "uniform":
+            ms = self.random.uniform(c.latency_ms - c.jitter_ms, c.latency_ms + c.jitter_ms)
+        elif c.distribution == "exponential":
+            ms = self.random.expovariate(1 / c.latency_ms) if c.latency_ms > 0 else 0.0
+        else:
+            ms = self.random.gauss(c.latency_ms, c.jitter_ms)
+        return max(0.0, ms) / 1000
+
+    def failure(self) -> JSONResponse | None:
+        """An injected error response, or None to answer normally."""
+        c = self.config
+        roll = self.random.random()
+        if roll < c.rate_limit_rate:
+            return JSONResponse(
+                {"error": {"code": 429, "message": "mock rate limit"}},
+                status_code=429,
+                headers={"Retry-After": str(c.retry_after)},
+            )
+        if roll < c.rate_limit_rate + c.error_rate:
+            return JSONResponse({"error": {"code": 500, "message": "mock server error"}}, status_code=500)
+        return None
+
+    def malformed(self) -> bool:
+        return self.random.random() < self.config.malformed_rate
+
+
+def _picks(prompt: str) -> list[dict]:
+    ids = [int(i) for i in _ROW_ID.findall(prompt)]
+    match = _TOP_N.search(prompt)
+    limit = int(match.group(1)) if match else 3
+    return [{"rank": rank, "id": i, "reason": f"Mock pick #{rank}."} for rank, i in enumerate(ids[:limit], 1)]
+
+
+def mock_ranking(prompt: str) -> str:
+    """JSON ranking of the first top-N candidate ids listed in prompt (per task for batched prompts)."""
+    tasks = _TASK.split(prompt)
+    if len(tasks) > 1:
+        # split() yields [preamble, number, body, number, body, ...]
+        results = [{"task": int(n), "recommendations": _picks(body)} for n, body in zip(tasks[1::2], tasks[2::2])]
+        return json.dumps({"results": results})
+    return json.dumps({"recommendations": _picks(prompt)})
+
+
+def _chunks(text: str, n: int) -> list[str]:
+    size = max(1, -(-len(text) // max(1, n)))
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def _sse(events) -> StreamingResponse:
+    async def body():
+        for event in events:
+            yield f"data: {event}\n\n"
+            await asyncio.sleep(0)
+
+    return StreamingResponse(body(), media_type="text/event-stream")
+
+
+def create_app(config: MockConfig | None = None) -> FastAPI:
+    """ASGI app serving the mock provider endpoints."""
+    chaos = _Chaos(config or MockConfig())
+    app = FastAPI(title="Mock LLM server")
+    app.state.chaos = chaos
+
+    async def reply(prompt: str) -> tuple[str | None, JSONResponse | None]:
+        await asyncio.sleep(chaos.latency())
+        failure = chaos.failure()
+        if failure is not None:
+            return None, failure
+        text = mock_ranking(prompt)
+        return (text[: len(text) // 2] if chaos.malformed() else text), None
+
+    def _gemini_body(text: str, prompt: str) -> dict:
+        return {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}],
+            "usageMetadata": {
+                "promptTokenCount": estimate_tokens(prompt),
+                "candidatesTokenCount": estimate_tokens(text),
+                "totalTokenCount": estimate_tokens(prompt) + estimate_tokens(text),
+            },
+        }
+
+    def _gemini_prompt(body: dict) -> str:
+        parts = [p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", [])]
+        return "\n".join(parts)
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def generate_content(model: str, request: Request):
+        prompt = _gemini_prompt(await request.json())
+        text, failure = await reply(prompt)
+        return failure or _gemini_body(text, prompt)
+
+    @app.post("/v1beta/models/{model}:streamGenerateContent")
+    async def stream_generate_content(model: str, request: Request):
+        prompt = _gemini_prompt(await request.json())
+        text, failure = await reply(prompt)
+        if failure:
+            return failure
+        return _sse(json.dumps(_gemini_body(chunk, prompt)) for chunk in _chunks(text, chaos.config.stream_chunks))
+
+    @app.post("/api/generate")
+    async def ollama_generate(request: Request):
+        # Ollama's native endpoint; the app only calls it without a prompt, to preload the model
+        body = await request.json()
+        return {"model": body.get("model", "mock"), "response": "", "done": True, "done_reason": "load"}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+        model = body.get("model", "mock")
+        text, failure = await reply(prompt)
+        if failure:
+            return failure
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(text),
+            "total_tokens": estimate_tokens(prompt) + estimate_tokens(text),
+        }
+        created = int(time.time())
+        if not body.get("stream"):
+            return {
+                "id": "mock-completion",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+        events = [
+            json.dumps({
+                "id": "mock-completion",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}],
+            })
+            for chunk in _chunks(text, chaos.config.stream_chunks)
+        ]
+        events.append(json.dumps({
+            "id": "mock-completion",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": usage,
+        }))
+        events.append("[DONE]")
+        return _sse(events)
+
+    return app
@@ -1,27 +1,71 @@
 """
 Prompt templates for restaurant recommendation.
+
+Two encodings of the candidate list:
+  verbose  one pipe-separated line per restaurant with full cuisine strings
+  compact  short numeric ids, a shared cuisine vocabulary and trimmed fields,
+           with the candidate list cut to fit a token budget
 """
 
+from collections import Counter
+
+# The model returns candidate ids only; the router joins name/location/rating/cost from the DB rows
+RESPONSE_FORMAT = '{"recommendations":[{"rank":1,"id":3,"reason":"..."}]}'
+BATCH_RESPONSE_FORMAT = '{"results":[{"task":1,"recommendations":[{"rank":1,"id":3,"reason":"..."}]}]}'
+MAX_LOCATION_CHARS = 32
+MAX_QUERY_CHARS = 120
+OUTPUT_TOKENS_BASE = 32
+ID_ONLY_TOKENS = 12  # {"rank":1,"id":3,"reason":""}
+
+# Bump when the reason wording/contract changes so stored reasons are not reused (backend.llm.reasons)
+PROMPT_VERSION = "3"
+
 
-def build_system_prompt() -> str:
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English/BPE tokenizers)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def build_system_prompt(compact: bool = False) -> str:
     """System role for the LLM."""
+    if compact:
+        return (
+            "You rank restaurants from the given list and say briefly why each is a good choice. "
+            "Use only listed restaurants, referred to by id. Reply with JSON only."
+        )
     return """You are a restaurant recommendation assistant. Your task is to rank restaurants from a provided list and explain why each is a good choice.
 
 RULES (strict):
 1. You MUST rank ONLY from the restaurants in the list provided. Do NOT invent or add any restaurant not in the list.
 2. Return your response as valid JSON only. No markdown, no explanation outside the JSON.
-3. Use the exact restaurant names from the list.
+3. Refer to each restaurant by its id (the number before it in the list).
 4. Provide a brief, helpful reason for each recommendation."""
 
 
-def build_user_prompt(restaurants: list[dict], city: str, price_category: str, limit: int) -> str:
+def _query_text(query: str) -> str:
+    return " ".join(query.split())[:MAX_QUERY_CHARS]
+
+
+def _known_reasons_line(known_ids: list[int]) -> str:
+    return f'Reasons already known for ids {",".join(map(str, known_ids))}: give "reason":"" for those.'
+
+
+def build_user_prompt(
+    restaurants: list[dict],
+    city: str,
+    price_category: str,
+    limit: int,
+    known_ids: list[int] | None = None,
+    query: str | None = None,
+) -> str:
     """Build user prompt with restaurant list."""
     lines = [
         f"City: {city}",
         f"Price category: {price_category}",
+        *([f"Diner is looking for: {_query_text(query)}"] if query else []),
         f"Rank exactly the top {limit} restaurants from the list below.",
         "",
-        "Restaurant list (name, location, rating, cost_for_two, online_order, cuisines):",
+        "Restaurant list (id. name, location, rating, cost_for_two, online_order, cuisines):",
     ]
     for i, r in enumerate(restaurants, 1):
         name = r.get("name", "?")
@@ -33,9 +77,96 @@ def build_user_prompt(restaurants: list[dict], city: str, price_category: str, l
         lines.append(f"{i}. {name} | {location} | {rating} | {cost} | Online: {online} | {cuisines}")
 
     lines.append("")
-    lines.append(
-        "Respond with JSON in this exact format (no other text): "
-        '{"recommendations": [{"rank": 1, "name": "...", "location": "...", "rating": 4.1, '
-        '"cost_for_two": 800, "online_order": true, "reason": "..."}]}'
-    )
+    if known_ids:
+        lines.append(_known_reasons_line(known_ids))
+    lines.append(f"Respond with JSON in this exact format (no other text): {RESPONSE_FORMAT}")
+    return "\n".join(lines)
+
+
+def max_output_tokens(limit: int, per_item: int = 60, unexplained: int | None = None) -> int | None:
+    """
+    Output token cap for limit picks of {rank, id, reason}; None when per_item <= 0 (no cap).
+    Only picks among the unexplained candidates (no known reason) need reason tokens.
+    """
+    if per_item <= 0:
+        return None
+    with_reason = limit if unexplained is None else min(limit, unexplained)
+    return OUTPUT_TOKENS_BASE + with_reason * per_item + (limit - with_reason) * ID_ONLY_TOKENS
+
+
+def _split_cuisines(value: str | None) -> list[str]:
+    return [c.strip() for c in (value or "").split(",") if c.strip()]
+
+
+def _compact_rows(restaurants: list[dict], vocabulary: dict[str, int]) -> list[str]:
+    rows = []
+    for i, r in enumerate(restaurants, 1):
+        location = (r.get("location") or "").strip()[:MAX_LOCATION_CHARS].rstrip(" ,")
+        rating = r.get("rating")
+        cost = r.get("cost_for_two")
+        cuisines = ",".join(str(vocabulary[c]) for c in _split_cuisines(r.get("cuisines")))
+        rows.append(
+            f"{i}|{r.get('name', '?')}|{location}|{'' if rating is None else f'{rating:g}'}"
+            f"|{'' if cost is None else cost}|{'y' if r.get('has_online_delivery') else 'n'}|{cuisines}"
+        )
+    return rows
+
+
+def _render_compact(
+    restaurants: list[dict],
+    city: str,
+    price_category: str,
+    limit: int,
+    known_ids: list[int],
+    query: str | None = None,
+) -> str:
+    counts = Counter(c for r in restaurants for c in _split_cuisines(r.get("cuisines")))
+    vocabulary = {c: i for i, (c, _) in enumerate(counts.most_common(), 1)}
+    wants = f" | Wants: {_query_text(query)}" if query else ""
+    lines = [
+        f"City: {city} | Price: {price_category}{wants} | Rank the top {limit}.",
+        "Cuisines: " + " ".join(f"{i}={c}" for c, i in vocabulary.items()),
+        "id|name|area|rating|cost_for_two|online|cuisines",
+        *_compact_rows(restaurants, vocabulary),
+        *([_known_reasons_line(known_ids)] if known_ids else []),
+        f"JSON: {RESPONSE_FORMAT}",
+    ]
     return "\n".join(lines)
+
+
+def build_compact_user_prompt(
+    restaurants: list[dict],
+    city: str,
+    price_category: str,
+    limit: int,
+    max_tokens: int | None = None,
+    known_ids: list[int] | None = None,
+    query: str | None = None,
+) -> str:
+    """
+    Compact user prompt. With max_tokens, the lowest-placed candidates are dropped
+    until the prompt fits (never below limit candidates).
+    """
+    known_ids = known_ids or []
+    count = len(restaurants)
+    prompt = _render_compact(restaurants, city, price_category, limit, known_ids, query)
+    while max_tokens and count > limit and estimate_tokens(prompt) > max_tokens:
+        count -= 1
+        kept = [i for i in known_ids if i <= count]
+        prompt = _render_compact(restaurants[:count], city, price_category, limit, kept, query)
+    return prompt
+
+
+def build_batch_user_prompt(task_prompts: list[str]) -> str:
+    """
+    Several independent ranking prompts (as built above) in one message. Each
+    task's own JSON line is replaced by one multi-result format; ids are per task.
+    """
+    sections = []
+    for task, prompt in enumerate(task_prompts, 1):
+        body = prompt.rsplit("\n", 1)[0].rstrip()  # both layouts end with the JSON format line
+        sections.append(f"Task {task}:\n{body}")
+    sections.append(
+        f"Answer every task independently; ids refer to that task's list. JSON: {BATCH_RESPONSE_FORMAT}"
+    )
+    return "\n\n".join(sections)
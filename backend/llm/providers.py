@@ -0,0 +1,199 @@
+"""
+LLM provider registry and latency-aware routing.
+
+Each backend registers a loader that reads its env config once and returns a
+Provider exposing call / acall(system_prompt, user_prompt, max_tokens) ->
+{'text': str} or {'error': str}. Loaders run on first use (or at startup via
+load_providers()); reload_providers() re-reads the env.
+
+route() returns the providers allowed by LLM_PROVIDER for one request. By
+default it keeps the LLM_PROVIDER order (Gemini primary, Grok fallback). With
+LLM_ROUTING=latency it orders them by expected cost: EWMA latency x (1 + error
+penalty x EWMA error rate) / weight. Providers with fewer than the minimum
+samples are assumed to take the prior latency, so one slow call does not move
+traffic. Providers with an open circuit go last.
+
+Config (env, read once):
+  LLM_PROVIDER               provider or comma-separated chain (default gemini; a lone gemini implies gemini,grok;
+                             unknown names are ignored, and the default applies if none is left)
+  LLM_PROVIDER_WEIGHTS       preference weights, e.g. gemini=1,grok=0.8 (default 1)
+  LLM_ROUTING                static (default; keep the LLM_PROVIDER order) or latency
+  LLM_ROUTING_PRIOR_SECONDS  latency assumed before a provider has enough samples (default 2.0)
+  LLM_ROUTING_MIN_SAMPLES    calls observed before a provider's EWMA is trusted (default 5)
+  LLM_ROUTING_ALPHA          EWMA smoothing factor (default 0.2)
+"""
+
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from backend.config import get_float_env, get_int_env
+from backend.llm.breaker import OPEN, breakers_enabled, get_breaker
+from backend.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+LLM_PROVIDER_LATENCY = Gauge("llm_provider_latency_ewma_seconds", "EWMA of provider call latency.", ("provider",))
+LLM_PROVIDER_ERROR_RATE = Gauge("llm_provider_error_rate_ewma", "EWMA of provider call failures (0-1).", ("provider",))
+
+ERROR_PENALTY = 4.0  # a provider failing half the time costs 3x its latency
+
+
+@dataclass
+class Provider:
+    """One LLM backend. call/acall return {'text': str} or {'error': str}."""
+
+    name: str
+    model: str
+    call: Callable[..., dict[str, Any]]
+    acall: Callable[..., Awaitable[dict[str, Any]]]
+    configured: bool = True
+    settings: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class RoutingSettings:
+    chain: tuple[str, ...]
+    weights: dict[str, float]
+    adaptive: bool
+    prior_seconds: float
+    min_samples: int = 5
+
+
+class ProviderStats:
+    """EWMA latency and error rate per provider."""
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self._stats: dict[str, tuple[float | None, float]] = {}
+        self._samples: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            latency, error_rate = self._stats.get(provider, (None, 0.0))
+            if ok:
+                latency = seconds if latency is None else latency + self.alpha * (seconds - latency)
+            error_rate += self.alpha * ((0.0 if ok else 1.0) - error_rate)
+            self._stats[provider] = (latency, error_rate)
+            self._samples[provider] = self._samples.get(provider, 0) + 1
+        if latency is not None:
+            LLM_PROVIDER_LATENCY.set(latency, provider=provider)
+        LLM_PROVIDER_ERROR_RATE.set(error_rate, provider=provider)
+
+    def get(self, provider: str) -> tuple[float | None, float]:
+        """(EWMA latency or None before the first success, EWMA error rate)."""
+        with self._lock:
+            return self._stats.get(provider, (None, 0.0))
+
+    def samples(self, provider: str) -> int:
+        """Calls recorded for provider."""
+        with self._lock:
+            return self._samples.get(provider, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._samples.clear()
+
+
+stats = ProviderStats(get_float_env("LLM_ROUTING_ALPHA", 0.2))
+
+_loaders: dict[str, Callable[[], Provider]] = {}
+_providers: dict[str, Provider] | None = None
+_settings: RoutingSettings | None = None
+_load_lock = threading.Lock()
+
+
+def register_provider(name: str, loader: Callable[[], Provider]) -> None:
+    """Make a backend available to LLM_PROVIDER. loader reads its config and returns the Provider."""
+    _loaders[name] = loader
+    reload_providers()
+
+
+def _parse_weights(raw: str) -> dict[str, float]:
+    weights = {}
+    for part in raw.split(","):
+        name, _, value = part.partition("=")
+        try:
+            weights[name.strip().lower()] = max(0.01, float(value))
+        except ValueError:
+            continue
+    return weights
+
+
+def _load_settings() -> RoutingSettings:
+    raw = (os.getenv("LLM_PROVIDER") or "gemini").strip().lower()
+    chain = tuple(name.strip() for name in raw.split(",") if name.strip())
+    for name in chain:
+        if name not in _loaders and name != "local":
+            logger.warning("LLM_PROVIDER lists unknown provider %r - ignored", name)
+    chain = tuple(name for name in chain if name in _loaders or name == "local") or ("gemini",)
+    if chain == ("gemini",):
+        chain = ("gemini", "grok")  # historical default: Gemini with Grok fallback
+    return RoutingSettings(
+        chain=chain,
+        weights=_parse_weights(os.getenv("LLM_PROVIDER_WEIGHTS", "")),
+        adaptive=os.getenv("LLM_ROUTING", "static").strip().lower() == "latency",
+        prior_seconds=get_float_env("LLM_ROUTING_PRIOR_SECONDS", 2.0),
+        min_samples=get_int_env("LLM_ROUTING_MIN_SAMPLES", 5),
+    )
+
+
+def load_providers() -> dict[str, Provider]:
+    """Parse provider and routing config from env (once; see reload_providers)."""
+    global _providers, _settings
+    if _providers is None:
+        with _load_lock:
+            if _providers is None:
+                _settings = _load_settings()
+                _providers = {name: loader() for name, loader in _loaders.items()}
+    return _providers
+
+
+def reload_providers() -> None:
+    """Forget parsed config; the next call re-reads the env."""
+    global _providers, _settings
+    with _load_lock:
+        _providers = None
+        _settings = None
+
+
+def get_provider(name: str) -> Provider | None:
+    return load_providers().get(name)
+
+
+def routing_settings() -> RoutingSettings:
+    load_providers()
+    return _settings
+
+
+def primary_provider() -> str:
+    """First provider named in LLM_PROVIDER (e.g. for cache keys)."""
+    return routing_settings().chain[0]
+
+
+def expected_cost(provider: Provider, settings: RoutingSettings) -> float:
+    """Routing score; lower is better."""
+    if breakers_enabled() and get_breaker(provider.name).state == OPEN:
+        return float("inf")
+    if stats.samples(provider.name) < settings.min_samples:
+        return settings.prior_seconds / settings.weights.get(provider.name, 1.0)
+    latency, error_rate = stats.get(provider.name)
+    if latency is None:
+        latency = settings.prior_seconds
+    return latency * (1 + ERROR_PENALTY * error_rate) / settings.weights.get(provider.name, 1.0)
+
+
+def route() -> list[Provider]:
+    """Providers to try for one request, best first. Unconfigured providers are skipped
+    unless none is configured (the first then reports its config error)."""
+    providers = load_providers()
+    settings = routing_settings()
+    chain = [providers[name] for name in settings.chain if name in providers]
+    usable = [p for p in chain if p.configured] or chain[:1]
+    if settings.adaptive and len(usable) > 1:
+        usable.sort(key=lambda p: expected_cost(p, settings))
+    return usable
@@ -0,0 +1,89 @@
+"""
+Per-restaurant reason store. The same well-rated restaurants show up in many
+candidate lists, so a reason written once is reused: the prompt marks candidates
+that already have one and the LLM only ranks them, which cuts output tokens.
+
+Keys are (prompt version, dataset version, restaurant id); a new prompt style or
+dataset never reads old reasons. Rankings with a free-text query neither read nor
+write the store, since their reasons answer that query. Tiers are the same as the response cache:
+in-memory LRU + TTL, then the optional SQLite file (LLM_CACHE_SQLITE_PATH).
+
+Config (env):
+  LLM_REASON_CACHE               false to disable (default true)
+  LLM_REASON_CACHE_TTL           seconds a reason stays valid (default 86400)
+  LLM_REASON_CACHE_MAX_ENTRIES   in-memory LRU size (default 10000)
+"""
+
+import os
+
+from backend.config import get_float_env, get_int_env
+from backend.llm.cache import MemoryCache, SQLiteCache
+from backend.llm.prompts import PROMPT_VERSION
+from backend.metrics import Counter
+
+LLM_REASON_CACHE = Counter("llm_reason_cache_total", "Candidate reason lookups.", ("result",))
+
+
+class ReasonStore:
+    """Reasons by restaurant id, looked up tier by tier."""
+
+    def __init__(self, tiers: list):
+        self.tiers = tiers
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.tiers)
+
+    @staticmethod
+    def _key(restaurant_id: int, dataset_version: str) -> str:
+        return f"reason:{PROMPT_VERSION}:{dataset_version}:{restaurant_id}"
+
+    def get(self, restaurant_id: int, dataset_version: str) -> str | None:
+        key = self._key(restaurant_id, dataset_version)
+        for i, tier in enumerate(self.tiers):
+            reason = tier.get(key)
+            if reason is not None:
+                for faster in self.tiers[:i]:
+                    faster.set(key, reason)
+                return reason
+        return None
+
+    def set(self, restaurant_id: int, dataset_version: str, reason: str) -> None:
+        for tier in self.tiers:
+            tier.set(self._key(restaurant_id, dataset_version), reason, dataset_version)
+
+    def lookup(self, restaurants: list[dict], dataset_version: str) -> dict[int, str]:
+        """Known reasons for the candidates, by 1-based candidate id."""
+        known = {}
+        if not self.enabled:
+            return known
+        for i, r in enumerate(restaurants, 1):
+            if r.get("restaurant_id") is None:
+                continue
+            reason = self.get(r["restaurant_id"], dataset_version)
+            LLM_REASON_CACHE.inc(result="miss" if reason is None else "hit")
+            if reason is not None:
+                known[i] = reason
+        return known
+
+    def clear(self) -> None:
+        for tier in self.tiers:
+            tier.clear()
+
+
+_store: ReasonStore | None = None
+
+
+def get_reason_store() -> ReasonStore:
+    """Process-wide store configured from env on first use (no tiers when disabled)."""
+    global _store
+    if _store is None:
+        tiers = []
+        if os.getenv("LLM_REASON_CACHE", "true").strip().lower() not in ("0", "false", "no", "off"):
+            ttl = get_float_env("LLM_REASON_CACHE_TTL", 86400.0)
+            tiers.append(MemoryCache(get_int_env("LLM_REASON_CACHE_MAX_ENTRIES", 10000), ttl))
+            sqlite_path = os.getenv("LLM_CACHE_SQLITE_PATH", "").strip()
+            if sqlite_path:
+                tiers.append(SQLiteCache(sqlite_path, ttl))
+        _store = ReasonStore(tiers)
+    return _store
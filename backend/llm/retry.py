@@ -0,0 +1,125 @@
+"""
+Retry policy and end-to-end deadline for LLM calls.
+
+The router opens a deadline_scope for each request; every provider attempt
+(retries, fallbacks, hedges) reads it from a contextvar and clamps its timeout
+to the time left, so the sum of attempts never exceeds the request budget.
+
+Retries use exponential backoff with full jitter, honor Retry-After, and only
+happen for transient failures (429, 5xx gateway errors, transport errors).
+
+Config (env):
+  LLM_RETRY_MAX_ATTEMPTS        attempts per provider call, including the first (default 3)
+  LLM_RETRY_BASE_DELAY          first backoff ceiling in seconds (default 0.25)
+  LLM_RETRY_MAX_DELAY           backoff ceiling in seconds (default 4.0)
+  LLM_RETRY_MAX_RETRY_AFTER     longest Retry-After we are willing to wait (default 10)
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+
+from backend.config import get_float_env, get_int_env
+from backend.metrics import Counter
+
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+LLM_RETRIES = Counter("llm_retries_total", "LLM call retries by provider and reason.", ("provider", "reason"))
+LLM_DEADLINE_EXCEEDED = Counter("llm_deadline_exceeded_total", "LLM calls skipped for lack of budget.", ("provider",))
+
+MIN_ATTEMPT_SECONDS = 0.05  # not worth starting an attempt with less time than this
+
+
+class Deadline:
+    """Absolute point in (monotonic) time by which the request must finish."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def clamp(self, timeout: float) -> float:
+        """timeout, shortened to the time left."""
+        return min(timeout, self.remaining())
+
+
+_deadline: ContextVar[Deadline | None] = ContextVar("llm_deadline", default=None)
+
+
+def current_deadline() -> Deadline | None:
+    return _deadline.get()
+
+
+@contextmanager
+def deadline_scope(seconds: float | None):
+    """Set the deadline for LLM calls made inside the block (None = no deadline)."""
+    token = _deadline.set(Deadline(seconds) if seconds is not None else None)
+    try:
+        yield _deadline.get()
+    finally:
+        _deadline.reset(token)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After as seconds (delta-seconds or HTTP-date); None if absent/invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, bounded by attempts and the deadline."""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.25,
+        max_delay: float = 4.0,
+        max_retry_after: float = 10.0,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def next_delay(
+        self,
+        attempt: int,
+        retryable: bool,
+        retry_after: float | None = None,
+        deadline: Deadline | None = None,
+    ) -> float | None:
+        """Seconds to sleep before the next attempt, or None to stop retrying."""
+        if not retryable or attempt >= self.max_attempts:
+            return None
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            delay = retry_after
+        else:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if deadline is not None and delay + MIN_ATTEMPT_SECONDS >= deadline.remaining():
+            return None
+        return delay
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Policy from env (read per call, like the provider config)."""
+    return RetryPolicy(
+        max_attempts=get_int_env("LLM_RETRY_MAX_ATTEMPTS", 3),
+        base_delay=get_float_env("LLM_RETRY_BASE_DELAY", 0.25),
+        max_delay=get_float_env("LLM_RETRY_MAX_DELAY", 4.0),
+        max_retry_after=get_float_env("LLM_RETRY_MAX_RETRY_AFTER", 10.0),
+    )
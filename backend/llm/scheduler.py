@@ -0,0 +1,269 @@
+"""
+Outbound scheduling of LLM calls: per-provider token buckets and priority classes.
+
+Every provider attempt first acquires capacity from its provider's buckets
+(requests per minute and, optionally, tokens per minute). While a provider is
+saturated, callers queue: interactive requests before batch jobs before
+background work, FIFO within a class. A waiter's class improves by one for every
+aging interval it has waited, so lower classes are delayed but never starved.
+
+Priority is set for a block of code with priority_scope() (a contextvar, like
+the request deadline); callers that set nothing are interactive. A caller gives
+up as soon as its deadline (or LLM_SCHEDULER_MAX_WAIT) would pass before its turn.
+
+Providers without limits are not queued.
+
+Buckets and queues live in process memory. Each process (every API worker, a
+precompute run) gets the full limits to itself and orders only its own calls,
+so set the limits to each process's share of the provider quota.
+
+Config (env, read once):
+  LLM_RPM                         requests per minute per provider, e.g. gemini=15,grok=60; a bare
+                                  number applies to every provider (default unlimited)
+  LLM_TPM                         tokens per minute per provider, e.g. gemini=1000000 (default unlimited)
+  LLM_SCHEDULER_AGING_SECONDS     wait that promotes a request by one class (default 10)
+  LLM_SCHEDULER_MAX_WAIT          longest queue wait without a request deadline (default 30)
+"""
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from backend.config import get_float_env
+from backend.llm.retry import current_deadline
+from backend.metrics import Counter, Gauge, Histogram
+
+PRIORITIES = {"interactive": 0, "batch": 1, "background": 2}
+POLL_SECONDS = 0.05  # how often a queued caller that is not at the head re-checks
+MAX_SLEEP = 1.0  # the head re-checks at least this often (token refunds, priority changes)
+
+LLM_QUEUE_WAIT = Histogram(
+    "llm_scheduler_wait_seconds", "Time LLM calls waited for provider capacity.", ("provider", "priority")
+)
+LLM_QUEUE_DEPTH = Gauge("llm_scheduler_queue_depth", "LLM calls waiting for provider capacity.", ("provider",))
+LLM_QUEUE_TIMEOUTS = Counter(
+    "llm_scheduler_timeouts_total", "LLM calls that gave up waiting for provider capacity.", ("provider", "priority")
+)
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default="interactive")
+
+
+@contextmanager
+def priority_scope(name: str):
+    """Run LLM calls made inside the block at priority name (interactive, batch or background)."""
+    if name not in PRIORITIES:
+        raise ValueError(f"unknown priority {name!r}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class TokenBucket:
+    """Refills at per_minute / 60 per second up to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount (capped at capacity) is available."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "tokens", "enqueued")
+
+    def __init__(self, priority: int, seq: int, tokens: int):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+
+
+class ProviderQueue:
+    """Buckets and waiting callers of one provider. Safe for threads and event loops alike."""
+
+    def __init__(self, provider: str, rpm: float | None, tpm: float | None, aging: float = 10.0):
+        self.provider = provider
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.aging = aging
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _rank(self, waiter: _Waiter, now: float) -> tuple[float, int]:
+        aged = (now - waiter.enqueued) / self.aging if self.aging > 0 else 0.0
+        return waiter.priority - aged, waiter.seq
+
+    def _join(self, priority: str, tokens: int) -> _Waiter:
+        with self._lock:
+            waiter = _Waiter(PRIORITIES[priority], next(self._seq), tokens)
+            self._waiters.append(waiter)
+            LLM_QUEUE_DEPTH.set(len(self._waiters), provider=self.provider)
+        return waiter
+
+    def _leave(self, waiter: _Waiter) -> None:
+        with self._lock:
+            self._waiters.remove(waiter)
+            LLM_QUEUE_DEPTH.set(len(self._waiters), provider=self.provider)
+
+    def _poll(self, waiter: _Waiter) -> float:
+        """Take capacity if waiter is first in line and it is available (returns 0), else seconds to sleep."""
+        now = time.monotonic()
+        with self._lock:
+            head = min(self._waiters, key=lambda w: self._rank(w, now))
+            if head is not waiter:
+                return POLL_SECONDS
+            wait = max(
+                self.requests.wait_time(1, now) if self.requests else 0.0,
+                self.tokens.wait_time(waiter.tokens, now) if self.tokens else 0.0,
+            )
+            if wait > 0:
+                return wait
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(waiter.tokens)
+            return 0.0
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Correct the token bucket once the provider reported the real token count."""
+        if self.tokens and actual != estimated:
+            with self._lock:
+                if actual > estimated:
+                    self.tokens.take(actual - estimated)
+                else:
+                    self.tokens.give(estimated - actual)
+
+
+class OutboundScheduler:
+    """Per-provider queues, created from LLM_RPM / LLM_TPM."""
+
+    def __init__(self, rpm: dict[str, float], tpm: dict[str, float], aging: float = 10.0, max_wait: float = 30.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.aging = aging
+        self.max_wait = max_wait
+        self._queues: dict[str, ProviderQueue | None] = {}
+        self._lock = threading.Lock()
+
+    def queue(self, provider: str) -> ProviderQueue | None:
+        """The provider's queue, or None when it has no limits."""
+        with self._lock:
+            if provider not in self._queues:
+                rpm = self.rpm.get(provider, self.rpm.get("*"))
+                tpm = self.tpm.get(provider, self.tpm.get("*"))
+                self._queues[provider] = ProviderQueue(provider, rpm, tpm, self.aging) if rpm or tpm else None
+            return self._queues[provider]
+
+    def _budget(self) -> float:
+        deadline = current_deadline()
+        return deadline.remaining() if deadline else self.max_wait
+
+    def acquire(self, provider: str, tokens: int = 0) -> bool:
+        """Block until provider has capacity for one call of ~tokens. False if the wait budget ran out."""
+        queue = self.queue(provider)
+        if queue is None:
+            return True
+        priority, started = current_priority(), time.monotonic()
+        give_up = started + self._budget()
+        waiter = queue._join(priority, tokens)
+        try:
+            while (sleep := queue._poll(waiter)) > 0:
+                if time.monotonic() + sleep > give_up:
+                    LLM_QUEUE_TIMEOUTS.inc(provider=provider, priority=priority)
+                    return False
+                time.sleep(min(sleep, MAX_SLEEP))
+        finally:
+            queue._leave(waiter)
+        LLM_QUEUE_WAIT.observe(time.monotonic() - started, provider=provider, priority=priority)
+        return True
+
+    async def acquire_async(self, provider: str, tokens: int = 0) -> bool:
+        """Async variant of acquire."""
+        queue = self.queue(provider)
+        if queue is None:
+            return True
+        priority, started = current_priority(), time.monotonic()
+        give_up = started + self._budget()
+        waiter = queue._join(priority, tokens)
+        try:
+            while (sleep := queue._poll(waiter)) > 0:
+                if time.monotonic() + sleep > give_up:
+                    LLM_QUEUE_TIMEOUTS.inc(provider=provider, priority=priority)
+                    return False
+                await asyncio.sleep(min(sleep, MAX_SLEEP))
+        finally:
+            queue._leave(waiter)
+        LLM_QUEUE_WAIT.observe(time.monotonic() - started, provider=provider, priority=priority)
+        return True
+
+    def settle(self, provider: str, estimated: int, actual: int) -> None:
+        queue = self.queue(provider)
+        if queue is not None:
+            queue.settle(estimated, actual)
+
+
+def _parse_limits(raw: str) -> dict[str, float]:
+    """'gemini=15,grok=60' -> {'gemini': 15.0, 'grok': 60.0}; a bare number is stored under '*'."""
+    limits = {}
+    for part in raw.split(","):
+        name, _, value = part.rpartition("=")
+        name = name or "*"
+        try:
+            if float(value) > 0:
+                limits[name.strip().lower()] = float(value)
+        except ValueError:
+            continue
+    return limits
+
+
+_scheduler: OutboundScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> OutboundScheduler:
+    """Process-wide scheduler (limits read from env on first use)."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = OutboundScheduler(
+                    _parse_limits(os.getenv("LLM_RPM", "")),
+                    _parse_limits(os.getenv("LLM_TPM", "")),
+                    aging=get_float_env("LLM_SCHEDULER_AGING_SECONDS", 10.0),
+                    max_wait=get_float_env("LLM_SCHEDULER_MAX_WAIT", 30.0),
+                )
+    return _scheduler
+
+
+def reset_scheduler() -> None:
+    """Forget limits and queues; the next call re-reads the env (tests)."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = None
@@ -0,0 +1,82 @@
+"""
+Single-flight request coalescing: concurrent calls with the same key share one
+in-progress execution and all receive its result (or exception).
+SingleFlight is for threads (sync path), AsyncSingleFlight for coroutines.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable
+
+from backend.metrics import Counter
+
+LLM_COALESCED = Counter(
+    "llm_coalesced_calls_total", "LLM calls saved by joining an identical in-flight request.", ("path",)
+)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Thread-based coalescing of identical calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            LLM_COALESCED.inc(path="sync")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """
+    Coroutine coalescing. The shared work runs as its own task, so a caller that
+    is cancelled (e.g. client disconnect) does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._tasks: dict[tuple[int, str], asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[flight_key] = task
+            task.add_done_callback(lambda t: self._forget(flight_key, t))
+        else:
+            LLM_COALESCED.inc(path="async")
+        return await asyncio.shield(task)
+
+    def _forget(self, flight_key: tuple[int, str], task: asyncio.Task) -> None:
+        if self._tasks.get(flight_key) is task:
+            del self._tasks[flight_key]
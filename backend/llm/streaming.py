@@ -0,0 +1,58 @@
+"""
+Consumption of streamed OpenAI-compatible chat/completions responses (SSE).
+
+ChatStream collects the content deltas of a "stream": true response into the
+same shape as a non-streamed reply ({"choices": [{"message": {...}}], "usage"}),
+so parsing and usage accounting do not care how the reply arrived. The time of
+the first content token is exported separately from time to first byte.
+"""
+
+import json
+import time
+from typing import Any
+
+from backend.metrics import Histogram
+
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "llm_time_to_first_token_seconds", "Time until the first streamed content token.", ("provider", "model")
+)
+
+
+class ChatStream:
+    """Accumulates SSE lines of one streamed chat/completions response."""
+
+    def __init__(self, provider: str, model: str, started: float):
+        self.provider = provider
+        self.model = model
+        self.started = started
+        self.first_token: float | None = None
+        self._parts: list[str] = []
+        self._usage: dict[str, Any] | None = None
+
+    def feed(self, line: str) -> None:
+        line = line.strip()
+        if not line.startswith("data:"):
+            return
+        payload = line[len("data:"):].strip()
+        if not payload or payload == "[DONE]":
+            return
+        try:
+            chunk = json.loads(payload)
+        except json.JSONDecodeError:
+            return
+        if isinstance(chunk.get("usage"), dict):
+            self._usage = chunk["usage"]
+        for choice in chunk.get("choices") or []:
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                if self.first_token is None:
+                    self.first_token = time.perf_counter() - self.started
+                    LLM_TIME_TO_FIRST_TOKEN.observe(self.first_token, provider=self.provider, model=self.model)
+                self._parts.append(content)
+
+    def data(self) -> dict[str, Any]:
+        """The streamed reply as a non-streamed chat/completions body."""
+        data: dict[str, Any] = {"choices": [{"message": {"role": "assistant", "content": "".join(self._parts)}}]}
+        if self._usage is not None:
+            data["usage"] = self._usage
+        return data
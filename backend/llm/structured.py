@@ -0,0 +1,124 @@
+"""
+Structured output for LLM rankings.
+
+response_schema() turns the LLMRanking pydantic model (or the model set with
+response_model_scope, e.g. LLMBatchRanking for batched prompts) into the JSON
+schema each provider's native JSON mode expects (Gemini responseSchema,
+OpenAI-compatible response_format). extract_json() parses the reply, tolerating markdown fences,
+surrounding prose, trailing commas and output cut off by the token cap.
+
+Config (env):
+  LLM_JSON_MODE   schema (default), json (JSON without a schema) or off
+"""
+
+import json
+import os
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from pydantic import BaseModel
+
+from backend.schemas import LLMRanking
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_FENCE = re.compile(r"```(?:json)?\s*([\s\S]*?)\s*(?:```|$)")
+_decoder = json.JSONDecoder()
+
+_response_model: ContextVar[type[BaseModel]] = ContextVar("llm_response_model", default=LLMRanking)
+
+
+@contextmanager
+def response_model_scope(model: type[BaseModel]):
+    """Ask for replies shaped like model (instead of LLMRanking) for LLM calls made inside the block."""
+    token = _response_model.set(model)
+    try:
+        yield
+    finally:
+        _response_model.reset(token)
+
+
+def json_mode() -> str:
+    mode = os.getenv("LLM_JSON_MODE", "schema").strip().lower()
+    return mode if mode in ("schema", "json") else "off"
+
+
+def _inline(node: Any, defs: dict[str, Any]) -> Any:
+    """Resolve $ref and drop titles and docstrings (not accepted, or not useful, everywhere)."""
+    if isinstance(node, list):
+        return [_inline(n, defs) for n in node]
+    if not isinstance(node, dict):
+        return node
+    if "$ref" in node:
+        return _inline(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+    return {k: _inline(v, defs) for k, v in node.items() if k not in ("title", "description", "$defs")}
+
+
+def _strict(node: Any) -> Any:
+    """OpenAI strict mode: every object closed, every property required."""
+    if isinstance(node, list):
+        return [_strict(n) for n in node]
+    if not isinstance(node, dict):
+        return node
+    node = {k: _strict(v) for k, v in node.items()}
+    if node.get("type") == "object":
+        node["additionalProperties"] = False
+        node["required"] = list(node.get("properties", {}))
+    return node
+
+
+def _gemini(node: Any) -> Any:
+    """Gemini's OpenAPI subset uses upper-case type names."""
+    if isinstance(node, list):
+        return [_gemini(n) for n in node]
+    if not isinstance(node, dict):
+        return node
+    return {k: (v.upper() if k == "type" else _gemini(v)) for k, v in node.items()}
+
+
+def response_schema(provider: str) -> dict[str, Any]:
+    """JSON schema for the current response model in the dialect of provider ('gemini' or OpenAI-compatible)."""
+    raw = _response_model.get().model_json_schema()
+    schema = _inline(raw, raw.get("$defs", {}))
+    return _gemini(schema) if provider == "gemini" else _strict(schema)
+
+
+def _salvage_items(text: str) -> list[dict] | None:
+    """Complete objects from a recommendations array that was cut off mid-way."""
+    match = re.search(r'"recommendations"\s*:\s*\[', text)
+    if not match:
+        return None
+    items, pos = [], match.end()
+    while True:
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(text) or text[pos] != "{":
+            break
+        try:
+            item, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break
+        items.append(item)
+    return items or None
+
+
+def extract_json(text: str) -> dict | None:
+    """Parse an LLM reply into a dict; None if nothing usable is found."""
+    text = text.strip()
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    for candidate in (text, _TRAILING_COMMA.sub(r"\1", text)):
+        start = min((i for i in (candidate.find("{"), candidate.find("[")) if i >= 0), default=-1)
+        if start < 0:
+            return None
+        try:
+            parsed, _ = _decoder.raw_decode(candidate, start)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, list):
+            return {"recommendations": parsed}
+        return parsed if isinstance(parsed, dict) else None
+    items = _salvage_items(text)
+    return {"recommendations": items} if items else None
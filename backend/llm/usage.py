@@ -0,0 +1,145 @@
+"""
+LLM usage accounting: prompt/completion/cached tokens (as reported by the provider),
+time to first byte and total latency for every provider call.
+
+Exported as metrics, and optionally appended as one JSON line per call to a
+usage log that scripts/llm_usage_summary.py aggregates. Lines are written by a
+background thread, so async callers never block the event loop on disk I/O;
+flush_usage_log() waits for pending lines (app shutdown, process exit, tests).
+
+Config (env):
+  LLM_USAGE_LOG   path of the append-only usage log (default off)
+"""
+
+import json
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from backend.linelog import LineWriter
+from backend.metrics import Counter, Histogram
+
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by LLM providers.", ("provider", "model", "kind"))
+LLM_TIME_TO_FIRST_BYTE = Histogram(
+    "llm_time_to_first_byte_seconds", "Time until the provider's response headers arrive.", ("provider", "model")
+)
+
+_writer = LineWriter("llm-usage-log")
+
+
+def parse_usage(data: Any) -> tuple[int | None, int | None]:
+    """(prompt tokens, completion tokens) from a Gemini or OpenAI-compatible response body."""
+    if not isinstance(data, dict):
+        return None, None
+    gemini = data.get("usageMetadata")
+    if isinstance(gemini, dict):
+        return gemini.get("promptTokenCount"), gemini.get("candidatesTokenCount")
+    openai = data.get("usage")
+    if isinstance(openai, dict):
+        return openai.get("prompt_tokens"), openai.get("completion_tokens")
+    return None, None
+
+
+def parse_cached_tokens(data: Any) -> int | None:
+    """Prompt tokens served from the provider's context/prompt cache, if reported."""
+    if not isinstance(data, dict):
+        return None
+    if isinstance(data.get("usageMetadata"), dict):
+        return data["usageMetadata"].get("cachedContentTokenCount")
+    details = (data.get("usage") or {}).get("prompt_tokens_details") if isinstance(data.get("usage"), dict) else None
+    return details.get("cached_tokens") if isinstance(details, dict) else None
+
+
+def record_usage(
+    provider: str,
+    model: str,
+    outcome: str,
+    seconds: float,
+    ttfb: float | None = None,
+    prompt_tokens: int | None = None,
+    completion_tokens: int | None = None,
+    cached_tokens: int | None = None,
+) -> None:
+    """Count one provider call in the metrics and, if LLM_USAGE_LOG is set, the usage log."""
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, provider=provider, model=model, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, provider=provider, model=model, kind="completion")
+    if cached_tokens:
+        LLM_TOKENS.inc(cached_tokens, provider=provider, model=model, kind="cached")
+    if ttfb is not None:
+        LLM_TIME_TO_FIRST_BYTE.observe(ttfb, provider=provider, model=model)
+
+    path = os.getenv("LLM_USAGE_LOG", "").strip()
+    if not path:
+        return
+    line = json.dumps({
+        "ts": round(time.time(), 3),
+        "provider": provider,
+        "model": model,
+        "outcome": outcome,
+        "seconds": round(seconds, 4),
+        "ttfb": None if ttfb is None else round(ttfb, 4),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cached_tokens": cached_tokens,
+    })
+    _writer.write(path, line)
+
+
+def flush_usage_log() -> None:
+    """Wait until every recorded call is in the usage log."""
+    _writer.flush()
+
+
+def read_usage_log(path: str | Path, since: float | None = None) -> Iterator[dict]:
+    """Records from a usage log (skipping unreadable lines), optionally only those at or after since."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if since is None or record.get("ts", 0) >= since:
+                yield record
+
+
+def _percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def summarize(records: Iterable[dict]) -> list[dict]:
+    """Per (provider, model): calls, errors, token totals/averages and latency/TTFB percentiles."""
+    groups: dict[tuple[str, str], list[dict]] = defaultdict(list)
+    for record in records:
+        groups[(record.get("provider", "?"), record.get("model", "?"))].append(record)
+
+    rows = []
+    for (provider, model), items in sorted(groups.items()):
+        ok = [r for r in items if r.get("outcome") == "ok"]
+        prompt = [r["prompt_tokens"] for r in ok if r.get("prompt_tokens") is not None]
+        completion = [r["completion_tokens"] for r in ok if r.get("completion_tokens") is not None]
+        cached = [r["cached_tokens"] for r in ok if r.get("cached_tokens")]
+        seconds = [r["seconds"] for r in ok if r.get("seconds") is not None]
+        ttfb = [r["ttfb"] for r in ok if r.get("ttfb") is not None]
+        rows.append({
+            "provider": provider,
+            "model": model,
+            "calls": len(items),
+            "errors": len(items) - len(ok),
+            "prompt_tokens": sum(prompt),
+            "completion_tokens": sum(completion),
+            "cached_tokens": sum(cached),
+            "avg_prompt_tokens": sum(prompt) / len(prompt) if prompt else None,
+            "avg_completion_tokens": sum(completion) / len(completion) if completion else None,
+            "p50_seconds": _percentile(seconds, 50),
+            "p95_seconds": _percentile(seconds, 95),
+            "p50_ttfb": _percentile(ttfb, 50),
+            "p95_ttfb": _percentile(ttfb, 95),
+        })
+    return rows
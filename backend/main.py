@@ -8,17 +8,24 @@ import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
-from backend.routers import cities, restaurants, recommendations
+from backend.metrics import MetricsMiddleware
+from backend.routers import cities, debug, metrics, restaurants, recommendations
+from backend.tracing import TracingMiddleware, configure_logging, flush_exporters
 
 logger = logging.getLogger(__name__)
+configure_logging()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """On startup: load data from HuggingFace if DB is empty."""
+    """On startup: load data from HuggingFace if DB is empty, parse LLM provider config, open HTTP pools and preload local models."""
     from backend.ingest import is_db_empty, run_ingest
+    from backend.llm.client import load_providers, warm_up_providers
+    from backend.llm.http import aclose_clients, init_clients
+    from backend.llm.usage import flush_usage_log
 
     if is_db_empty():
         logger.info("Database empty - loading data from HuggingFace (this may take 1-2 min)...")
@@ -27,7 +34,13 @@ async def lifespan(app: FastAPI):
             logger.info("Data load complete.")
         except Exception as e:
             logger.warning("Auto-ingest failed: %s. Run: python scripts/ingest_zomato_data.py", e)
+    load_providers()
+    init_clients()
+    await warm_up_providers()
     yield
+    await aclose_clients()
+    await run_in_threadpool(flush_usage_log)
+    await run_in_threadpool(flush_exporters)
 
 
 app = FastAPI(
@@ -37,6 +50,8 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -51,9 +66,21 @@ app.add_middleware(
 app.include_router(cities.router)
 app.include_router(restaurants.router)
 app.include_router(recommendations.router)
+app.include_router(metrics.router)
+app.include_router(debug.router)
 
 
 @app.get("/")
 def root():
     """Health check."""
     return {"status": "ok", "docs": "/docs"}
+
+
+@app.get("/health")
+def health():
+    """Service health with LLM provider circuit breaker states."""
+    from backend.llm.breaker import OPEN, breaker_states
+
+    providers = breaker_states()
+    degraded = any(state == OPEN for state in providers.values())
+    return {"status": "degraded" if degraded else "ok", "providers": providers}
@@ -3,7 +3,7 @@ SQLAlchemy models matching Phase 1 schema.
 Uses JSON (not JSONB) for SQLite compatibility.
 """
 
-from sqlalchemy import Column, Integer, Float, Boolean, Text, CheckConstraint, JSON
+from sqlalchemy import Column, Integer, Float, Boolean, Text, CheckConstraint, JSON, UniqueConstraint
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -22,3 +22,27 @@ class Restaurant(Base):
     has_online_delivery = Column(Boolean)
     cuisines = Column(Text)
     raw_data = Column(JSON)
+
+
+class DatasetMeta(Base):
+    """Key/value facts about the loaded dataset (e.g. version, written by ingest)."""
+
+    __tablename__ = "dataset_meta"
+
+    key = Column(Text, primary_key=True)
+    value = Column(Text)
+
+
+class PrecomputedRecommendation(Base):
+    """Recommendations generated offline for one (city, price_category, limit) at a dataset version."""
+
+    __tablename__ = "precomputed_recommendations"
+    __table_args__ = (UniqueConstraint("city", "price_category", "limit", "dataset_version"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    city = Column(Text, nullable=False)
+    price_category = Column(Text, nullable=False)
+    limit = Column(Integer, nullable=False)
+    dataset_version = Column(Text, nullable=False)
+    recommendations = Column(JSON, nullable=False)  # list of RecommendationItem dicts
+    created_at = Column(Float)  # unix time
@@ -0,0 +1,130 @@
+"""
+Offline precompute of recommendations for every (city, price_category, limit).
+Run after ingest: python scripts/precompute_recommendations.py
+POST /recommendations serves these rows directly and only calls the LLM on a miss.
+
+One LLM call is made per (city, price_category) at the largest limit; smaller
+limits store the top-N prefix of the same ranking. Each combination upserts its
+rows in its own transaction, so an interrupted run leaves existing rows in
+place; rows for older dataset versions are deleted once the run finishes.
+
+Calls run at "batch" priority and are paced by the outbound scheduler (LLM_RPM /
+LLM_TPM, see backend.llm.scheduler). Its buckets are per process, so they only
+pace this run: they do not share capacity with a running API.
+"""
+
+import asyncio
+import logging
+import time
+
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.config import get_db_url
+from backend.dataset import read_dataset_version
+from backend.llm.client import rank_restaurants_async
+from backend.llm.scheduler import priority_scope
+from backend.models import Base, PrecomputedRecommendation, Restaurant
+from backend.routers.recommendations import (
+    LIMIT_MAX,
+    LIMIT_MIN,
+    VALID_PRICE_CATEGORIES,
+    build_recommendation_items,
+    query_candidates,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def _precompute_combo(
+    session_factory,
+    city: str,
+    price_category: str,
+    limits: list[int],
+    version: str,
+    semaphore: asyncio.Semaphore,
+) -> int:
+    """Rank one (city, price_category) and store a row per limit. Returns rows stored."""
+    with session_factory() as session:
+        candidates = query_candidates(session, city, price_category, limit=max(limits))
+    if not candidates:
+        return 0
+
+    async with semaphore:
+        with priority_scope("batch"):
+            llm_result = await rank_restaurants_async(candidates, city, price_category, max(limits))
+    if "error" in llm_result:
+        logger.warning("Precompute failed for %s / %s: %s", city, price_category, llm_result["error"][:120])
+        return 0
+
+    items = build_recommendation_items(llm_result, candidates, max(limits))
+    if not items:
+        return 0
+
+    now = time.time()
+    with session_factory() as session:
+        existing = {
+            row.limit: row
+            for row in session.execute(
+                select(PrecomputedRecommendation).where(
+                    PrecomputedRecommendation.city == city,
+                    PrecomputedRecommendation.price_category == price_category,
+                    PrecomputedRecommendation.dataset_version == version,
+                )
+            ).scalars()
+        }
+        for limit in limits:
+            recommendations = [item.model_dump() for item in items[:limit]]
+            row = existing.get(limit)
+            if row is None:
+                session.add(
+                    PrecomputedRecommendation(
+                        city=city,
+                        price_category=price_category,
+                        limit=limit,
+                        dataset_version=version,
+                        recommendations=recommendations,
+                        created_at=now,
+                    )
+                )
+            else:
+                row.recommendations = recommendations
+                row.created_at = now
+        session.commit()
+    return len(limits)
+
+
+async def run_precompute(
+    db_url: str | None = None,
+    limits: list[int] | None = None,
+    concurrency: int = 4,
+) -> tuple[int, int]:
+    """
+    Regenerate precomputed_recommendations for the current dataset version.
+    Returns (combinations attempted, rows stored).
+    """
+    limits = sorted(limits or range(LIMIT_MIN, LIMIT_MAX + 1))
+    url = db_url or get_db_url()
+    engine = create_engine(url, connect_args={"check_same_thread": False} if "sqlite" in url else {})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    with Session() as session:
+        version = read_dataset_version(session)
+        cities = [row[0] for row in session.execute(select(Restaurant.city).distinct().order_by(Restaurant.city))]
+
+    combos = [(city, price) for city in cities for price in VALID_PRICE_CATEGORIES]
+    logger.info("Precomputing %d combinations x %d limits (dataset %s)...", len(combos), len(limits), version)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    stored = await asyncio.gather(
+        *(_precompute_combo(Session, city, price, limits, version, semaphore) for city, price in combos)
+    )
+
+    # Rows for older versions are never served; drop them only once this run has completed
+    with Session() as session:
+        session.execute(delete(PrecomputedRecommendation).where(PrecomputedRecommendation.dataset_version != version))
+        session.commit()
+
+    logger.info("Combinations: %d, rows stored: %d", len(combos), sum(stored))
+    return len(combos), sum(stored)
@@ -0,0 +1,199 @@
+"""
+Local TF-IDF retrieval for free-text preferences ("spicy biryani with delivery").
+
+Each restaurant is indexed on name, cuisines and the dataset's dish_liked and
+rest_type fields. A query is scored by cosine similarity against the restaurants
+of one (city, price_category) through an inverted index, so only postings of the
+query's terms are touched; no network, GPU or numpy needed. Ties (and queries
+that match nothing) fall back to rating order, i.e. the usual candidates.
+
+An inverted index is used instead of a dense NumPy TF-IDF matrix: numpy is not a
+dependency of the API, queries have a handful of terms, so scoring their
+postings is cheaper than a matrix-vector product over every restaurant, and the
+index serialises to plain JSON.
+
+Ingest builds and saves the index; the API loads it on first use, and rebuilds
+it from the DB if the file is missing or from another dataset version.
+
+Config (env):
+  RETRIEVAL_INDEX_PATH   where the index is stored (default data/retrieval_index.json)
+"""
+
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.dataset import get_dataset_version, read_dataset_version
+from backend.models import Restaurant
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and any are at for from good i in is it me near of on or place places please restaurant restaurants "
+    "some something the to want with".split()
+)
+TEXT_FIELDS = ("dish_liked", "rest_type")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased alphanumeric terms without stopwords; plural 's' dropped from longer words."""
+    terms = []
+    for term in _TOKEN.findall((text or "").lower()):
+        if term in STOPWORDS:
+            continue
+        if len(term) > 4 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+def document_text(restaurant: Restaurant) -> str:
+    """Indexed text of one restaurant."""
+    raw = restaurant.raw_data if isinstance(restaurant.raw_data, dict) else {}
+    parts = [restaurant.name, restaurant.cuisines, *(raw.get(f) for f in TEXT_FIELDS)]
+    return " ".join(str(p) for p in parts if p)
+
+
+def _weights(terms: list[str], idf: dict[str, float]) -> dict[str, float]:
+    """L2-normalised (1 + log tf) * idf vector; terms unknown to idf are dropped."""
+    vector = {t: (1 + math.log(n)) * idf[t] for t, n in Counter(terms).items() if t in idf}
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    return {t: w / norm for t, w in vector.items()} if norm else {}
+
+
+class TfidfIndex:
+    """Inverted TF-IDF index over restaurants, grouped by (city, price_category)."""
+
+    def __init__(
+        self,
+        version: str,
+        idf: dict[str, float],
+        postings: dict[str, list[tuple[int, float]]],
+        groups: dict[str, list[int]],
+        ratings: dict[int, float],
+    ):
+        self.version = version
+        self.idf = idf
+        self.postings = postings
+        self.groups = groups
+        self.ratings = ratings
+
+    @staticmethod
+    def _group(city: str, price_category: str) -> str:
+        return f"{city}|{price_category}"
+
+    @classmethod
+    def build(cls, rows: Iterable[tuple[int, str, str, float | None, str]], version: str) -> "TfidfIndex":
+        """rows: (restaurant id, city, price_category, rating, text)."""
+        docs, groups, ratings = {}, defaultdict(list), {}
+        df: Counter = Counter()
+        for restaurant_id, city, price_category, rating, text in rows:
+            terms = tokenize(text)
+            docs[restaurant_id] = terms
+            df.update(set(terms))
+            groups[cls._group(city, price_category)].append(restaurant_id)
+            ratings[restaurant_id] = rating or 0.0
+        idf = {t: math.log((1 + len(docs)) / (1 + n)) + 1 for t, n in df.items()}
+        postings = defaultdict(list)
+        for restaurant_id, terms in docs.items():
+            for term, weight in _weights(terms, idf).items():
+                postings[term].append((restaurant_id, round(weight, 5)))
+        return cls(version, idf, dict(postings), dict(groups), ratings)
+
+    def search(self, query: str, city: str, price_category: str, k: int = 20) -> list[int]:
+        """Ids of the k best restaurants in (city, price_category): cosine score, then rating."""
+        members = self.groups.get(self._group(city, price_category), [])
+        scores: dict[int, float] = defaultdict(float)
+        member_set = set(members)
+        for term, q in _weights(tokenize(query), self.idf).items():
+            for restaurant_id, weight in self.postings.get(term, ()):
+                if restaurant_id in member_set:
+                    scores[restaurant_id] += q * weight
+        return heapq.nlargest(k, members, key=lambda i: (scores.get(i, 0.0), self.ratings.get(i, 0.0)))
+
+    def to_dict(self) -> dict:
+        return {
+            "version": self.version,
+            "idf": self.idf,
+            "postings": self.postings,
+            "groups": self.groups,
+            "ratings": {str(i): r for i, r in self.ratings.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TfidfIndex":
+        return cls(
+            data["version"],
+            data["idf"],
+            {t: [(int(i), w) for i, w in p] for t, p in data["postings"].items()},
+            {g: [int(i) for i in ids] for g, ids in data["groups"].items()},
+            {int(i): r for i, r in data["ratings"].items()},
+        )
+
+
+def index_path() -> Path:
+    return Path(os.getenv("RETRIEVAL_INDEX_PATH") or Path(__file__).resolve().parent.parent / "data" / "retrieval_index.json")
+
+
+def build_index(session: Session, version: str | None = None) -> TfidfIndex:
+    """Index every restaurant in the session's database."""
+    restaurants = session.execute(select(Restaurant)).scalars()
+    rows = ((r.id, r.city, r.price_category, r.rating, document_text(r)) for r in restaurants)
+    return TfidfIndex.build(rows, version or read_dataset_version(session))
+
+
+def save_index(index: TfidfIndex, path: Path | None = None) -> None:
+    path = path or index_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(index.to_dict()))
+    tmp.replace(path)
+
+
+def load_index(path: Path | None = None) -> TfidfIndex | None:
+    """Saved index, or None if missing or unreadable."""
+    try:
+        return TfidfIndex.from_dict(json.loads((path or index_path()).read_text()))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+_index: TfidfIndex | None = None
+_lock = threading.Lock()
+
+
+def get_index(session: Session) -> TfidfIndex:
+    """Index for the current dataset version: in memory, else from disk, else built (and saved)."""
+    global _index
+    version = get_dataset_version()
+    if _index is not None and _index.version == version:
+        return _index
+    with _lock:
+        if _index is None or _index.version != version:
+            index = load_index()
+            if index is None or index.version != version:
+                logger.info("Building retrieval index for dataset version %s", version)
+                index = build_index(session, version)
+                try:
+                    save_index(index)
+                except OSError as e:
+                    logger.warning("Could not save retrieval index: %s", e)
+            _index = index
+    return _index
+
+
+def reset_index() -> None:
+    """Forget the in-memory index (tests, re-ingest in-process)."""
+    global _index
+    _index = None
@@ -0,0 +1,24 @@
+"""
+GET /debug/traces - recent tracing spans from the in-memory exporter.
+Off unless TRACE_EXPORTERS includes memory; the endpoint has no auth.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from backend.tracing import get_ring_buffer
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get("/traces")
+def list_traces(
+    limit: int = Query(100, ge=1, le=1000, description="Max spans"),
+    trace_id: Optional[str] = Query(None, description="Only spans for this request id"),
+):
+    """Return the most recent spans, oldest first."""
+    buffer = get_ring_buffer()
+    if buffer is None:
+        raise HTTPException(404, "In-memory trace exporter is disabled (set TRACE_EXPORTERS=memory)")
+    return buffer.recent(limit=limit, trace_id=trace_id)
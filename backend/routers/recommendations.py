@@ -2,24 +2,50 @@
 POST /recommendations - AI-ranked restaurant recommendations.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+import math
+import os
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 
+from backend.config import get_float_env
+from backend.admission import AdmissionRejected, get_recommendations_admission
 from backend.database import get_db
-from backend.models import Restaurant
+from backend.dataset import get_dataset_version
+from backend.diversity import candidate_count, pool_size, select_diverse
+from backend.models import PrecomputedRecommendation, Restaurant
 from backend.schemas import RecommendationRequest, RecommendationItem, RecommendationResponse
-from backend.llm.client import rank_restaurants
+from backend.llm.client import rank_restaurants_async
+from backend.llm.local import LOCAL_RANKINGS, rank_locally
+from backend.llm.retry import deadline_scope
+from backend.retrieval import get_index
+from backend.tracing import span
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/recommendations", tags=["recommendations"])
 
 VALID_PRICE_CATEGORIES = ("$", "$$", "$$$")
 LIMIT_MIN, LIMIT_MAX = 3, 10
+QUERY_MAX_CHARS = 200
+
+
+def _votes(raw_data) -> int | None:
+    """Vote count from the original dataset row, if present."""
+    try:
+        return int((raw_data or {}).get("votes"))
+    except (AttributeError, TypeError, ValueError):
+        return None
 
 
 def _restaurant_to_dict(r: Restaurant) -> dict:
     """Convert Restaurant model to dict for LLM prompt."""
     return {
+        "restaurant_id": r.id,
         "name": r.name,
         "city": r.city,
         "location": r.location,
@@ -27,74 +53,202 @@ def _restaurant_to_dict(r: Restaurant) -> dict:
         "cost_for_two": r.cost_for_two,
         "has_online_delivery": r.has_online_delivery or False,
         "cuisines": r.cuisines,
+        "votes": _votes(r.raw_data),
     }
 
 
+def query_candidates(
+    db: Session,
+    city: str,
+    price_category: str,
+    query: str | None = None,
+    limit: int | None = None,
+) -> list[dict]:
+    """
+    LLM candidates for city + price_category, as prompt dicts. A pool of the best
+    restaurants by rating (or, with a free-text query, by TF-IDF relevance then
+    rating from the local index) is cut to a diverse set sized for limit picks.
+    """
+    count = candidate_count(limit)
+    pool = pool_size(count)
+    if query and query.strip():
+        ids = get_index(db).search(query, city, price_category, pool)
+        if not ids:
+            return []
+        rows = {r.id: r for r in db.execute(select(Restaurant).where(Restaurant.id.in_(ids))).scalars()}
+        restaurants = [rows[i] for i in ids if i in rows]
+    else:
+        stmt = (
+            select(Restaurant)
+            .where(
+                Restaurant.city == city,
+                Restaurant.price_category == price_category,
+            )
+            .order_by(Restaurant.rating.desc().nullslast())
+            .limit(pool)
+        )
+        restaurants = db.execute(stmt).scalars().all()
+    return select_diverse([_restaurant_to_dict(r) for r in restaurants], count)
+
+
+def _candidate_id(rec: dict, count: int, ids_by_name: dict[str, int]) -> int | None:
+    """1-based candidate id an LLM pick refers to: by id, or by exact name from older/looser models."""
+    try:
+        i = int(rec["id"])
+    except (KeyError, TypeError, ValueError):
+        return ids_by_name.get(rec.get("name"))
+    return i if 1 <= i <= count else None
+
+
+def _rank_of(rec: dict) -> float:
+    """The pick's rank when it is a positive integer; picks without one keep their reply order, last."""
+    rank = rec.get("rank")
+    if isinstance(rank, bool):
+        return math.inf
+    try:
+        rank = int(rank)
+    except (TypeError, ValueError):
+        return math.inf
+    return rank if rank >= 1 else math.inf
+
+
+def build_recommendation_items(llm_result: dict, restaurant_dicts: list[dict], limit: int) -> list[RecommendationItem]:
+    """
+    Join the LLM's picks (candidate id, rank, reason) with the candidate rows, in rank order.
+    Ids are 1-based positions in restaurant_dicts; unknown ids and repeats are dropped.
+    """
+    ids_by_name = {}
+    for i, r in enumerate(restaurant_dicts, 1):
+        ids_by_name.setdefault(r["name"], i)
+    picks = sorted((rec for rec in llm_result.get("recommendations", []) if isinstance(rec, dict)), key=_rank_of)
+
+    recommendations = []
+    seen = set()
+    for rec in picks:
+        if len(recommendations) >= limit:
+            break
+        i = _candidate_id(rec, len(restaurant_dicts), ids_by_name)
+        if i is None or i in seen:
+            continue  # LLM invented or repeated a restaurant - skip
+        seen.add(i)
+        row = restaurant_dicts[i - 1]
+        recommendations.append(
+            RecommendationItem(
+                rank=len(recommendations) + 1,
+                name=row["name"],
+                location=row.get("location") or "",
+                rating=float(row.get("rating") or 0),
+                cost_for_two=int(row.get("cost_for_two") or 0),
+                online_order=bool(row.get("has_online_delivery")),
+                reason=str(rec.get("reason") or ""),
+            )
+        )
+    return recommendations
+
+
+def _load_precomputed(db: Session, city: str, price_category: str, limit: int) -> list[dict] | None:
+    """Precomputed recommendations for the current dataset version, or None on miss."""
+    stmt = select(PrecomputedRecommendation.recommendations).where(
+        PrecomputedRecommendation.city == city,
+        PrecomputedRecommendation.price_category == price_category,
+        PrecomputedRecommendation.limit == limit,
+        PrecomputedRecommendation.dataset_version == get_dataset_version(),
+    )
+    stored = db.execute(stmt).scalar_one_or_none()
+    return stored if isinstance(stored, list) and stored else None
+
+
+def _request_budget(header_timeout: float | None) -> float:
+    """Seconds this request may spend waiting for a slot and calling the LLM."""
+    budget = get_float_env("RECOMMENDATIONS_DEADLINE_SECONDS", 60.0)
+    if header_timeout is not None and header_timeout > 0:
+        budget = min(budget, header_timeout)
+    return budget
+
+
+def _degrade_enabled() -> bool:
+    """RECOMMENDATIONS_DEGRADE=false turns LLM failures and shed requests back into 503/429."""
+    return os.getenv("RECOMMENDATIONS_DEGRADE", "true").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _local_items(restaurant_dicts: list[dict], limit: int, reason: str) -> list[RecommendationItem]:
+    """Rank with the local scorer when the LLM path is unavailable."""
+    logger.info("Serving local ranking (%s)", reason)
+    LOCAL_RANKINGS.inc(reason=reason)
+    with span("local.rank", reason=reason):
+        return build_recommendation_items(rank_locally(restaurant_dicts, limit), restaurant_dicts, limit)
+
+
+async def _query_candidates_or_404(db: Session, body: RecommendationRequest) -> list[dict]:
+    attributes = {"city": body.city, "price_category": body.price_category, "query": bool(body.query)}
+    with span("db.query_candidates", **attributes) as db_span:
+        restaurant_dicts = await run_in_threadpool(
+            query_candidates, db, body.city, body.price_category, body.query, body.limit
+        )
+        db_span.set_attribute("rows", len(restaurant_dicts))
+    if not restaurant_dicts:
+        raise HTTPException(404, "No restaurants found for the given city and price category")
+    return restaurant_dicts
+
+
 @router.post("", response_model=RecommendationResponse)
-def get_recommendations(
+async def get_recommendations(
     body: RecommendationRequest,
     db: Session = Depends(get_db),
+    x_request_timeout: Annotated[float | None, Header()] = None,
 ):
     """
     Get AI-ranked restaurant recommendations.
-    Queries top 20 by rating, passes to Grok for ranking and explanation.
+    Served from precomputed_recommendations when available (see scripts/precompute_recommendations.py);
+    otherwise picks a diverse set of about 2 x limit candidates from the best by rating (or by
+    relevance to the optional free-text query, see backend.retrieval) and passes them to the LLM
+    for ranking and explanation.
+    The DB query runs in the threadpool; the LLM call is awaited on the event loop.
+    Concurrency is bounded by admission control. When the LLM fails or the request is shed,
+    the local scorer answers instead (RECOMMENDATIONS_DEGRADE=false restores 503/429).
+    Queueing plus all LLM attempts share one deadline: RECOMMENDATIONS_DEADLINE_SECONDS,
+    shortened by an X-Request-Timeout header.
     """
     if body.price_category not in VALID_PRICE_CATEGORIES:
         raise HTTPException(422, "price_category must be $, $$, or $$$")
     if not (LIMIT_MIN <= body.limit <= LIMIT_MAX):
         raise HTTPException(422, f"limit must be between {LIMIT_MIN} and {LIMIT_MAX}")
-
-    stmt = (
-        select(Restaurant)
-        .where(
-            Restaurant.city == body.city,
-            Restaurant.price_category == body.price_category,
-        )
-        .order_by(Restaurant.rating.desc().nullslast())
-        .limit(20)
-    )
-    result = db.execute(stmt)
-    restaurants = result.scalars().all()
-
-    if not restaurants:
-        raise HTTPException(404, "No restaurants found for the given city and price category")
-
-    restaurant_dicts = [_restaurant_to_dict(r) for r in restaurants]
-    llm_result = rank_restaurants(
-        restaurant_dicts,
-        body.city,
-        body.price_category,
-        body.limit,
-    )
-
-    if "error" in llm_result:
-        raise HTTPException(503, llm_result["error"])
-
-    raw_recs = llm_result.get("recommendations", [])[: body.limit]
-    valid_names = {r["name"] for r in restaurant_dicts}
-
-    recommendations = []
-    for rec in raw_recs:
-        if not isinstance(rec, dict):
-            continue
-        name = rec.get("name")
-        if name and name not in valid_names:
-            continue  # LLM invented a restaurant - skip
+    if body.query is not None and len(body.query) > QUERY_MAX_CHARS:
+        raise HTTPException(422, f"query must be at most {QUERY_MAX_CHARS} characters")
+
+    stored = None
+    if not body.query:  # precomputed rankings know nothing about free-text preferences
+        with span("db.precomputed_lookup") as lookup_span:
+            stored = await run_in_threadpool(_load_precomputed, db, body.city, body.price_category, body.limit)
+            lookup_span.set_attribute("hit", stored is not None)
+    if stored is not None:
         try:
-            item = RecommendationItem(
-                rank=rec.get("rank", 0),
-                name=rec.get("name", ""),
-                location=rec.get("location", ""),
-                rating=float(rec.get("rating", 0)),
-                cost_for_two=int(rec.get("cost_for_two", 0)),
-                online_order=bool(rec.get("online_order", False)),
-                reason=rec.get("reason", ""),
-            )
-            recommendations.append(item)
-        except (TypeError, ValueError):
-            continue
-
+            return RecommendationResponse(recommendations=stored)
+        except ValueError:
+            pass  # stale/corrupt row - fall through to a live call
+
+    try:
+        with deadline_scope(_request_budget(x_request_timeout)):
+            async with get_recommendations_admission().slot():
+                restaurant_dicts = await _query_candidates_or_404(db, body)
+                with span("llm.rank", limit=body.limit):
+                    llm_result = await rank_restaurants_async(
+                        restaurant_dicts,
+                        body.city,
+                        body.price_category,
+                        body.limit,
+                        body.query,
+                    )
+    except AdmissionRejected as e:
+        if not _degrade_enabled():
+            raise HTTPException(e.status_code, e.detail, headers={"Retry-After": str(e.retry_after)})
+        restaurant_dicts = await _query_candidates_or_404(db, body)
+        return RecommendationResponse(recommendations=_local_items(restaurant_dicts, body.limit, "admission"))
+
+    recommendations = [] if "error" in llm_result else build_recommendation_items(llm_result, restaurant_dicts, body.limit)
+    if not recommendations and _degrade_enabled():
+        recommendations = _local_items(restaurant_dicts, body.limit, "llm_error")
     if not recommendations:
-        raise HTTPException(503, "Could not parse valid recommendations from LLM response")
+        raise HTTPException(503, llm_result.get("error") or "Could not parse valid recommendations from LLM response")
 
     return RecommendationResponse(recommendations=recommendations)
@@ -24,6 +24,7 @@ class RecommendationRequest(BaseModel):
     city: str
     price_category: str
     limit: int = 3  # 3-10, validated in router
+    query: str | None = None  # free-text preference, e.g. "spicy biryani with delivery"
 
 
 class RecommendationItem(BaseModel):
@@ -38,3 +39,26 @@ class RecommendationItem(BaseModel):
 
 class RecommendationResponse(BaseModel):
     recommendations: list[RecommendationItem]
+
+
+class LLMPick(BaseModel):
+    """One pick as the LLM returns it; the router fills the other RecommendationItem fields from the DB row."""
+
+    rank: int
+    id: int
+    reason: str
+
+
+class LLMRanking(BaseModel):
+    recommendations: list[LLMPick]
+
+
+class LLMTaskRanking(BaseModel):
+    """Ranking for one task of a batched prompt (task is the 1-based task number)."""
+
+    task: int
+    recommendations: list[LLMPick]
+
+
+class LLMBatchRanking(BaseModel):
+    results: list[LLMTaskRanking]
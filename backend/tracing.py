@@ -0,0 +1,278 @@
+"""
+Lightweight per-request tracing.
+Spans nest via contextvars (works across await and run_in_threadpool) and share
+the request id as trace id. Finished spans go to pluggable exporters.
+
+Log records carry the request id; configure_logging() sets a format that shows it.
+
+Config (env):
+  TRACE_EXPORTERS     comma list of memory, jsonl, otel, or none (default: none). memory
+                      enables GET /debug/traces, which has no auth: keep it off in production
+  TRACE_BUFFER_SIZE   spans kept in memory for GET /debug/traces (default 1000)
+  LOG_LEVEL           root log level set by configure_logging (default INFO)
+  TRACE_JSONL_PATH    file for the jsonl exporter, appended by a background thread
+                      (default: data/traces.jsonl)
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+from backend.config import get_int_env
+from backend.linelog import LineWriter
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+LOG_FORMAT = "%(asctime)s [%(levelname)s] [%(request_id)s] %(name)s: %(message)s"
+
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed stage of a request."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_time", "_started", "duration_ms", "status", "attributes")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, attributes: dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms: float | None = None
+        self.status = "ok"
+        self.attributes = attributes
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+# --- Exporters ---
+
+
+class RingBufferExporter:
+    """Keeps the most recent spans in memory (served by GET /debug/traces)."""
+
+    def __init__(self, maxlen: int = 1000):
+        self._spans: deque[dict] = deque(maxlen=maxlen)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span.to_dict())
+
+    def recent(self, limit: int = 100, trace_id: str | None = None) -> list[dict]:
+        spans = list(self._spans)
+        if trace_id:
+            spans = [s for s in spans if s["trace_id"] == trace_id]
+        return spans[-limit:]
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per span to a file, from a background thread."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._writer = LineWriter("trace-log")
+
+    def export(self, span: Span) -> None:
+        self._writer.write(self.path, json.dumps(span.to_dict(), default=str))
+
+    def flush(self) -> None:
+        """Block until every exported span is in the file."""
+        self._writer.flush()
+
+
+class OpenTelemetryExporter:
+    """
+    Re-emits finished spans through the OpenTelemetry API (requires opentelemetry-api).
+    Parent linkage is carried as attributes; timing is preserved.
+    """
+
+    def __init__(self):
+        from opentelemetry import trace
+
+        self._tracer = trace.get_tracer("zomato-ai-recommender")
+
+    def export(self, span: Span) -> None:
+        attributes = {k: v for k, v in span.attributes.items() if isinstance(v, (str, bool, int, float))}
+        attributes.update({"request_id": span.trace_id, "span_id": span.span_id, "parent_id": span.parent_id or ""})
+        start_ns = int(span.start_time * 1e9)
+        otel_span = self._tracer.start_span(span.name, start_time=start_ns, attributes=attributes)
+        otel_span.end(end_time=start_ns + int((span.duration_ms or 0) * 1e6))
+
+
+_exporters: list | None = None
+_ring_buffer: RingBufferExporter | None = None
+
+
+def _exporters_from_env() -> list:
+    global _ring_buffer
+    names = [n.strip().lower() for n in (os.getenv("TRACE_EXPORTERS") or "none").split(",") if n.strip()]
+    exporters = []
+    for name in names:
+        if name == "memory":
+            _ring_buffer = RingBufferExporter(get_int_env("TRACE_BUFFER_SIZE", 1000))
+            exporters.append(_ring_buffer)
+        elif name == "jsonl":
+            default_path = Path(__file__).resolve().parent.parent / "data" / "traces.jsonl"
+            exporters.append(JsonLinesExporter(os.getenv("TRACE_JSONL_PATH") or default_path))
+        elif name == "otel":
+            try:
+                exporters.append(OpenTelemetryExporter())
+            except ImportError:
+                logger.warning("TRACE_EXPORTERS includes otel but opentelemetry-api is not installed")
+        elif name != "none":
+            logger.warning("Unknown trace exporter: %s", name)
+    return exporters
+
+
+def get_exporters() -> list:
+    global _exporters
+    if _exporters is None:
+        _exporters = _exporters_from_env()
+    return _exporters
+
+
+def set_exporters(exporters: list) -> None:
+    """Replace the active exporters (e.g. in tests)."""
+    global _exporters, _ring_buffer
+    _exporters = list(exporters)
+    _ring_buffer = next((e for e in _exporters if isinstance(e, RingBufferExporter)), None)
+
+
+def get_ring_buffer() -> RingBufferExporter | None:
+    """The in-memory exporter, if enabled."""
+    get_exporters()
+    return _ring_buffer
+
+
+def flush_exporters() -> None:
+    """Wait for exporters that write in the background (app shutdown, tests)."""
+    for exporter in get_exporters():
+        flush = getattr(exporter, "flush", None)
+        if flush is not None:
+            flush()
+
+
+def _export(span: Span) -> None:
+    for exporter in get_exporters():
+        try:
+            exporter.export(span)
+        except Exception:
+            logger.exception("Trace exporter %s failed", type(exporter).__name__)
+
+
+# --- Span API ---
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+class span:
+    """
+    Context manager timing one stage:  with span("llm.call", provider="gemini") as s: ...
+    Exceptions mark the span as error and propagate.
+    """
+
+    def __init__(self, name: str, **attributes: Any):
+        self.name = name
+        self.attributes = attributes
+        self._span: Span | None = None
+        self._token = None
+
+    def __enter__(self) -> Span:
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent else (_request_id.get() or new_request_id())
+        self._span = Span(self.name, trace_id, parent.span_id if parent else None, self.attributes)
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        record = self._span
+        record.duration_ms = round((time.perf_counter() - record._started) * 1000, 3)
+        if exc_type is not None:
+            record.status = "error"
+            record.attributes["error"] = exc_type.__name__
+        _current_span.reset(self._token)
+        _export(record)
+
+
+# --- Request id propagation ---
+
+
+def install_log_record_factory() -> None:
+    """Add request_id to every log record ('-' outside a request), usable as %(request_id)s."""
+    previous = logging.getLogRecordFactory()
+    if getattr(previous, "_adds_request_id", False):
+        return
+
+    def factory(*args, **kwargs):
+        record = previous(*args, **kwargs)
+        record.request_id = _request_id.get() or "-"
+        return record
+
+    factory._adds_request_id = True
+    logging.setLogRecordFactory(factory)
+
+
+def configure_logging() -> None:
+    """Root logging with the request id in every line (a no-op if logging is already configured)."""
+    install_log_record_factory()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format=LOG_FORMAT)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware: takes X-Request-ID from the client (or generates one),
+    opens the root http.request span and echoes the id in the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = REQUEST_ID_HEADER.lower().encode()
+        incoming = next((v.decode("latin-1") for k, v in scope.get("headers", []) if k == header), "")
+        request_id = incoming.strip()[:128] or new_request_id()
+        token = _request_id.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(header, request_id.encode("latin-1"))]
+                root.set_attribute("status", message["status"])
+            await send(message)
+
+        try:
+            with span("http.request", method=scope.get("method", ""), path=scope.get("path", "")) as root:
+                await self.app(scope, receive, send_wrapper)
+                route = scope.get("route")
+                if route is not None:
+                    root.set_attribute("route", getattr(route, "path", ""))
+        finally:
+            _request_id.reset(token)
@@ -148,7 +148,7 @@ def run_backend_tests():
 
 
 def run_recommendations_tests():
-    from unittest.mock import MagicMock, patch
+    from unittest.mock import AsyncMock, MagicMock, patch
     from fastapi.testclient import TestClient
     from backend.main import app
     from backend.database import get_db
@@ -178,7 +178,7 @@ def run_recommendations_tests():
         ]
     }
     app.dependency_overrides[get_db] = override_get_db(mock_session)
-    with patch("backend.routers.recommendations.rank_restaurants", return_value=llm_response):
+    with patch("backend.routers.recommendations.rank_restaurants_async", new=AsyncMock(return_value=llm_response)):
         try:
             r = client.post("/recommendations", json={"city": "Bangalore", "price_category": "$$", "limit": 3})
             assert r.status_code == 200
@@ -198,7 +198,8 @@ def run_recommendations_tests():
     # LLM error -> 503
     mock_result.scalars.return_value.all.return_value = [mock_rest]
     app.dependency_overrides[get_db] = override_get_db(mock_session)
-    with patch("backend.routers.recommendations.rank_restaurants", return_value={"error": "API error"}):
+    with patch("backend.routers.recommendations.rank_restaurants_async", new=AsyncMock(return_value={"error": "API error"})), \
+            patch.dict("os.environ", {"RECOMMENDATIONS_DEGRADE": "false"}, clear=False):
         try:
             r = client.post("/recommendations", json={"city": "Bangalore", "price_category": "$$", "limit": 3})
             assert r.status_code == 503
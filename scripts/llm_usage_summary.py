@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Summarize the LLM usage log (LLM_USAGE_LOG): calls, errors, tokens and latency per provider/model.
+From repo root: python scripts/llm_usage_summary.py --path data/llm_usage.jsonl --since-hours 24
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.llm.usage import read_usage_log, summarize
+
+
+def _fmt(value, spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", default=os.getenv("LLM_USAGE_LOG") or "data/llm_usage.jsonl")
+    parser.add_argument("--since-hours", type=float, default=None, help="only calls from the last N hours")
+    args = parser.parse_args()
+
+    if not Path(args.path).exists():
+        sys.exit(f"No usage log at {args.path} (set LLM_USAGE_LOG on the API to record one)")
+    since = time.time() - args.since_hours * 3600 if args.since_hours else None
+    rows = summarize(read_usage_log(args.path, since))
+    if not rows:
+        print("No calls recorded.")
+        sys.exit(0)
+
+    header = ("provider", "model", "calls", "errors", "prompt_tok", "cached_tok", "compl_tok", "avg_prompt", "avg_compl",
+              "p50_s", "p95_s", "p50_ttfb", "p95_ttfb")
+    lines = [header]
+    for r in rows:
+        lines.append((
+            r["provider"], r["model"], str(r["calls"]), str(r["errors"]),
+            str(r["prompt_tokens"]), str(r["cached_tokens"]), str(r["completion_tokens"]),
+            _fmt(r["avg_prompt_tokens"], ".0f"), _fmt(r["avg_completion_tokens"], ".0f"),
+            _fmt(r["p50_seconds"], ".2f"), _fmt(r["p95_seconds"], ".2f"),
+            _fmt(r["p50_ttfb"], ".2f"), _fmt(r["p95_ttfb"], ".2f"),
+        ))
+    widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+    for line in lines:
+        print("  ".join(cell.ljust(w) for cell, w in zip(line, widths)))
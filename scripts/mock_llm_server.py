@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Run the mock LLM server (Gemini + OpenAI-compatible endpoints) for offline load and chaos tests.
+From repo root: python scripts/mock_llm_server.py --port 8090 --latency-ms 300 --error-rate 0.05
+Then start the API with GEMINI_BASE_URL=http://127.0.0.1:8090/v1beta, GROK_BASE_URL /
+OLLAMA_BASE_URL=http://127.0.0.1:8090/v1 and any non-placeholder API keys.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import uvicorn
+
+from backend.llm.mock_server import MockConfig, create_app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="mean response latency (default 200)")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="spread for normal/uniform (default 50)")
+    parser.add_argument(
+        "--distribution", choices=("fixed", "normal", "uniform", "exponential"), default="normal"
+    )
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="share of slow-tail calls (0-1)")
+    parser.add_argument("--tail-ms", type=float, default=5000.0, help="latency of slow-tail calls (default 5000)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500 responses (0-1)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of 429 responses (0-1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429 (default 1)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of truncated JSON replies (0-1)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for reproducible runs")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        distribution=args.distribution,
+        tail_rate=args.tail_rate,
+        tail_ms=args.tail_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
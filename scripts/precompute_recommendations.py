@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Warm precomputed_recommendations for every city x price category x limit.
+Run after ingest, from repo root: python scripts/precompute_recommendations.py
+POST /recommendations serves these rows and only calls the LLM on a miss.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+
+from backend.precompute import run_precompute
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=4, help="max LLM calls in flight (default 4)")
+    parser.add_argument(
+        "--rpm", type=float, default=None, help="max LLM calls per minute per provider (default: LLM_RPM, else 30)"
+    )
+    args = parser.parse_args()
+    # Paced by the outbound scheduler, which reads LLM_RPM on first use
+    if args.rpm is not None:
+        os.environ["LLM_RPM"] = str(args.rpm)
+    os.environ.setdefault("LLM_RPM", "30")
+    asyncio.run(run_precompute(concurrency=args.concurrency))
@@ -1,3 +1,4 @@
+import asyncio
 import streamlit as st
 import requests
 import os
@@ -298,7 +299,7 @@ def get_recommendations_wrapper(city, price_category, limit):
         try:
             # We call the router function directly
             # Note: The router function might raise HTTPException, we need to catch it
-            data = recommendations.get_recommendations(body=req, db=db)
+            data = asyncio.run(recommendations.get_recommendations(body=req, db=db))
             # data is a RecommendationResponse (Pydantic model)
             # We need to convert it to dict for consistency with API response
             return MockResponse(data.model_dump())
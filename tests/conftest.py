@@ -2,8 +2,70 @@
 Pytest fixtures for backend API tests.
 """
 
+import os
 import sys
+import tempfile
 from pathlib import Path
 
+import pytest
+
 # Ensure project root is in path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Keep tests off the real data/restaurants.db (dataset version lookups open the engine)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{Path(tempfile.mkdtemp()) / 'test.db'}")
+
+
+@pytest.fixture(autouse=True)
+def _clear_llm_state():
+    """
+    Cached LLM responses, stored reasons, breaker and routing history must not leak
+    between tests. Provider config is re-read on first use, i.e. inside a test's env patch.
+    """
+    from backend.llm.batching import reset_batcher
+    from backend.llm.breaker import reset_breakers
+    from backend.llm.cache import get_response_cache
+    from backend.llm.providers import reload_providers, stats
+    from backend.llm.reasons import get_reason_store
+    from backend.llm.scheduler import reset_scheduler
+
+    def reset():
+        get_response_cache().clear()
+        get_reason_store().clear()
+        reset_breakers()
+        reload_providers()
+        stats.clear()
+        reset_batcher()
+        reset_scheduler()
+
+    reset()
+    yield
+    reset()
+
+
+@pytest.fixture
+def fast_mock():
+    """Mock LLM server config with no latency and deterministic replies."""
+    from backend.llm.mock_server import MockConfig
+
+    return MockConfig(latency_ms=0, jitter_ms=0, distribution="fixed", seed=1)
+
+
+@pytest.fixture
+def mock_provider_env():
+    """Env pointing every provider at the mock server (http://mock) with no retry backoff; tests add LLM_PROVIDER."""
+    return {
+        "GEMINI_API_KEY": "k",
+        "GROK_API_KEY": "k",
+        "GEMINI_BASE_URL": "http://mock/v1beta",
+        "GROK_BASE_URL": "http://mock/v1",
+        "OLLAMA_BASE_URL": "http://mock/v1",
+        "OLLAMA_MODEL": "m",
+        "LLM_RETRY_BASE_DELAY": "0",
+    }
+
+
+@pytest.fixture
+def grok_ok():
+    """Minimal successful Grok (OpenAI-compatible) chat completion body."""
+    return {"choices": [{"message": {"content": '{"recommendations": []}'}}]}
@@ -0,0 +1,117 @@
+"""
+Unit tests for admission control on POST /recommendations.
+"""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.admission import ADMISSION_SHED, AdmissionController, AdmissionRejected
+from backend.llm.retry import deadline_scope
+from backend.main import app
+from backend.database import get_db
+
+client = TestClient(app)
+
+
+class TestAdmissionController:
+    def test_sheds_with_429_when_queue_full(self):
+        async def scenario():
+            controller = AdmissionController("/test-full", max_in_flight=1, max_queue=0, queue_timeout=1.0)
+            await controller.acquire()
+            with pytest.raises(AdmissionRejected) as exc:
+                await controller.acquire()
+            return exc.value
+
+        rejected = asyncio.run(scenario())
+        assert rejected.status_code == 429
+        assert rejected.retry_after == 1
+        assert ADMISSION_SHED.value(route="/test-full", reason="queue_full") == 1
+
+    def test_queued_request_times_out_with_503(self):
+        async def scenario():
+            controller = AdmissionController("/test-timeout", max_in_flight=1, max_queue=1, queue_timeout=0.01)
+            await controller.acquire()
+            with pytest.raises(AdmissionRejected) as exc:
+                await controller.acquire()
+            return controller, exc.value
+
+        controller, rejected = asyncio.run(scenario())
+        assert rejected.status_code == 503
+        assert controller.queue_depth == 0
+
+    def test_queue_wait_clamped_to_request_deadline(self):
+        async def scenario():
+            controller = AdmissionController("/test-deadline", max_in_flight=1, max_queue=1, queue_timeout=5.0)
+            await controller.acquire()
+            started = time.perf_counter()
+            with deadline_scope(0.05), pytest.raises(AdmissionRejected) as exc:
+                await controller.acquire()
+            return exc.value, time.perf_counter() - started
+
+        rejected, waited = asyncio.run(scenario())
+        assert rejected.status_code == 503
+        assert waited < 1.0
+
+    def test_release_hands_slot_to_waiter_in_order(self):
+        async def scenario():
+            controller = AdmissionController("/test-fifo", max_in_flight=1, max_queue=2, queue_timeout=1.0)
+            order = []
+
+            async def worker(name):
+                async with controller.slot():
+                    order.append(name)
+                    await asyncio.sleep(0)
+
+            await asyncio.gather(worker("a"), worker("b"), worker("c"))
+            return controller, order
+
+        controller, order = asyncio.run(scenario())
+        assert order == ["a", "b", "c"]
+        assert controller.in_flight == 0
+
+
+class TestRecommendationsAdmission:
+    def test_rejection_returns_retry_after_header(self):
+        controller = MagicMock()
+        controller.slot.side_effect = AdmissionRejected(429, "Too many requests", 2)
+
+        def _override():
+            yield MagicMock()
+
+        app.dependency_overrides[get_db] = _override
+        with patch("backend.routers.recommendations.get_recommendations_admission", return_value=controller), \
+                patch.dict("os.environ", {"RECOMMENDATIONS_DEGRADE": "false"}, clear=False):
+            try:
+                response = client.post(
+                    "/recommendations",
+                    json={"city": "Bangalore", "price_category": "$$", "limit": 3},
+                )
+                assert response.status_code == 429
+                assert response.headers["retry-after"] == "2"
+            finally:
+                app.dependency_overrides.clear()
+
+    def test_shed_request_served_by_local_ranker(self):
+        controller = MagicMock()
+        controller.slot.side_effect = AdmissionRejected(503, "Server is busy", 2)
+
+        def _override():
+            yield MagicMock()
+
+        app.dependency_overrides[get_db] = _override
+        candidates = [{"name": "Jalsa", "location": "Banashankari", "rating": 4.1, "cost_for_two": 800}]
+        with patch("backend.routers.recommendations.get_recommendations_admission", return_value=controller), \
+                patch("backend.routers.recommendations.query_candidates", return_value=candidates):
+            try:
+                response = client.post(
+                    "/recommendations",
+                    json={"city": "Bangalore", "price_category": "$$", "limit": 3},
+                )
+                assert response.status_code == 200
+                assert response.json()["recommendations"][0]["name"] == "Jalsa"
+            finally:
+                app.dependency_overrides.clear()
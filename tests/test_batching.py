@@ -0,0 +1,169 @@
+"""
+Unit tests for micro-batching concurrent rankings into one LLM call.
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from backend.llm.batching import MicroBatcher
+from backend.llm.mock_server import create_app
+from backend.llm.prompts import build_batch_user_prompt, build_compact_user_prompt
+from backend.llm.retry import current_deadline, deadline_scope
+from backend.llm.scheduler import current_priority, priority_scope
+
+
+@pytest.fixture
+def env(mock_provider_env):
+    """Grok on the mock server with batching on and caches off."""
+    return {
+        **mock_provider_env,
+        "LLM_PROVIDER": "grok",
+        "LLM_BATCH": "true",
+        "LLM_BATCH_WINDOW_MS": "20",
+        "LLM_CACHE": "false",
+        "LLM_REASON_CACHE": "false",
+    }
+
+
+def _candidates(prefix: str, n: int = 4) -> list[dict]:
+    return [{"name": f"{prefix}{i}", "rating": 4.0, "cuisines": "North Indian"} for i in range(n)]
+
+
+class TestMicroBatcher:
+    def test_concurrent_submissions_share_one_run(self):
+        runs = []
+
+        async def run(system_prompt, tasks):
+            runs.append([user for user, _ in tasks])
+            return [{"user": user} for user, _ in tasks]
+
+        async def main():
+            batcher = MicroBatcher(run, window=0.01, max_size=8)
+            return await asyncio.gather(*(batcher.submit("s", f"u{i}") for i in range(3)))
+
+        results = asyncio.run(main())
+        assert runs == [["u0", "u1", "u2"]]
+        assert [r["user"] for r in results] == ["u0", "u1", "u2"]
+
+    def test_full_batch_dispatched_without_waiting_for_window(self):
+        runs = []
+
+        async def run(system_prompt, tasks):
+            runs.append(len(tasks))
+            return [{} for _ in tasks]
+
+        async def main():
+            batcher = MicroBatcher(run, window=10.0, max_size=2)
+            await asyncio.wait_for(asyncio.gather(*(batcher.submit("s", f"u{i}") for i in range(4))), 1.0)
+
+        asyncio.run(main())
+        assert runs == [2, 2]
+
+    def test_different_system_prompts_not_mixed(self):
+        runs = []
+
+        async def run(system_prompt, tasks):
+            runs.append((system_prompt, len(tasks)))
+            return [{} for _ in tasks]
+
+        async def main():
+            batcher = MicroBatcher(run, window=0.01)
+            await asyncio.gather(batcher.submit("a", "u"), batcher.submit("b", "u"), batcher.submit("a", "v"))
+
+        asyncio.run(main())
+        assert sorted(runs) == [("a", 2), ("b", 1)]
+
+    def test_run_gets_tightest_deadline_not_a_callers_context(self):
+        seen = []
+
+        async def run(system_prompt, tasks):
+            seen.append((current_priority(), current_deadline().remaining(), len(tasks)))
+            return [{} for _ in tasks]
+
+        async def submit(batcher, seconds, priority="interactive"):
+            with deadline_scope(seconds), priority_scope(priority):
+                return await batcher.submit("s", "u")
+
+        async def main():
+            batcher = MicroBatcher(run, window=0.01, max_size=8)
+            await asyncio.gather(submit(batcher, 30.0), submit(batcher, 2.0), submit(batcher, 30.0, "batch"))
+
+        asyncio.run(main())
+        by_priority = {priority: (remaining, size) for priority, remaining, size in seen}
+        assert by_priority["interactive"][1] == 2 and by_priority["interactive"][0] <= 2.0
+        assert by_priority["batch"][1] == 1 and 2.0 < by_priority["batch"][0] <= 30.0
+
+    def test_run_failure_reaches_every_caller(self):
+        async def run(system_prompt, tasks):
+            raise RuntimeError("boom")
+
+        async def main():
+            batcher = MicroBatcher(run, window=0.0)
+            return await asyncio.gather(batcher.submit("s", "u"), batcher.submit("s", "v"), return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in asyncio.run(main()))
+
+
+class TestBatchPrompt:
+    def test_tasks_numbered_with_single_format_line(self):
+        prompt = build_batch_user_prompt(
+            [build_compact_user_prompt(_candidates("A"), "Delhi", "$$", 2),
+             build_compact_user_prompt(_candidates("B"), "Pune", "$", 1)]
+        )
+        assert prompt.startswith("Task 1:\nCity: Delhi")
+        assert "Task 2:\nCity: Pune" in prompt
+        assert prompt.count("JSON:") == 1 and '"results"' in prompt
+
+
+class TestBatchedRanking:
+    def _rank_concurrently(self, app, queries, env):
+        from backend.llm.client import rank_restaurants_async
+
+        calls = []
+
+        async def record(request):
+            calls.append(request)
+
+        async def main():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, event_hooks={"request": [record]}) as pooled:
+                with patch("backend.llm.client.get_async_client", return_value=pooled):
+                    return await asyncio.gather(
+                        *(rank_restaurants_async(_candidates(city), city, "$$", limit) for city, limit in queries)
+                    )
+
+        with patch.dict("os.environ", env, clear=False):
+            return asyncio.run(main()), calls
+
+    def test_concurrent_queries_sent_as_one_call(self, env, fast_mock):
+        results, calls = self._rank_concurrently(create_app(fast_mock), [("Delhi", 2), ("Pune", 3), ("Goa", 1)], env)
+        assert len(calls) == 1
+        body = json.loads(calls[0].content)
+        assert body["response_format"]["json_schema"]["schema"]["required"] == ["results"]
+        assert [len(r["recommendations"]) for r in results] == [2, 3, 1]
+
+    def test_tasks_missing_from_reply_ranked_separately(self, env, fast_mock):
+        from backend.llm import mock_server
+
+        real = mock_server.mock_ranking
+
+        def drop_second_task(prompt):
+            reply = json.loads(real(prompt))
+            if "results" in reply:
+                reply["results"] = [r for r in reply["results"] if r["task"] != 2]
+            return json.dumps(reply)
+
+        with patch("backend.llm.mock_server.mock_ranking", side_effect=drop_second_task):
+            results, calls = self._rank_concurrently(create_app(fast_mock), [("Delhi", 2), ("Pune", 3)], env)
+        assert len(calls) == 2
+        assert [len(r["recommendations"]) for r in results] == [2, 3]
+
+    def test_batching_off_by_default(self):
+        with patch.dict("os.environ", {"LLM_BATCH": ""}, clear=False):
+            from backend.llm.batching import batching_enabled
+
+            assert not batching_enabled()
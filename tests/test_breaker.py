@@ -0,0 +1,123 @@
+"""
+Unit tests for per-provider circuit breakers.
+"""
+
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.llm.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, get_breaker
+from backend.llm.retry import deadline_scope
+from backend.main import app
+
+client = TestClient(app)
+
+
+class TestCircuitBreaker:
+    def test_opens_on_failure_rate(self):
+        breaker = CircuitBreaker("p", window=10, min_calls=4, failure_rate=0.5)
+        breaker.record(True, 0.1)
+        breaker.record(True, 0.1)
+        breaker.record(False, 0.1)
+        assert breaker.state == CLOSED
+        breaker.record(False, 0.1)
+        assert breaker.state == OPEN
+        assert breaker.allow() is None
+
+    def test_opens_on_slow_calls(self):
+        breaker = CircuitBreaker("p", min_calls=2, slow_call_seconds=1.0, slow_call_rate=1.0)
+        breaker.record(True, 5.0)
+        breaker.record(True, 5.0)
+        assert breaker.state == OPEN
+
+    def test_half_open_allows_one_probe_then_closes(self):
+        breaker = CircuitBreaker("p", min_calls=1, open_seconds=0.0)
+        breaker.record(False, 0.1)
+        assert breaker.state == HALF_OPEN
+        probe = breaker.allow()
+        assert probe
+        assert breaker.allow() is None  # probe already in flight
+        breaker.record(True, 0.1, probe)
+        assert breaker.state == CLOSED
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker("p", min_calls=1, open_seconds=0.0)
+        breaker.record(False, 0.1)
+        probe = breaker.allow()
+        breaker.open_seconds = 60.0
+        breaker.record(False, 0.1, probe)
+        assert breaker.state == OPEN
+
+    def test_only_the_probe_holder_resolves_the_probe(self):
+        breaker = CircuitBreaker("p", min_calls=1, open_seconds=0.0)
+        straggler = breaker.allow()  # let through while closed
+        breaker.record(False, 0.1)
+        probe = breaker.allow()
+        breaker.release_probe(straggler)
+        breaker.record(True, 0.1, straggler)
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow() is None  # still held by probe
+        breaker.release_probe(probe)
+        assert breaker.allow()
+
+
+class TestProviderSkipping:
+    def test_open_circuit_skips_http_call(self):
+        from backend.llm.client import _call_grok
+
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(500, text="boom")
+
+        pooled = httpx.Client(transport=httpx.MockTransport(handler))
+        env = {"GROK_API_KEY": "k", "LLM_BREAKER_MIN_CALLS": "2"}
+        with patch.dict("os.environ", env, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled):
+            _call_grok("s", "u")
+            _call_grok("s", "u")
+            result = _call_grok("s", "u")
+        assert len(calls) == 2
+        assert "circuit open" in result["error"]
+
+    def _half_open(self, provider: str) -> CircuitBreaker:
+        breaker = get_breaker(provider)
+        breaker.open_seconds = 0.0
+        for _ in range(breaker.min_calls):
+            breaker.record(False, 0.1)
+        assert breaker.state == HALF_OPEN
+        return breaker
+
+    def test_half_open_probe_released_when_deadline_expired(self):
+        from backend.llm.client import _call_grok
+
+        pooled = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(500)))
+        with patch.dict("os.environ", {"GROK_API_KEY": "k"}, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled):
+            breaker = self._half_open("grok")
+            with deadline_scope(0.0):
+                assert "deadline" in _call_grok("s", "u")["error"]
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()  # the probe is available again
+
+    def test_half_open_probe_released_on_unexpected_error(self):
+        from backend.llm.client import _call_grok
+
+        pooled = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, text="not json")))
+        with patch.dict("os.environ", {"GROK_API_KEY": "k"}, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled):
+            breaker = self._half_open("grok")
+            with pytest.raises(ValueError):
+                _call_grok("s", "u")
+        assert breaker.allow()
+
+    def test_health_reports_open_circuit(self):
+        breaker = get_breaker("gemini")
+        for _ in range(breaker.min_calls):
+            breaker.record(False, 0.1)
+        data = client.get("/health").json()
+        assert data["status"] == "degraded"
+        assert data["providers"]["gemini"] == OPEN
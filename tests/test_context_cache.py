@@ -0,0 +1,50 @@
+"""
+Unit tests for provider prompt caching hints and cached-token accounting.
+"""
+
+from unittest.mock import patch
+
+import httpx
+
+from backend.llm.context_cache import cache_hint_headers
+from backend.llm.prompts import build_system_prompt
+from backend.llm.usage import LLM_TOKENS, parse_cached_tokens
+
+SYSTEM = "You rank restaurants."
+
+
+class TestCacheHints:
+    def test_grok_gets_stable_conversation_id(self):
+        with patch.dict("os.environ", {"LLM_CONTEXT_CACHE": "true"}, clear=False):
+            first, second = cache_hint_headers("grok", SYSTEM), cache_hint_headers("grok", SYSTEM)
+            assert first == second and len(first["x-grok-conv-id"]) == 32
+            assert cache_hint_headers("grok", "other") != first
+            assert cache_hint_headers("gemini", SYSTEM) == {}
+        with patch.dict("os.environ", {"LLM_CONTEXT_CACHE": "false"}, clear=False):
+            assert cache_hint_headers("grok", SYSTEM) == {}
+
+    def test_grok_request_carries_hint_and_counts_cached_tokens(self, grok_ok):
+        from backend.llm.client import _call_grok, _get_grok_config
+
+        reply = {**grok_ok, "usage": {"prompt_tokens": 200, "completion_tokens": 40,
+                                      "prompt_tokens_details": {"cached_tokens": 128}}}
+        seen = []
+
+        def handler(request):
+            seen.append(request.headers.get("x-grok-conv-id"))
+            return httpx.Response(200, json=reply)
+
+        pooled = httpx.Client(transport=httpx.MockTransport(handler))
+        env = {"GROK_API_KEY": "k", "LLM_CONTEXT_CACHE": "true", "LLM_BREAKER": "false"}
+        with patch.dict("os.environ", env, clear=False), patch("backend.llm.client.get_client", return_value=pooled):
+            model = _get_grok_config()[1]
+            before = LLM_TOKENS.value(provider="grok", model=model, kind="cached")
+            _call_grok(build_system_prompt(compact=True), "u")
+            _call_grok(build_system_prompt(compact=True), "v")
+        assert seen[0] is not None and seen[0] == seen[1]
+        assert LLM_TOKENS.value(provider="grok", model=model, kind="cached") - before == 256
+
+    def test_parse_cached_tokens(self):
+        assert parse_cached_tokens({"usageMetadata": {"cachedContentTokenCount": 7}}) == 7
+        assert parse_cached_tokens({"usage": {"prompt_tokens_details": {"cached_tokens": 5}}}) == 5
+        assert parse_cached_tokens({"usage": {"prompt_tokens": 5}}) is None
@@ -0,0 +1,52 @@
+"""
+Unit tests for diversity-aware (MMR) candidate selection.
+"""
+
+from unittest.mock import patch
+
+from backend.diversity import candidate_count, select_diverse, similarity
+
+
+def _row(name, location="Koramangala", cuisines="North Indian"):
+    return {"name": name, "location": location, "cuisines": cuisines}
+
+
+class TestCandidateCount:
+    def test_scales_with_limit_within_bounds(self):
+        assert candidate_count(3) == 6
+        assert candidate_count(10) == 20
+        assert candidate_count(None) == 20
+
+    def test_configurable(self):
+        with patch.dict("os.environ", {"RECOMMENDATIONS_CANDIDATES_PER_PICK": "0"}, clear=False):
+            assert candidate_count(3) == 20
+        with patch.dict("os.environ", {"RECOMMENDATIONS_CANDIDATES_PER_PICK": "0.5"}, clear=False):
+            assert candidate_count(4) == 4  # never fewer than limit
+
+
+class TestSelectDiverse:
+    def test_similarity(self):
+        assert similarity(_row("Truffles"), _row("TRUFFLES", location="HSR")) == 1.0
+        assert similarity(_row("A"), _row("B", location="HSR", cuisines="Pizza")) == 0.0
+        assert similarity(_row("A"), _row("B")) == 1.0 * 0.6 + 0.4
+
+    def test_skips_chain_outlets_and_lookalikes(self):
+        rows = [
+            _row("Empire"),
+            _row("Empire", location="Indiranagar"),
+            _row("Meghana", cuisines="Biryani, Andhra"),
+            _row("Nagarjuna"),
+            _row("Toit", location="Indiranagar", cuisines="Continental"),
+        ]
+        picked = [r["name"] for r in select_diverse(rows, 3, lambda_=0.5)]
+        assert picked == ["Empire", "Meghana", "Toit"]
+
+    def test_keeps_pool_order_and_lambda_one_is_relevance_only(self):
+        rows = [_row(f"R{i}") for i in range(6)]
+        assert select_diverse(rows, 3, lambda_=1.0) == rows[:3]
+        picked = select_diverse(rows, 4, lambda_=0.3)
+        assert picked == sorted(picked, key=rows.index)
+
+    def test_small_pool_returned_as_is(self):
+        rows = [_row("A"), _row("A")]
+        assert select_diverse(rows, 5) == rows
@@ -0,0 +1,107 @@
+"""
+Unit tests for hedged Gemini/Grok requests.
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+from backend.llm.hedging import LLM_HEDGE_WINS, LLM_HEDGES, LatencyWindow, hedge_delay, hedged, latencies
+
+OK = {"recommendations": []}
+
+
+def _provider(result, delay, log=None, name=""):
+    async def call():
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(f"{name} cancelled")
+            raise
+        return result
+    return call
+
+
+class TestHedged:
+    def test_fast_primary_never_starts_backup(self):
+        backup_calls = []
+
+        async def backup():
+            backup_calls.append(1)
+            return OK
+
+        result, name = asyncio.run(hedged(("gemini", _provider(OK, 0)), ("grok", backup), delay=0.5))
+        assert name == "gemini"
+        assert backup_calls == []
+
+    def test_slow_primary_is_hedged_and_cancelled(self):
+        log = []
+        before = LLM_HEDGES.value(primary="gemini", backup="grok")
+        result, name = asyncio.run(hedged(
+            ("gemini", _provider(OK, 5.0, log, "gemini")),
+            ("grok", _provider(OK, 0.01)),
+            delay=0.02,
+        ))
+        assert name == "grok"
+        assert log == ["gemini cancelled"]
+        assert LLM_HEDGES.value(primary="gemini", backup="grok") == before + 1
+
+    def test_failed_primary_falls_back_immediately(self):
+        result, name = asyncio.run(hedged(
+            ("gemini", _provider({"error": "down"}, 0)),
+            ("grok", _provider(OK, 0)),
+            delay=10.0,
+        ))
+        assert (result, name) == (OK, "grok")
+
+    def test_both_fail_returns_last_error(self):
+        result, name = asyncio.run(hedged(
+            ("gemini", _provider({"error": "a"}, 0)),
+            ("grok", _provider({"error": "b"}, 0)),
+            delay=10.0,
+        ))
+        assert result == {"error": "b"}
+
+
+class TestHedgeDelay:
+    def test_percentile_needs_min_samples(self):
+        window = LatencyWindow()
+        for s in range(1, 11):
+            window.record("p", s / 10)
+        assert window.percentile("p", 95, min_samples=20) is None
+        assert window.percentile("p", 95, min_samples=5) == 1.0
+
+    def test_delay_uses_default_until_samples_exist(self):
+        with patch.dict("os.environ", {"LLM_HEDGE_DELAY": "1.5"}, clear=False):
+            assert hedge_delay("never-called-provider") == 1.5
+
+
+class TestRankRestaurantsHedging:
+    def test_rank_async_takes_first_valid_response(self):
+        from backend.llm.client import rank_restaurants_async
+
+        text = json.dumps({"recommendations": [{"rank": 1, "name": "X", "reason": "Good."}]})
+
+        async def slow_gemini(system_prompt, user_prompt, max_tokens=None):
+            await asyncio.sleep(5.0)
+            return {"text": text}
+
+        async def fast_grok(system_prompt, user_prompt, max_tokens=None):
+            return {"text": text}
+
+        env = {
+            "LLM_PROVIDER": "gemini",
+            "LLM_HEDGE": "true",
+            "LLM_HEDGE_DELAY": "0.05",
+            "GEMINI_API_KEY": "k",
+            "GROK_API_KEY": "k",
+        }
+        wins = LLM_HEDGE_WINS.value(provider="grok")
+        with patch.dict("os.environ", env, clear=False), \
+                patch.object(latencies, "percentile", return_value=None), \
+                patch("backend.llm.client._call_gemini_async", side_effect=slow_gemini), \
+                patch("backend.llm.client._call_grok_async", side_effect=fast_grok):
+            result = asyncio.run(rank_restaurants_async([{"name": "X"}], "Bangalore", "$$", 3))
+        assert result["recommendations"][0]["name"] == "X"
+        assert LLM_HEDGE_WINS.value(provider="grok") == wins + 1
@@ -114,3 +114,24 @@ class TestTransformRow:
             COL_APPROX_COST: "2000",
         }
         assert transform_row(row_high)["price_category"] == "$$$"
+
+
+class TestDatasetVersion:
+    def test_same_rows_same_version(self):
+        from backend.dataset import compute_dataset_version
+
+        rows = [{"name": "Jalsa", "city": "Bangalore", "rating": 4.1, "raw_data": {"x": 1}}]
+        assert compute_dataset_version(rows) == compute_dataset_version([dict(rows[0], raw_data={"x": 2})])
+
+    def test_changed_rows_change_version(self):
+        from backend.dataset import compute_dataset_version
+
+        rows = [{"name": "Jalsa", "city": "Bangalore", "rating": 4.1}]
+        assert compute_dataset_version(rows) != compute_dataset_version([dict(rows[0], rating=4.2)])
+
+    def test_reassigned_ids_change_version(self):
+        from backend.dataset import compute_dataset_version
+
+        rows = [{"id": 1, "name": "Jalsa", "city": "Bangalore"}, {"id": 2, "name": "Onesta", "city": "Bangalore"}]
+        swapped = [dict(rows[0], id=2), dict(rows[1], id=1)]
+        assert compute_dataset_version(rows) != compute_dataset_version(swapped)
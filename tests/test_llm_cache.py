@@ -0,0 +1,122 @@
+"""
+Unit tests for the LLM response cache.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import AsyncMock, patch
+
+from backend.llm.cache import MemoryCache, ResponseCache, SQLiteCache, cache_key
+
+
+class TestCacheKey:
+    def test_key_changes_with_each_component(self):
+        base = cache_key("gemini", "m", "v1", "sys", "user")
+        assert base == cache_key("gemini", "m", "v1", "sys", "user")
+        assert base != cache_key("grok", "m", "v1", "sys", "user")
+        assert base != cache_key("gemini", "m2", "v1", "sys", "user")
+        assert base != cache_key("gemini", "m", "v2", "sys", "user")
+        assert base != cache_key("gemini", "m", "v1", "sys", "user2")
+
+
+class TestMemoryCache:
+    def test_evicts_least_recently_used(self):
+        cache = MemoryCache(max_entries=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert len(cache) == 2
+
+    def test_expired_entries_are_misses(self):
+        cache = MemoryCache(ttl=0.0)
+        cache.set("a", 1)
+        time.sleep(0.001)
+        assert cache.get("a") is None
+
+
+class TestSQLiteCache:
+    def test_persists_across_instances(self, tmp_path):
+        path = tmp_path / "cache.db"
+        SQLiteCache(path).set("k", {"recommendations": []}, "v1")
+        assert SQLiteCache(path).get("k") == {"recommendations": []}
+
+    def test_new_dataset_version_drops_old_rows(self, tmp_path):
+        cache = SQLiteCache(tmp_path / "cache.db")
+        cache.set("old", {"x": 1}, "v1")
+        cache.set("new", {"x": 2}, "v2")
+        assert cache.get("old") is None
+        assert cache.get("new") == {"x": 2}
+
+    def test_hit_in_slow_tier_fills_memory(self, tmp_path):
+        memory = MemoryCache()
+        sqlite = SQLiteCache(tmp_path / "cache.db")
+        sqlite.set("k", {"x": 1}, "v1")
+        cache = ResponseCache([memory, sqlite])
+        assert cache.get("k") == {"x": 1}
+        assert memory.get("k") == {"x": 1}
+
+
+class TestRankRestaurantsCache:
+    def test_second_identical_call_skips_provider(self):
+        from backend.llm.client import rank_restaurants
+
+        text = json.dumps({"recommendations": [{"rank": 1, "name": "X", "reason": "Good."}]})
+        with patch.dict("os.environ", {"LLM_PROVIDER": "grok"}, clear=False), \
+                patch("backend.llm.client._call_grok", return_value={"text": text}) as call:
+            first = rank_restaurants([{"name": "X"}], "Bangalore", "$$", 3)
+            second = rank_restaurants([{"name": "X"}], "Bangalore", "$$", 3)
+        assert first == second
+        assert call.call_count == 1
+
+    def test_errors_are_not_cached(self):
+        from backend.llm.client import rank_restaurants
+
+        with patch.dict("os.environ", {"LLM_PROVIDER": "grok"}, clear=False), \
+                patch("backend.llm.client._call_grok", return_value={"error": "down"}) as call:
+            rank_restaurants([{"name": "X"}], "Bangalore", "$$", 3)
+            rank_restaurants([{"name": "X"}], "Bangalore", "$$", 3)
+        assert call.call_count == 2
+
+    def test_dataset_version_change_misses(self):
+        from backend.llm.client import rank_restaurants
+
+        text = json.dumps({"recommendations": []})
+        with patch.dict("os.environ", {"LLM_PROVIDER": "grok"}, clear=False), \
+                patch("backend.llm.client._call_grok", return_value={"text": text}) as call:
+            with patch("backend.llm.client.get_dataset_version", return_value="v1"):
+                rank_restaurants([{"name": "X"}], "Bangalore", "$$", 3)
+            with patch("backend.llm.client.get_dataset_version", return_value="v2"):
+                rank_restaurants([{"name": "X"}], "Bangalore", "$$", 3)
+        assert call.call_count == 2
+
+    def test_async_path_keeps_cache_io_off_the_event_loop(self, tmp_path):
+        from backend.llm.client import rank_restaurants_async
+
+        threads = []
+
+        class RecordingTier(SQLiteCache):
+            def get(self, key):
+                threads.append(threading.current_thread())
+                return super().get(key)
+
+            def set(self, key, value, dataset_version=""):
+                threads.append(threading.current_thread())
+                super().set(key, value, dataset_version)
+
+        def version():
+            threads.append(threading.current_thread())
+            return "v1"
+
+        parsed = {"recommendations": [{"rank": 1, "name": "X", "reason": "Good."}]}
+        cache = ResponseCache([RecordingTier(tmp_path / "cache.db")])
+        with patch.dict("os.environ", {"LLM_PROVIDER": "grok"}, clear=False), \
+                patch("backend.llm.client.get_response_cache", return_value=cache), \
+                patch("backend.llm.client.get_dataset_version", side_effect=version), \
+                patch("backend.llm.client._rank_single_async", new=AsyncMock(return_value=parsed)):
+            asyncio.run(rank_restaurants_async([{"name": "X"}], "Bangalore", "$$", 3))
+        assert threads and threading.main_thread() not in threads
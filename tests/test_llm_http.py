@@ -0,0 +1,71 @@
+"""
+Unit tests for pooled LLM HTTP clients.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import httpx
+
+from backend.llm import http
+
+
+class TestPooledClients:
+    def setup_method(self):
+        http.close_clients()
+
+    def teardown_method(self):
+        http.close_clients()
+
+    def test_sync_client_is_shared_per_provider(self):
+        assert http.get_client("gemini") is http.get_client("gemini")
+        assert http.get_client("gemini") is not http.get_client("grok")
+
+    def test_close_clients_forces_new_pool(self):
+        first = http.get_client("grok")
+        http.close_clients()
+        assert first.is_closed
+        assert http.get_client("grok") is not first
+
+    def test_async_client_is_shared_within_a_loop(self):
+        async def scenario():
+            a = http.get_async_client("gemini")
+            b = http.get_async_client("gemini")
+            await http.aclose_clients()
+            return a, b
+
+        a, b = asyncio.run(scenario())
+        assert a is b
+        assert a.is_closed
+
+    def test_async_clients_are_not_shared_across_loops(self):
+        async def grab():
+            return http.get_async_client("ollama")
+
+        assert asyncio.run(grab()) is not asyncio.run(grab())
+
+    def test_pool_limits_come_from_env(self):
+        env = {"LLM_HTTP_MAX_CONNECTIONS": "7", "LLM_HTTP_MAX_KEEPALIVE": "3"}
+        with patch.dict("os.environ", env, clear=False), patch("backend.llm.http.httpx.Client") as client_cls:
+            http.get_client("gemini")
+        limits = client_cls.call_args.kwargs["limits"]
+        assert limits.max_connections == 7
+        assert limits.max_keepalive_connections == 3
+
+    def test_sync_calls_reuse_the_pooled_client(self):
+        from backend.llm.client import _call_grok
+
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json={"choices": [{"message": {"content": "{}"}}]})
+
+        pooled = httpx.Client(transport=httpx.MockTransport(handler))
+        with patch.dict("os.environ", {"GROK_API_KEY": "k"}, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled) as get_client:
+            _call_grok("s", "u")
+            _call_grok("s", "u")
+        assert len(calls) == 2
+        assert not pooled.is_closed
+        get_client.assert_called_with("grok")
@@ -0,0 +1,87 @@
+"""
+Unit tests for in-process metrics and GET /metrics.
+"""
+
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.database import get_db
+from backend.metrics import Counter, Gauge, Histogram, HTTP_REQUESTS, LLM_FALLBACKS, LLM_PARSE_FAILURES
+
+client = TestClient(app)
+
+
+def override_get_db(mock_session):
+    def _override():
+        yield mock_session
+    return _override
+
+
+class TestMetricTypes:
+    def test_counter_renders_labels(self):
+        counter = Counter("test_things_total", "Things.", ("kind",), register=False)
+        counter.inc(kind="a")
+        counter.inc(2, kind="a")
+        assert counter.value(kind="a") == 3
+        assert 'test_things_total{kind="a"} 3' in counter.render()
+
+    def test_gauge_goes_up_and_down(self):
+        gauge = Gauge("test_level", "Level.", register=False)
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        assert gauge.value() == 1
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("test_latency_seconds", "Latency.", buckets=(0.1, 1.0), register=False)
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5.0)
+        text = histogram.render()
+        assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{le="1.0"} 2' in text
+        assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+        assert "test_latency_seconds_count 3" in text
+
+
+class TestMetricsEndpoint:
+    def test_metrics_records_route_template_and_status(self):
+        mock_result = MagicMock()
+        mock_result.fetchall.return_value = []
+        mock_session = MagicMock()
+        mock_session.execute.return_value = mock_result
+
+        before = HTTP_REQUESTS.value(method="GET", route="/cities", status="200")
+        app.dependency_overrides[get_db] = override_get_db(mock_session)
+        try:
+            client.get("/cities")
+        finally:
+            app.dependency_overrides.clear()
+
+        assert HTTP_REQUESTS.value(method="GET", route="/cities", status="200") == before + 1
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_requests_total{method="GET",route="/cities",status="200"}' in response.text
+        assert "# TYPE http_request_duration_seconds histogram" in response.text
+
+    def test_unknown_path_is_not_a_separate_route(self):
+        client.get("/no-such-page-123")
+        assert "no-such-page-123" not in client.get("/metrics").text
+
+
+class TestLlmMetrics:
+    def test_fallback_and_parse_failure_are_counted(self):
+        from backend.llm.client import rank_restaurants
+
+        fallbacks = LLM_FALLBACKS.value(from_provider="gemini", to_provider="grok")
+        failures = LLM_PARSE_FAILURES.value(provider="grok")
+        with patch.dict("os.environ", {"LLM_PROVIDER": "gemini", "GEMINI_API_KEY": "k", "GROK_API_KEY": "k"}, clear=False), \
+                patch("backend.llm.client._call_gemini", return_value={"error": "down"}), \
+                patch("backend.llm.client._call_grok", return_value={"text": "not json"}):
+            result = rank_restaurants([{"name": "X"}], "Bangalore", "$$", 3)
+        assert result == {"error": "Invalid JSON in LLM response"}
+        assert LLM_FALLBACKS.value(from_provider="gemini", to_provider="grok") == fallbacks + 1
+        assert LLM_PARSE_FAILURES.value(provider="grok") == failures + 1
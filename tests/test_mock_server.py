@@ -0,0 +1,69 @@
+"""
+Unit tests for the mock LLM server, driven through the real provider HTTP code.
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.llm.mock_server import MockConfig, create_app, mock_ranking
+
+CANDIDATES = [{"name": f"R{i}", "rating": 4.0} for i in range(6)]
+
+
+@pytest.fixture
+def env(mock_provider_env):
+    """Gemini first, Grok as fallback, both on the mock server."""
+    return {**mock_provider_env, "LLM_PROVIDER": "gemini"}
+
+
+def _rank_via_mock(config: MockConfig, env: dict) -> dict:
+    from backend.llm.client import rank_restaurants_async
+
+    app = create_app(config)
+
+    def pooled(provider):
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+
+    with patch.dict("os.environ", env, clear=False), \
+            patch("backend.llm.client.get_async_client", side_effect=pooled):
+        return asyncio.run(rank_restaurants_async(CANDIDATES, "Bangalore", "$$", 3))
+
+
+class TestMockServer:
+    def test_ranking_uses_prompt_ids(self):
+        prompt = "City: X | Price: $$ | Rank the top 2.\n1|A|x|4|500|y|1\n2|B|x|4|500|y|1\n3|C|x|4|500|y|1"
+        assert [p["id"] for p in json.loads(mock_ranking(prompt))["recommendations"]] == [1, 2]
+
+    def test_chat_streaming(self, fast_mock):
+        client = TestClient(create_app(fast_mock))
+        body = {"model": "m", "stream": True, "messages": [{"role": "user", "content": "Rank the top 1.\n1|A"}]}
+        lines = [line for line in client.post("/v1/chat/completions", json=body).text.splitlines() if line]
+        assert lines[-1] == "data: [DONE]"
+        text = "".join(
+            json.loads(line[6:])["choices"][0]["delta"].get("content", "") for line in lines[:-1]
+        )
+        assert json.loads(text)["recommendations"][0]["id"] == 1
+
+    def test_injected_rate_limit_carries_retry_after(self):
+        client = TestClient(create_app(MockConfig(latency_ms=0, rate_limit_rate=1.0, retry_after=3)))
+        response = client.post("/v1beta/models/m:generateContent", json={"contents": []})
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "3"
+
+
+class TestEndToEnd:
+    def test_gemini_path_against_mock(self, env, fast_mock):
+        result = _rank_via_mock(fast_mock, env)
+        assert [p["id"] for p in result["recommendations"]] == [1, 2, 3]
+
+    def test_errors_fall_back_and_malformed_is_salvaged(self, env):
+        result = _rank_via_mock(MockConfig(latency_ms=0, distribution="fixed", error_rate=1.0), env)
+        assert "error" in result
+
+        result = _rank_via_mock(MockConfig(latency_ms=0, distribution="fixed", malformed_rate=1.0), env)
+        assert "error" not in result and result["recommendations"]
@@ -0,0 +1,201 @@
+"""
+Unit tests for Ollama warm-up, keep_alive and streamed replies.
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from backend.llm.mock_server import create_app
+from backend.llm.retry import deadline_scope
+from backend.llm.streaming import ChatStream
+from backend.llm.usage import flush_usage_log, read_usage_log
+
+
+@pytest.fixture
+def env(mock_provider_env):
+    """Ollama as the only provider, breaker off."""
+    return {**mock_provider_env, "LLM_PROVIDER": "ollama", "LLM_BREAKER": "false"}
+
+
+def _sse(*chunks: dict) -> str:
+    return "".join(f"data: {json.dumps(c)}\n\n" for c in chunks) + "data: [DONE]\n\n"
+
+
+class TestOllamaRequest:
+    def test_streams_with_keep_alive_by_default(self, env):
+        from backend.llm.client import _ollama_request
+
+        with patch.dict("os.environ", env, clear=False):
+            body = _ollama_request("s", "u")["json"]
+        assert body["stream"] is True
+        assert body["stream_options"] == {"include_usage": True}
+        assert body["keep_alive"] == "30m"
+
+    def test_streaming_and_keep_alive_configurable(self, env):
+        from backend.llm.client import _ollama_request
+
+        with patch.dict("os.environ", {**env, "OLLAMA_STREAM": "false", "OLLAMA_KEEP_ALIVE": ""}, clear=False):
+            body = _ollama_request("s", "u")["json"]
+        assert body["stream"] is False
+        assert "stream_options" not in body and "keep_alive" not in body
+
+
+class TestStreamedReplies:
+    def test_chat_stream_reassembles_reply(self):
+        stream = ChatStream("ollama", "m", 0.0)
+        for line in _sse(
+            {"choices": [{"delta": {"role": "assistant"}}]},
+            {"choices": [{"delta": {"content": '{"recommendations"'}}]},
+            {"choices": [{"delta": {"content": ": []}"}}]},
+            {"choices": [], "usage": {"prompt_tokens": 9, "completion_tokens": 4}},
+        ).splitlines():
+            stream.feed(line)
+        assert stream.data()["choices"][0]["message"]["content"] == '{"recommendations": []}'
+        assert stream.data()["usage"]["completion_tokens"] == 4
+        assert stream.first_token is not None
+
+    def test_sync_call_consumes_stream_and_records_usage(self, tmp_path, env):
+        from backend.llm.client import _call_ollama
+
+        body = _sse(
+            {"choices": [{"delta": {"content": "hel"}}]},
+            {"choices": [{"delta": {"content": "lo"}}], "usage": {"prompt_tokens": 5, "completion_tokens": 2}},
+        )
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"})
+        )
+        path = tmp_path / "usage.jsonl"
+        with patch.dict("os.environ", {**env, "LLM_USAGE_LOG": str(path)}, clear=False), \
+                patch("backend.llm.client.get_client", return_value=httpx.Client(transport=transport)):
+            assert _call_ollama("s", "u") == {"text": "hello"}
+        flush_usage_log()
+        (record,) = read_usage_log(path)
+        assert (record["prompt_tokens"], record["completion_tokens"]) == (5, 2)
+
+    def test_stream_error_status_is_reported(self, env):
+        from backend.llm.client import _call_ollama
+
+        transport = httpx.MockTransport(lambda request: httpx.Response(404, text='{"error":"model not found"}'))
+        with patch.dict("os.environ", env, clear=False), \
+                patch("backend.llm.client.get_client", return_value=httpx.Client(transport=transport)):
+            assert "error" in _call_ollama("s", "u")
+
+    def test_trickling_stream_stops_at_deadline(self, env):
+        from backend.llm.client import _call_ollama
+
+        def trickle():
+            for _ in range(100):
+                time.sleep(0.02)  # each chunk well inside the read timeout
+                yield b'data: {"choices": [{"delta": {"content": "x"}}]}\n\n'
+
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, content=trickle(), headers={"Content-Type": "text/event-stream"})
+        )
+        started = time.monotonic()
+        with patch.dict("os.environ", env, clear=False), \
+                patch("backend.llm.client.get_client", return_value=httpx.Client(transport=transport)), \
+                deadline_scope(0.3):
+            result = _call_ollama("s", "u")
+        assert "deadline" in result["error"]
+        assert time.monotonic() - started < 1.0
+
+    def test_async_trickling_stream_stops_at_deadline(self, env):
+        from backend.llm.client import _call_ollama_async
+
+        async def trickle():
+            for _ in range(100):
+                await asyncio.sleep(0.02)
+                yield b'data: {"choices": [{"delta": {"content": "x"}}]}\n\n'
+
+        async def run():
+            transport = httpx.MockTransport(
+                lambda request: httpx.Response(200, content=trickle(), headers={"Content-Type": "text/event-stream"})
+            )
+            async with httpx.AsyncClient(transport=transport) as pooled:
+                with patch("backend.llm.client.get_async_client", return_value=pooled), deadline_scope(0.3):
+                    return await _call_ollama_async("s", "u")
+
+        started = time.monotonic()
+        with patch.dict("os.environ", env, clear=False):
+            result = asyncio.run(run())
+        assert "deadline" in result["error"]
+        assert time.monotonic() - started < 1.0
+
+    def test_async_ranking_streams_from_mock_server(self, env, fast_mock):
+        from backend.llm.client import rank_restaurants_async
+
+        app = create_app(fast_mock)
+        candidates = [{"name": f"R{i}", "rating": 4.0} for i in range(5)]
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app)) as pooled:
+                with patch("backend.llm.client.get_async_client", return_value=pooled):
+                    return await rank_restaurants_async(candidates, "Delhi", "$$", 2)
+
+        with patch.dict("os.environ", env, clear=False):
+            result = asyncio.run(run())
+        assert [r["id"] for r in result["recommendations"]] == [1, 2]
+
+
+class TestWarmUp:
+    def test_preloads_model_with_keep_alive(self, env):
+        from backend.llm.client import warm_up_providers
+
+        seen = []
+
+        def handler(request):
+            seen.append((request.url.path, json.loads(request.content)))
+            return httpx.Response(200, json={"done": True})
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as pooled:
+                with patch("backend.llm.client.get_async_client", return_value=pooled):
+                    await warm_up_providers()
+
+        with patch.dict("os.environ", {**env, "OLLAMA_KEEP_ALIVE": "1h"}, clear=False):
+            asyncio.run(run())
+        assert seen == [("/api/generate", {"model": "m", "keep_alive": "1h"})]
+
+    def test_goes_through_scheduler_at_background_priority(self, env):
+        from backend.llm.client import warm_up_ollama
+        from backend.llm.scheduler import current_priority
+
+        priorities = []
+
+        async def acquire(provider, tokens=0):
+            priorities.append((provider, current_priority()))
+            return False
+
+        with patch.dict("os.environ", env, clear=False), \
+                patch("backend.llm.scheduler.OutboundScheduler.acquire_async", side_effect=acquire), \
+                patch("backend.llm.client.get_async_client") as pooled:
+            assert asyncio.run(warm_up_ollama()) is False
+        assert priorities == [("ollama", "background")]
+        pooled.assert_not_called()
+
+    def test_failure_does_not_raise(self, env):
+        from backend.llm.client import warm_up_ollama
+
+        def handler(request):
+            raise httpx.ConnectError("refused")
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as pooled:
+                with patch("backend.llm.client.get_async_client", return_value=pooled):
+                    return await warm_up_ollama()
+
+        with patch.dict("os.environ", env, clear=False):
+            assert asyncio.run(run()) is False
+
+    def test_skipped_when_ollama_not_routed(self, env):
+        from backend.llm.client import warm_up_providers
+
+        with patch.dict("os.environ", {**env, "LLM_PROVIDER": "grok"}, clear=False), \
+                patch("backend.llm.client.get_async_client") as pooled:
+            asyncio.run(warm_up_providers())
+        pooled.assert_not_called()
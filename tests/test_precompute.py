@@ -0,0 +1,115 @@
+"""
+Unit tests for the offline precompute job and serving precomputed recommendations.
+"""
+
+import asyncio
+import os
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.dataset import invalidate_dataset_version, save_dataset_version
+from backend.main import app
+from backend.models import Base, PrecomputedRecommendation, Restaurant
+from backend.precompute import run_precompute
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def session_factory():
+    """Session on the test DATABASE_URL (the same DB the app's get_db uses)."""
+    engine = create_engine(os.environ["DATABASE_URL"], connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        session.add_all([
+            Restaurant(name="Jalsa", city="Bangalore", location="Banashankari", rating=4.1,
+                       cost_for_two=800, price_category="$$", has_online_delivery=True, cuisines="North Indian"),
+            Restaurant(name="Onesta", city="Bangalore", location="Banashankari", rating=4.6,
+                       cost_for_two=600, price_category="$$", has_online_delivery=True, cuisines="Pizza"),
+        ])
+        save_dataset_version(session, "v-test")
+        session.commit()
+    invalidate_dataset_version()
+    yield Session
+    with Session() as session:
+        session.execute(delete(Restaurant))
+        session.execute(delete(PrecomputedRecommendation))
+        session.commit()
+    invalidate_dataset_version()
+
+
+LLM_RESPONSE = {
+    "recommendations": [
+        {"rank": 1, "name": "Onesta", "location": "Banashankari", "rating": 4.6,
+         "cost_for_two": 600, "online_order": True, "reason": "Best pizza."},
+        {"rank": 2, "name": "Jalsa", "location": "Banashankari", "rating": 4.1,
+         "cost_for_two": 800, "online_order": True, "reason": "Great North Indian."},
+    ]
+}
+
+
+class TestRunPrecompute:
+    def test_one_llm_call_per_city_price_with_rows_per_limit(self, session_factory):
+        rank = AsyncMock(return_value=LLM_RESPONSE)
+        with patch("backend.precompute.rank_restaurants_async", new=rank):
+            combos, stored = asyncio.run(run_precompute(limits=[3, 5]))
+
+        assert combos == 3  # Bangalore x ($, $$, $$$)
+        assert stored == 2  # only $$ has candidates
+        assert rank.await_count == 1
+        assert rank.await_args.args[3] == 5  # ranked once at the largest limit
+        with session_factory() as session:
+            rows = session.execute(select(PrecomputedRecommendation)).scalars().all()
+        assert {(r.limit, r.dataset_version) for r in rows} == {(3, "v-test"), (5, "v-test")}
+        assert rows[0].recommendations[0]["name"] == "Onesta"
+
+    def test_rerun_upserts_and_drops_older_versions_after_success(self, session_factory):
+        with session_factory() as session:
+            session.add(PrecomputedRecommendation(city="Bangalore", price_category="$$", limit=3,
+                                                  dataset_version="v-old", recommendations=[]))
+            session.commit()
+        with patch("backend.precompute.rank_restaurants_async", new=AsyncMock(return_value=LLM_RESPONSE)):
+            asyncio.run(run_precompute(limits=[3]))
+            asyncio.run(run_precompute(limits=[3]))
+        with session_factory() as session:
+            rows = session.execute(select(PrecomputedRecommendation)).scalars().all()
+        assert [(r.limit, r.dataset_version) for r in rows] == [(3, "v-test")]
+
+    def test_interrupted_run_keeps_existing_rows(self, session_factory):
+        with patch("backend.precompute.rank_restaurants_async", new=AsyncMock(return_value=LLM_RESPONSE)):
+            asyncio.run(run_precompute(limits=[3]))
+        with session_factory() as session:
+            session.add(PrecomputedRecommendation(city="Bangalore", price_category="$", limit=3,
+                                                  dataset_version="v-old", recommendations=[]))
+            session.commit()
+        with patch("backend.precompute.rank_restaurants_async", new=AsyncMock(side_effect=RuntimeError("boom"))):
+            with pytest.raises(RuntimeError):
+                asyncio.run(run_precompute(limits=[3]))
+        with session_factory() as session:
+            rows = session.execute(select(PrecomputedRecommendation)).scalars().all()
+        assert {(r.price_category, r.dataset_version) for r in rows} == {("$$", "v-test"), ("$", "v-old")}
+
+
+class TestServePrecomputed:
+    def test_hit_skips_llm(self, session_factory):
+        with patch("backend.precompute.rank_restaurants_async", new=AsyncMock(return_value=LLM_RESPONSE)):
+            asyncio.run(run_precompute(limits=[3]))
+
+        live = AsyncMock(return_value={"error": "should not be called"})
+        with patch("backend.routers.recommendations.rank_restaurants_async", new=live):
+            response = client.post("/recommendations", json={"city": "Bangalore", "price_category": "$$", "limit": 3})
+        assert response.status_code == 200
+        assert [r["name"] for r in response.json()["recommendations"]] == ["Onesta", "Jalsa"]
+        live.assert_not_awaited()
+
+    def test_miss_falls_back_to_live_llm(self, session_factory):
+        live = AsyncMock(return_value=LLM_RESPONSE)
+        with patch("backend.routers.recommendations.rank_restaurants_async", new=live):
+            response = client.post("/recommendations", json={"city": "Bangalore", "price_category": "$$", "limit": 4})
+        assert response.status_code == 200
+        live.assert_awaited_once()
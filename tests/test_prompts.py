@@ -0,0 +1,61 @@
+"""
+Unit tests for prompt encoding and the token budget.
+"""
+
+from unittest.mock import patch
+
+from backend.llm.prompts import build_compact_user_prompt, build_system_prompt, build_user_prompt, estimate_tokens
+
+
+def _candidates(n=20):
+    return [
+        {
+            "name": f"Restaurant {i}",
+            "location": "Connaught Place, Central Delhi, New Delhi",
+            "rating": 4.5,
+            "cost_for_two": 800,
+            "has_online_delivery": i % 2 == 0,
+            "cuisines": "North Indian, Chinese" if i % 2 else "Cafe, Italian",
+        }
+        for i in range(n)
+    ]
+
+
+class TestCompactPrompt:
+    def test_smaller_than_verbose(self):
+        restaurants = _candidates()
+        verbose = build_system_prompt() + build_user_prompt(restaurants, "Delhi", "$$", 5)
+        compact = build_system_prompt(compact=True) + build_compact_user_prompt(restaurants, "Delhi", "$$", 5)
+        assert estimate_tokens(compact) < estimate_tokens(verbose) * 0.75
+
+    def test_cuisine_vocabulary_and_ids(self):
+        prompt = build_compact_user_prompt(_candidates(2), "Delhi", "$$", 2)
+        assert "Cuisines: 1=Cafe 2=Italian 3=North Indian 4=Chinese" in prompt
+        assert "1|Restaurant 0|Connaught Place, Central Delhi|4.5|800|y|1,2" in prompt
+        assert "2|Restaurant 1|" in prompt
+
+    def test_budget_drops_lowest_candidates_but_keeps_limit(self):
+        restaurants = _candidates()
+        prompt = build_compact_user_prompt(restaurants, "Delhi", "$$", 5, max_tokens=250)
+        assert estimate_tokens(prompt) <= 250
+        assert "Restaurant 4|" in prompt
+        assert "Restaurant 19|" not in prompt
+
+        tiny = build_compact_user_prompt(restaurants, "Delhi", "$$", 5, max_tokens=10)
+        assert "5|Restaurant 4|" in tiny
+        assert "Restaurant 5|" not in tiny
+
+
+class TestPromptSelection:
+    def test_verbose_format_opt_in(self):
+        from backend.llm.client import _build_prompts
+
+        with patch.dict("os.environ", {"LLM_PROMPT_FORMAT": "verbose"}, clear=False):
+            _, user = _build_prompts(_candidates(3), "Delhi", "$$", 3, "gemini")
+        assert "Online: Yes" in user
+
+    def test_compact_is_default(self):
+        from backend.llm.client import _build_prompts
+
+        _, user = _build_prompts(_candidates(3), "Delhi", "$$", 3, "gemini")
+        assert user.startswith("City: Delhi | Price: $$")
@@ -0,0 +1,88 @@
+"""
+Unit tests for the provider registry and latency-aware routing.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+from backend.llm import providers
+from backend.llm.providers import Provider, ProviderStats, register_provider, route, stats
+
+ENV = {"LLM_PROVIDER": "gemini", "GEMINI_API_KEY": "k", "GROK_API_KEY": "k"}
+
+
+def _names(chain):
+    return [p.name for p in chain]
+
+
+class TestProviderStats:
+    def test_ewma_latency_and_error_rate(self):
+        window = ProviderStats(alpha=0.5)
+        window.record("p", 1.0, True)
+        window.record("p", 3.0, True)
+        window.record("p", 0.1, False)
+        latency, error_rate = window.get("p")
+        assert latency == 2.0  # failures do not move latency
+        assert error_rate == 0.5
+
+
+class TestRouting:
+    def test_default_keeps_provider_order(self):
+        import backend.llm.client  # noqa: F401 - registers the built-in providers
+
+        with patch.dict("os.environ", ENV, clear=False):
+            for _ in range(10):
+                stats.record("gemini", 6.0, True)
+            assert _names(route()) == ["gemini", "grok"]
+
+    def test_latency_routing_prefers_gemini_until_it_slows_down(self):
+        import backend.llm.client  # noqa: F401
+
+        with patch.dict("os.environ", {**ENV, "LLM_ROUTING": "latency"}, clear=False):
+            assert _names(route()) == ["gemini", "grok"]
+            stats.record("gemini", 6.0, True)
+            assert _names(route()) == ["gemini", "grok"]  # one slow call is not enough
+            for _ in range(4):
+                stats.record("gemini", 6.0, True)
+            assert _names(route()) == ["grok", "gemini"]
+            for _ in range(5):
+                stats.record("grok", 3.0, False)
+            assert _names(route()) == ["gemini", "grok"]
+
+    def test_static_routing_and_unconfigured_providers(self):
+        import backend.llm.client  # noqa: F401
+
+        with patch.dict("os.environ", {**ENV, "LLM_ROUTING": "static", "GROK_API_KEY": ""}, clear=False):
+            stats.record("gemini", 60.0, True)
+            assert _names(route()) == ["gemini"]
+
+    def test_misspelled_provider_falls_back_to_default_chain(self):
+        import backend.llm.client  # noqa: F401
+
+        with patch.dict("os.environ", {**ENV, "LLM_PROVIDER": "gemnii"}, clear=False):
+            assert _names(route()) == ["gemini", "grok"]
+
+    def test_empty_chain_returns_error(self):
+        from backend.llm.client import rank_restaurants, rank_restaurants_async
+
+        with patch.dict("os.environ", ENV, clear=False), patch("backend.llm.client.route", return_value=[]):
+            assert rank_restaurants([{"name": "X"}], "Bangalore", "$$", 3) == {"error": "no LLM provider configured"}
+            result = asyncio.run(rank_restaurants_async([{"name": "Y"}], "Bangalore", "$$", 3))
+        assert result == {"error": "no LLM provider configured"}
+
+    def test_weights_shift_preference(self):
+        import backend.llm.client  # noqa: F401
+
+        env = {**ENV, "LLM_PROVIDER": "gemini,grok", "LLM_PROVIDER_WEIGHTS": "grok=2", "LLM_ROUTING": "latency"}
+        with patch.dict("os.environ", env, clear=False):
+            assert _names(route()) == ["grok", "gemini"]
+
+    def test_new_provider_plugs_in(self):
+        from backend.llm.client import rank_restaurants
+
+        reply = {"text": '{"recommendations": [{"rank": 1, "id": 1, "reason": "Echo."}]}'}
+        echo = Provider("echo", "echo-1", lambda *args: reply, None)
+        with patch.dict(providers._loaders, {}), patch.dict("os.environ", {"LLM_PROVIDER": "echo"}, clear=False):
+            register_provider("echo", lambda: echo)
+            result = rank_restaurants([{"name": "X"}], "Bangalore", "$$", 3)
+        assert result["recommendations"][0]["reason"] == "Echo."
@@ -0,0 +1,80 @@
+"""
+Unit tests for the per-restaurant reason store.
+"""
+
+import json
+from unittest.mock import patch
+
+import httpx
+
+from backend.llm.cache import MemoryCache
+from backend.llm.prompts import max_output_tokens
+from backend.llm.reasons import ReasonStore
+
+CANDIDATES = [
+    {"restaurant_id": 11, "name": "Jalsa", "rating": 4.1},
+    {"restaurant_id": 12, "name": "Onesta", "rating": 4.6},
+    {"restaurant_id": 13, "name": "Truffles", "rating": 4.7},
+]
+
+
+def _grok(replies):
+    """Pooled client answering with each reply in turn; records request bodies."""
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        content = json.dumps({"recommendations": replies[len(bodies) - 1]})
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+    return httpx.Client(transport=httpx.MockTransport(handler)), bodies
+
+
+class TestReasonStore:
+    def test_lookup_by_candidate_id(self):
+        store = ReasonStore([MemoryCache()])
+        store.set(12, "v1", "Great pizza.")
+        assert store.lookup(CANDIDATES, "v1") == {2: "Great pizza."}
+        assert store.lookup(CANDIDATES, "v2") == {}
+
+    def test_output_budget_shrinks_with_known_reasons(self):
+        assert max_output_tokens(3, 60, unexplained=1) < max_output_tokens(3, 60)
+
+
+class TestReasonReuse:
+    def test_second_query_reuses_reasons(self):
+        from backend.llm.client import rank_restaurants
+
+        pooled, bodies = _grok([
+            [{"rank": 1, "id": 2, "reason": "Great pizza."}, {"rank": 2, "id": 1, "reason": "Big portions."}],
+            [{"rank": 1, "id": 3, "reason": "Best desserts."}, {"rank": 2, "id": 2, "reason": ""},
+             {"rank": 3, "id": 1, "reason": ""}],
+        ])
+        env = {"LLM_PROVIDER": "grok", "GROK_API_KEY": "k"}
+        with patch.dict("os.environ", env, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled):
+            rank_restaurants(CANDIDATES, "Bangalore", "$$", 2)
+            result = rank_restaurants(CANDIDATES, "Bangalore", "$$", 3)
+
+        assert "Reasons already known for ids 1,2" in bodies[1]["messages"][1]["content"]
+        assert bodies[1]["max_tokens"] < max_output_tokens(3)
+        assert [p["reason"] for p in result["recommendations"]] == ["Best desserts.", "Great pizza.", "Big portions."]
+
+    def test_queries_bypass_store(self):
+        from backend.llm.client import rank_restaurants
+
+        pooled, bodies = _grok([
+            [{"rank": 1, "id": 2, "reason": "Pizza, as asked."}],
+            [{"rank": 1, "id": 2, "reason": "Quiet for a date."}],
+            [{"rank": 1, "id": 2, "reason": "Great pizza."}],
+        ])
+        env = {"LLM_PROVIDER": "grok", "GROK_API_KEY": "k"}
+        with patch.dict("os.environ", env, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled):
+            first = rank_restaurants(CANDIDATES, "Bangalore", "$$", 1, query="pizza")
+            second = rank_restaurants(CANDIDATES, "Bangalore", "$$", 1, query="romantic dinner")
+            rank_restaurants(CANDIDATES, "Bangalore", "$$", 1)
+
+        assert first["recommendations"][0]["reason"] == "Pizza, as asked."
+        assert second["recommendations"][0]["reason"] == "Quiet for a date."
+        assert all("Reasons already known" not in b["messages"][1]["content"] for b in bodies)
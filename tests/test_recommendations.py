@@ -2,7 +2,7 @@
 Unit tests for Phase 3 - POST /recommendations endpoint.
 """
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
@@ -50,7 +50,7 @@ class TestRecommendationsEndpoint:
         }
 
         app.dependency_overrides[get_db] = override_get_db(mock_session)
-        with patch("backend.routers.recommendations.rank_restaurants", return_value=llm_response):
+        with patch("backend.routers.recommendations.rank_restaurants_async", new=AsyncMock(return_value=llm_response)):
             try:
                 response = client.post(
                     "/recommendations",
@@ -119,7 +119,8 @@ class TestRecommendationsEndpoint:
         mock_session.execute.return_value = mock_result
 
         app.dependency_overrides[get_db] = override_get_db(mock_session)
-        with patch("backend.routers.recommendations.rank_restaurants", return_value={"error": "API key invalid"}):
+        with patch("backend.routers.recommendations.rank_restaurants_async", new=AsyncMock(return_value={"error": "API key invalid"})), \
+                patch.dict("os.environ", {"RECOMMENDATIONS_DEGRADE": "false"}, clear=False):
             try:
                 response = client.post(
                     "/recommendations",
@@ -129,6 +130,38 @@ class TestRecommendationsEndpoint:
             finally:
                 app.dependency_overrides.clear()
 
+    def test_recommendations_llm_error_degrades_to_local_ranking(self):
+        mock_restaurants = [
+            Restaurant(
+                id=1, name="Jalsa", city="Bangalore", location="Banashankari",
+                rating=4.1, cost_for_two=800, price_category="$$",
+                has_online_delivery=True, cuisines="North Indian", raw_data={"votes": "120"},
+            ),
+            Restaurant(
+                id=2, name="Onesta", city="Bangalore", location="Banashankari",
+                rating=4.6, cost_for_two=600, price_category="$$",
+                has_online_delivery=True, cuisines="Pizza", raw_data={"votes": "2500"},
+            ),
+        ]
+        mock_result = MagicMock()
+        mock_result.scalars.return_value.all.return_value = mock_restaurants
+        mock_session = MagicMock()
+        mock_session.execute.return_value = mock_result
+
+        app.dependency_overrides[get_db] = override_get_db(mock_session)
+        with patch("backend.routers.recommendations.rank_restaurants_async", new=AsyncMock(return_value={"error": "down"})):
+            try:
+                response = client.post(
+                    "/recommendations",
+                    json={"city": "Bangalore", "price_category": "$$", "limit": 3},
+                )
+                assert response.status_code == 200
+                recs = response.json()["recommendations"]
+                assert [r["name"] for r in recs] == ["Onesta", "Jalsa"]
+                assert "2,500" in recs[0]["reason"]
+            finally:
+                app.dependency_overrides.clear()
+
     def test_recommendations_accepts_limit_in_range(self):
         mock_restaurants = [
             Restaurant(
@@ -150,7 +183,7 @@ class TestRecommendationsEndpoint:
         }
 
         app.dependency_overrides[get_db] = override_get_db(mock_session)
-        with patch("backend.routers.recommendations.rank_restaurants", return_value=llm_response):
+        with patch("backend.routers.recommendations.rank_restaurants_async", new=AsyncMock(return_value=llm_response)):
             try:
                 response = client.post(
                     "/recommendations",
@@ -162,6 +195,85 @@ class TestRecommendationsEndpoint:
                 app.dependency_overrides.clear()
 
 
+class TestBuildRecommendationItems:
+    candidates = [
+        {"name": "Jalsa", "location": "Banashankari", "rating": 4.1, "cost_for_two": 800,
+         "has_online_delivery": True, "cuisines": "North Indian"},
+        {"name": "Onesta", "location": "Banashankari", "rating": 4.6, "cost_for_two": 600,
+         "has_online_delivery": False, "cuisines": "Pizza"},
+    ]
+
+    def test_joins_fields_by_id(self):
+        from backend.routers.recommendations import build_recommendation_items
+
+        items = build_recommendation_items(
+            {"recommendations": [{"rank": 1, "id": 2, "reason": "Great pizza."}, {"rank": 2, "id": "1", "reason": "Tasty."}]},
+            self.candidates,
+            3,
+        )
+        assert [(i.rank, i.name, i.cost_for_two, i.online_order) for i in items] == [
+            (1, "Onesta", 600, False),
+            (2, "Jalsa", 800, True),
+        ]
+        assert items[0].reason == "Great pizza."
+
+    def test_drops_unknown_and_repeated_ids(self):
+        from backend.routers.recommendations import build_recommendation_items
+
+        items = build_recommendation_items(
+            {"recommendations": [{"id": 7, "reason": "?"}, {"id": 1}, {"id": 1}, {"name": "Made Up"}]},
+            self.candidates,
+            3,
+        )
+        assert [i.name for i in items] == ["Jalsa"]
+
+    def test_sorted_by_rank_and_same_name_candidates_kept(self):
+        from backend.routers.recommendations import build_recommendation_items
+
+        candidates = self.candidates + [dict(self.candidates[0], location="Indiranagar")]
+        items = build_recommendation_items(
+            {"recommendations": [{"rank": 3, "id": 3}, {"rank": "x", "id": 2}, {"rank": 1, "id": 1}]},
+            candidates,
+            3,
+        )
+        assert [(i.rank, i.name, i.location) for i in items] == [
+            (1, "Jalsa", "Banashankari"),
+            (2, "Jalsa", "Indiranagar"),
+            (3, "Onesta", "Banashankari"),
+        ]
+
+    def test_output_tokens_sized_from_limit(self):
+        from backend.llm.client import _grok_request
+        from backend.llm.prompts import max_output_tokens
+
+        with patch.dict("os.environ", {"GROK_API_KEY": "k"}, clear=False):
+            request = _grok_request("s", "u", max_output_tokens(5))
+        assert request["json"]["max_tokens"] == max_output_tokens(5) < max_output_tokens(10)
+
+
+class TestLocalRanker:
+    def test_orders_by_score_and_is_deterministic(self):
+        from backend.llm.local import rank_locally
+
+        candidates = [
+            {"name": "A", "rating": 3.9, "votes": 10, "cost_for_two": 400},
+            {"name": "B", "rating": 4.7, "votes": 900, "cost_for_two": 900, "has_online_delivery": True},
+            {"name": "C", "rating": 4.7, "votes": 900, "cost_for_two": 1200, "has_online_delivery": True},
+        ]
+        result = rank_locally(candidates, 2)
+        assert [p["id"] for p in result["recommendations"]] == [2, 3]
+        assert rank_locally(candidates, 2) == result
+
+    def test_local_provider_skips_network(self):
+        from backend.llm.client import rank_restaurants
+
+        with patch.dict("os.environ", {"LLM_PROVIDER": "local"}, clear=False), \
+                patch("backend.llm.client.get_client") as get_client:
+            result = rank_restaurants([{"name": "X", "rating": 4.0}], "Bangalore", "$$", 3)
+        get_client.assert_not_called()
+        assert result["recommendations"][0]["id"] == 1
+
+
 class TestLlmClient:
     """Unit tests for LLM client helpers."""
 
@@ -195,3 +307,30 @@ class TestLlmClient:
         result = rank_restaurants([], "Bangalore", "$$", 3)
         assert "error" in result
         assert "No restaurants" in result["error"]
+
+    def test_rank_restaurants_async_empty_list(self):
+        import asyncio
+        from backend.llm.client import rank_restaurants_async
+        result = asyncio.run(rank_restaurants_async([], "Bangalore", "$$", 3))
+        assert "No restaurants" in result["error"]
+
+    def test_rank_restaurants_async_parses_grok_response(self):
+        import asyncio
+        import json
+        import httpx
+        from backend.llm.client import rank_restaurants_async
+
+        content = json.dumps({"recommendations": [{"rank": 1, "name": "X", "reason": "Good."}]})
+
+        def handler(request):
+            assert request.url.path.endswith("/chat/completions")
+            return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+        def fake_async_client(provider):
+            return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        env = {"LLM_PROVIDER": "grok", "GROK_API_KEY": "test-key"}
+        with patch.dict("os.environ", env, clear=False), \
+                patch("backend.llm.client.get_async_client", side_effect=fake_async_client):
+            result = asyncio.run(rank_restaurants_async([{"name": "X"}], "Bangalore", "$$", 3))
+        assert result["recommendations"][0]["name"] == "X"
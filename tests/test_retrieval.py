@@ -0,0 +1,115 @@
+"""
+Unit tests for the local TF-IDF retrieval behind free-text recommendation queries.
+"""
+
+import os
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+from backend.dataset import invalidate_dataset_version, save_dataset_version
+from backend.llm.prompts import build_compact_user_prompt
+from backend.main import app
+from backend.models import Base, Restaurant
+from backend.retrieval import TfidfIndex, get_index, load_index, reset_index, save_index, tokenize
+
+client = TestClient(app)
+
+ROWS = [
+    (1, "Delhi", "$$", 4.8, "Pizza Palace Italian Pizza Casual Dining"),
+    (2, "Delhi", "$$", 4.0, "Paradise Biryani Hyderabadi Biryani Chicken Biryani, Mutton Biryani Quick Bites"),
+    (3, "Delhi", "$$", 4.5, "Dosa Corner South Indian Masala Dosa Quick Bites"),
+    (4, "Pune", "$$", 4.9, "Biryani House Biryani Biryani Casual Dining"),
+]
+
+
+class TestTfidfIndex:
+    def test_tokenize(self):
+        assert tokenize("Spicy Biryanis with delivery, please!") == ["spicy", "biryani", "delivery"]
+
+    def test_query_ranks_matches_first_within_city_and_price(self):
+        index = TfidfIndex.build(ROWS, "v1")
+        assert index.search("spicy biryani", "Delhi", "$$", k=2) == [2, 1]
+        assert index.search("dosa", "Delhi", "$$", k=3) == [3, 1, 2]
+
+    def test_unmatched_query_falls_back_to_rating(self):
+        index = TfidfIndex.build(ROWS, "v1")
+        assert index.search("sushi", "Delhi", "$$") == [1, 3, 2]
+        assert index.search("biryani", "Goa", "$$") == []
+
+    def test_round_trips_through_file(self, tmp_path):
+        path = tmp_path / "index.json"
+        save_index(TfidfIndex.build(ROWS, "v1"), path)
+        loaded = load_index(path)
+        assert loaded.version == "v1"
+        assert loaded.search("biryani", "Delhi", "$$", k=1) == [2]
+        assert load_index(tmp_path / "missing.json") is None
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Restaurants on the test DATABASE_URL, with the index file in tmp_path."""
+    engine = create_engine(os.environ["DATABASE_URL"], connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        session.add_all([
+            Restaurant(name="Meghana Foods", city="Bangalore", location="Jayanagar", rating=4.2, cost_for_two=600,
+                       price_category="$$", has_online_delivery=True, cuisines="Biryani, Andhra",
+                       raw_data={"dish_liked": "Chicken Biryani, Boneless Biryani", "rest_type": "Casual Dining"}),
+            Restaurant(name="Toit", city="Bangalore", location="Indiranagar", rating=4.7, cost_for_two=700,
+                       price_category="$$", has_online_delivery=False, cuisines="Continental",
+                       raw_data={"dish_liked": "Beer, Pizza", "rest_type": "Microbrewery"}),
+        ])
+        save_dataset_version(session, "v-retrieval")
+        session.commit()
+    invalidate_dataset_version()
+    reset_index()
+    with patch.dict("os.environ", {"RETRIEVAL_INDEX_PATH": str(tmp_path / "index.json")}, clear=False):
+        yield Session
+    with Session() as session:
+        session.execute(delete(Restaurant))
+        session.commit()
+    invalidate_dataset_version()
+    reset_index()
+
+
+class TestQueryRecommendations:
+    def test_index_built_from_db_and_saved(self, session_factory, tmp_path):
+        with session_factory() as session:
+            index = get_index(session)
+        assert index.version == "v-retrieval"
+        assert load_index(tmp_path / "index.json").version == "v-retrieval"
+
+    def test_query_reorders_candidates_and_reaches_prompt(self, session_factory):
+        rank = AsyncMock(return_value={"recommendations": [{"rank": 1, "id": 1, "reason": "Biryani."}]})
+        with patch("backend.routers.recommendations.rank_restaurants_async", new=rank):
+            response = client.post(
+                "/recommendations",
+                json={"city": "Bangalore", "price_category": "$$", "limit": 3, "query": "boneless biryani"},
+            )
+        assert response.status_code == 200
+        assert response.json()["recommendations"][0]["name"] == "Meghana Foods"
+        candidates = rank.await_args.args[0]
+        assert [c["name"] for c in candidates] == ["Meghana Foods", "Toit"]
+        assert rank.await_args.args[4] == "boneless biryani"
+
+    def test_stale_index_file_is_rebuilt(self, session_factory, tmp_path):
+        save_index(TfidfIndex.build(ROWS, "old"), tmp_path / "index.json")
+        with session_factory() as session:
+            assert get_index(session).version == "v-retrieval"
+
+    def test_query_too_long(self):
+        response = client.post(
+            "/recommendations", json={"city": "Bangalore", "price_category": "$$", "limit": 3, "query": "x" * 500}
+        )
+        assert response.status_code == 422
+
+
+class TestQueryPrompt:
+    def test_compact_prompt_carries_query(self):
+        prompt = build_compact_user_prompt([{"name": "A"}], "Delhi", "$$", 1, query="  spicy\nbiryani ")
+        assert prompt.startswith("City: Delhi | Price: $$ | Wants: spicy biryani | Rank the top 1.")
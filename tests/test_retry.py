@@ -0,0 +1,137 @@
+"""
+Unit tests for LLM retries and the request deadline.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+from backend.llm.retry import Deadline, RetryPolicy, current_deadline, deadline_scope, parse_retry_after
+from backend.main import app
+
+client = TestClient(app)
+
+
+def _grok_client(responses):
+    """Pooled client that replays responses in order and records requests."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return responses[min(len(calls), len(responses)) - 1]
+
+    return httpx.Client(transport=httpx.MockTransport(handler)), calls
+
+
+class TestRetryPolicy:
+    def test_parse_retry_after(self):
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0  # in the past
+
+    def test_backoff_is_bounded(self):
+        policy = RetryPolicy(max_attempts=5, base_delay=0.5, max_delay=1.0)
+        for attempt in range(1, 5):
+            assert 0 <= policy.next_delay(attempt, True) <= 1.0
+        assert policy.next_delay(5, True) is None
+        assert policy.next_delay(1, False) is None
+
+    def test_retry_after_respected_and_capped(self):
+        policy = RetryPolicy(max_retry_after=5.0)
+        assert policy.next_delay(1, True, retry_after=2.0) == 2.0
+        assert policy.next_delay(1, True, retry_after=30.0) is None
+
+    def test_no_retry_past_deadline(self):
+        policy = RetryPolicy()
+        assert policy.next_delay(1, True, retry_after=2.0, deadline=Deadline(1.0)) is None
+
+    def test_deadline_scope_is_restored(self):
+        with deadline_scope(5.0) as deadline:
+            assert current_deadline() is deadline
+            assert deadline.clamp(30.0) <= 5.0
+        assert current_deadline() is None
+
+
+class TestPostJsonRetries:
+    env = {"GROK_API_KEY": "k", "LLM_RETRY_BASE_DELAY": "0", "LLM_BREAKER": "false"}
+
+    def test_retries_transient_status_then_succeeds(self, grok_ok):
+        from backend.llm.client import _call_grok
+
+        pooled, calls = _grok_client([httpx.Response(503, text="busy"), httpx.Response(200, json=grok_ok)])
+        with patch.dict("os.environ", self.env, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled):
+            result = _call_grok("s", "u")
+        assert len(calls) == 2
+        assert "error" not in result
+
+    def test_client_error_not_retried(self):
+        from backend.llm.client import _call_grok
+
+        pooled, calls = _grok_client([httpx.Response(400, text="bad request")])
+        with patch.dict("os.environ", self.env, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled):
+            result = _call_grok("s", "u")
+        assert len(calls) == 1
+        assert "error" in result
+
+    def test_gives_up_after_max_attempts(self):
+        from backend.llm.client import _call_grok
+
+        pooled, calls = _grok_client([httpx.Response(429, text="slow down")])
+        with patch.dict("os.environ", {**self.env, "LLM_RETRY_MAX_ATTEMPTS": "3"}, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled):
+            result = _call_grok("s", "u")
+        assert len(calls) == 3
+        assert "error" in result
+
+    def test_expired_deadline_skips_call(self, grok_ok):
+        from backend.llm.client import _call_grok
+
+        pooled, calls = _grok_client([httpx.Response(200, json=grok_ok)])
+        with patch.dict("os.environ", self.env, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled), \
+                deadline_scope(0.0):
+            result = _call_grok("s", "u")
+        assert calls == []
+        assert "deadline" in result["error"]
+
+    def test_async_retries_transient_status(self, grok_ok):
+        from backend.llm.client import _call_grok_async
+
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(502, text="gw") if len(calls) == 1 else httpx.Response(200, json=grok_ok)
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as pooled:
+                with patch("backend.llm.client.get_async_client", return_value=pooled):
+                    return await _call_grok_async("s", "u")
+
+        with patch.dict("os.environ", self.env, clear=False):
+            result = asyncio.run(run())
+        assert len(calls) == 2
+        assert "error" not in result
+
+
+class TestRequestTimeoutHeader:
+    def test_header_shortens_deadline(self):
+        seen = []
+
+        async def fake_rank(*args, **kwargs):
+            seen.append(current_deadline().seconds)
+            return {"error": "stop here"}
+
+        with patch("backend.routers.recommendations.query_candidates", return_value=[{"name": "A"}]), \
+                patch("backend.routers.recommendations.rank_restaurants_async", new=AsyncMock(side_effect=fake_rank)):
+            client.post(
+                "/recommendations",
+                json={"city": "Delhi", "price_category": "$$", "limit": 3},
+                headers={"X-Request-Timeout": "7.5"},
+            )
+        assert seen == [7.5]
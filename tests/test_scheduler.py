@@ -0,0 +1,116 @@
+"""
+Unit tests for the outbound LLM scheduler (token buckets and priority classes).
+"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from backend.llm.retry import deadline_scope
+from backend.llm.scheduler import LLM_QUEUE_TIMEOUTS, OutboundScheduler, TokenBucket, priority_scope
+
+
+class TestTokenBucket:
+    def test_wait_time_and_refill(self):
+        bucket = TokenBucket(60)  # 1 per second
+        now = bucket.updated
+        bucket.take(60)
+        assert bucket.wait_time(1, now) == 1.0
+        assert bucket.wait_time(1, now + 1.0) == 0.0
+
+    def test_settle_refunds_overestimate(self):
+        scheduler = OutboundScheduler({}, {"grok": 1000})
+        queue = scheduler.queue("grok")
+        queue.tokens.take(800)
+        scheduler.settle("grok", estimated=800, actual=300)
+        assert queue.tokens.level >= 700
+
+
+class TestOutboundScheduler:
+    def test_unlimited_provider_not_queued(self):
+        scheduler = OutboundScheduler({"gemini": 10}, {})
+        assert scheduler.queue("grok") is None
+        assert scheduler.acquire("grok")
+
+    def test_interactive_served_before_batch_before_background(self):
+        scheduler = OutboundScheduler({"grok": 1200}, {}, aging=60)  # one call per 50ms
+        scheduler.queue("grok").requests.level = 0
+        order = []
+
+        async def call(priority: str, delay: float):
+            await asyncio.sleep(delay)
+            with priority_scope(priority):
+                assert await scheduler.acquire_async("grok")
+            order.append(priority)
+
+        async def main():
+            await asyncio.gather(call("background", 0), call("batch", 0.001), call("interactive", 0.002))
+
+        asyncio.run(main())
+        assert order == ["interactive", "batch", "background"]
+
+    def test_gives_up_when_deadline_passes_first(self):
+        scheduler = OutboundScheduler({"grok": 1}, {})  # next slot in 60s
+        scheduler.queue("grok").requests.level = 0
+        before = LLM_QUEUE_TIMEOUTS.value(provider="grok", priority="interactive")
+        started = time.monotonic()
+        with deadline_scope(0.5):
+            assert not scheduler.acquire("grok")
+        assert time.monotonic() - started < 0.2
+        assert LLM_QUEUE_TIMEOUTS.value(provider="grok", priority="interactive") == before + 1
+
+    def test_bare_limit_applies_to_every_provider(self):
+        from backend.llm.scheduler import _parse_limits
+
+        assert _parse_limits("30") == {"*": 30.0}
+        scheduler = OutboundScheduler(_parse_limits("30,grok=60"), {})
+        assert scheduler.queue("gemini").requests.capacity == 30
+        assert scheduler.queue("grok").requests.capacity == 60
+
+    def test_unknown_priority_rejected(self):
+        with pytest.raises(ValueError):
+            with priority_scope("urgent"):
+                pass
+
+
+class TestProviderCalls:
+    def test_rate_limited_provider_call_fails_fast_within_deadline(self, grok_ok):
+        from backend.llm.client import _call_grok
+
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json=grok_ok)
+
+        pooled = httpx.Client(transport=httpx.MockTransport(handler))
+        env = {"GROK_API_KEY": "k", "LLM_RPM": "grok=1", "LLM_BREAKER": "false"}
+        with patch.dict("os.environ", env, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled), \
+                deadline_scope(2.0):
+            first = _call_grok("s", "u")
+            second = _call_grok("s", "u")
+        assert "error" not in first
+        assert "rate limit" in second["error"]
+        assert len(calls) == 1
+
+    def test_queue_timeout_releases_half_open_probe(self, grok_ok):
+        from backend.llm.breaker import HALF_OPEN, get_breaker
+        from backend.llm.client import _call_grok
+
+        pooled = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, json=grok_ok)))
+        env = {"GROK_API_KEY": "k", "LLM_RPM": "grok=1"}
+        with patch.dict("os.environ", env, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled), \
+                deadline_scope(2.0):
+            assert "error" not in _call_grok("s", "u")  # uses up the minute's request
+            breaker = get_breaker("grok")
+            breaker.open_seconds = 0.0
+            for _ in range(breaker.min_calls):
+                breaker.record(False, 0.1)
+            assert "rate limit" in _call_grok("s", "u")["error"]
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
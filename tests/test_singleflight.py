@@ -0,0 +1,104 @@
+"""
+Unit tests for single-flight coalescing of identical LLM calls.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from backend.llm.singleflight import LLM_COALESCED, AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight:
+    def test_concurrent_callers_share_one_execution(self):
+        flights = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def work():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return {"ok": True}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flights.do("k", work)))
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=lambda: results.append(flights.do("k", work))) for _ in range(3)]
+        for t in followers:
+            t.start()
+        for t in [leader, *followers]:
+            t.join()
+
+        assert len(calls) == 1
+        assert results == [{"ok": True}] * 4
+
+    def test_exception_reaches_every_caller_and_key_is_released(self):
+        flights = SingleFlight()
+        with pytest.raises(RuntimeError):
+            flights.do("k", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+        assert flights.do("k", lambda: 1) == 1
+
+
+class TestAsyncSingleFlight:
+    def test_concurrent_coroutines_share_one_execution(self):
+        flights = AsyncSingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def scenario():
+            return await asyncio.gather(*(flights.do("k", work) for _ in range(5)))
+
+        before = LLM_COALESCED.value(path="async")
+        assert asyncio.run(scenario()) == ["result"] * 5
+        assert len(calls) == 1
+        assert LLM_COALESCED.value(path="async") == before + 4
+
+    def test_cancelled_caller_does_not_cancel_shared_work(self):
+        flights = AsyncSingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def scenario():
+            first = asyncio.ensure_future(flights.do("k", work))
+            second = asyncio.ensure_future(flights.do("k", work))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(scenario()) == "done"
+
+
+class TestRankRestaurantsCoalescing:
+    def test_identical_async_requests_make_one_provider_call(self):
+        from backend.llm.client import rank_restaurants_async
+
+        text = json.dumps({"recommendations": [{"rank": 1, "name": "X", "reason": "Good."}]})
+        calls = []
+
+        async def fake_grok(system_prompt, user_prompt, max_tokens=None):
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"text": text}
+
+        async def scenario():
+            return await asyncio.gather(
+                *(rank_restaurants_async([{"name": "X"}], "Bangalore", "$$", 3) for _ in range(10))
+            )
+
+        with patch.dict("os.environ", {"LLM_PROVIDER": "grok"}, clear=False), \
+                patch("backend.llm.client._call_grok_async", side_effect=fake_grok):
+            results = asyncio.run(scenario())
+        assert len(calls) == 1
+        assert all(r["recommendations"][0]["name"] == "X" for r in results)
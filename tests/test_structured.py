@@ -0,0 +1,52 @@
+"""
+Unit tests for native JSON mode and the tolerant response parser.
+"""
+
+from unittest.mock import patch
+
+from backend.llm.structured import extract_json, response_schema
+
+
+class TestExtractJson:
+    def test_prose_and_trailing_comma(self):
+        text = 'Here you go: {"recommendations": [{"rank": 1, "id": 2, "reason": "a"},]} Enjoy!'
+        assert extract_json(text) == {"recommendations": [{"rank": 1, "id": 2, "reason": "a"}]}
+
+    def test_truncated_array_keeps_complete_items(self):
+        text = '```json\n{"recommendations": [{"rank": 1, "id": 2, "reason": "a"}, {"rank": 2, "id": 5, "rea'
+        assert extract_json(text) == {"recommendations": [{"rank": 1, "id": 2, "reason": "a"}]}
+
+    def test_bare_array(self):
+        assert extract_json('[{"id": 1}]') == {"recommendations": [{"id": 1}]}
+
+    def test_garbage(self):
+        assert extract_json("no json here") is None
+        assert extract_json('{"recommendations": [') is None
+
+
+class TestResponseSchema:
+    def test_gemini_dialect(self):
+        schema = response_schema("gemini")
+        item = schema["properties"]["recommendations"]["items"]
+        assert schema["type"] == "OBJECT"
+        assert item["properties"]["id"] == {"type": "INTEGER"}
+        assert "$defs" not in schema and "title" not in item
+
+    def test_openai_strict_dialect(self):
+        item = response_schema("openai")["properties"]["recommendations"]["items"]
+        assert item["additionalProperties"] is False
+        assert set(item["required"]) == {"rank", "id", "reason"}
+
+    def test_requests_use_json_mode(self):
+        from backend.llm.client import _gemini_request, _grok_request
+
+        env = {"GEMINI_API_KEY": "k", "GROK_API_KEY": "k"}
+        with patch.dict("os.environ", env, clear=False):
+            gemini = _gemini_request("s", "u")["json"]["generationConfig"]
+            grok = _grok_request("s", "u")["json"]
+        assert gemini["responseMimeType"] == "application/json"
+        assert "responseSchema" in gemini
+        assert grok["response_format"]["type"] == "json_schema"
+
+        with patch.dict("os.environ", {**env, "LLM_JSON_MODE": "off"}, clear=False):
+            assert "response_format" not in _grok_request("s", "u")["json"]
@@ -0,0 +1,111 @@
+"""
+Unit tests for per-request tracing and GET /debug/traces.
+"""
+
+import json
+import logging
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.database import get_db
+from backend.models import Restaurant
+from backend.tracing import (
+    LOG_FORMAT,
+    JsonLinesExporter,
+    RingBufferExporter,
+    _exporters_from_env,
+    set_exporters,
+    span,
+)
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def ring_buffer():
+    buffer = RingBufferExporter(maxlen=100)
+    set_exporters([buffer])
+    yield buffer
+    set_exporters([])
+
+
+class TestSpans:
+    def test_nested_spans_share_trace_and_link_parent(self, ring_buffer):
+        with span("outer") as outer:
+            with span("inner", step=1):
+                pass
+        inner_dict, outer_dict = ring_buffer.recent()
+        assert inner_dict["name"] == "inner"
+        assert inner_dict["trace_id"] == outer.trace_id
+        assert inner_dict["parent_id"] == outer_dict["span_id"]
+        assert inner_dict["attributes"] == {"step": 1}
+
+    def test_exception_marks_span_as_error(self, ring_buffer):
+        with pytest.raises(ValueError):
+            with span("boom"):
+                raise ValueError("x")
+        assert ring_buffer.recent()[-1]["status"] == "error"
+
+    def test_jsonl_exporter_appends_lines(self, tmp_path):
+        path = tmp_path / "traces.jsonl"
+        exporter = JsonLinesExporter(path)
+        set_exporters([exporter])
+        try:
+            with span("a"):
+                pass
+            with span("b"):
+                pass
+            exporter.flush()
+        finally:
+            set_exporters([RingBufferExporter()])
+        names = [json.loads(line)["name"] for line in path.read_text().splitlines()]
+        assert names == ["a", "b"]
+
+
+class TestRequestTracing:
+    def test_recommendation_stages_are_traced_under_request_id(self, ring_buffer):
+        mock_result = MagicMock()
+        mock_result.scalars.return_value.all.return_value = [
+            Restaurant(id=1, name="Jalsa", city="Bangalore", location="Banashankari", rating=4.1,
+                       cost_for_two=800, price_category="$$", has_online_delivery=True,
+                       cuisines="North Indian", raw_data=None),
+        ]
+        mock_session = MagicMock()
+        mock_session.execute.return_value = mock_result
+
+        def _override():
+            yield mock_session
+
+        llm_response = {"recommendations": [{"rank": 1, "name": "Jalsa", "location": "Banashankari",
+                                             "rating": 4.1, "cost_for_two": 800, "online_order": True,
+                                             "reason": "Good."}]}
+        app.dependency_overrides[get_db] = _override
+        with patch("backend.routers.recommendations.rank_restaurants_async", new=AsyncMock(return_value=llm_response)):
+            try:
+                response = client.post(
+                    "/recommendations",
+                    json={"city": "Bangalore", "price_category": "$$", "limit": 3},
+                    headers={"X-Request-ID": "req-123"},
+                )
+            finally:
+                app.dependency_overrides.clear()
+
+        assert response.status_code == 200
+        assert response.headers["x-request-id"] == "req-123"
+        spans = client.get("/debug/traces", params={"trace_id": "req-123"}).json()
+        names = [s["name"] for s in spans]
+        assert names == ["db.precomputed_lookup", "db.query_candidates", "llm.rank", "http.request"]
+        assert spans[-1]["attributes"]["route"] == "/recommendations"
+
+    def test_log_records_carry_request_id(self):
+        record = logging.getLogger("test").makeRecord("test", logging.INFO, __file__, 1, "msg", (), None)
+        assert record.request_id == "-"
+        assert "[-] test: msg" in logging.Formatter(LOG_FORMAT).format(record)
+
+    def test_debug_traces_off_by_default(self):
+        with patch.dict("os.environ", {"TRACE_EXPORTERS": ""}, clear=False):
+            set_exporters(_exporters_from_env())
+        assert client.get("/debug/traces").status_code == 404
@@ -0,0 +1,136 @@
+"""
+Unit tests for LLM token usage and latency accounting.
+"""
+
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from backend.llm.usage import LLM_TOKENS, flush_usage_log, parse_usage, read_usage_log, record_usage, summarize
+
+GEMINI_OK = {
+    "candidates": [{"content": {"parts": [{"text": '{"recommendations": []}'}]}}],
+    "usageMetadata": {"promptTokenCount": 120, "candidatesTokenCount": 30, "totalTokenCount": 150},
+}
+
+
+@pytest.fixture
+def grok_reply(grok_ok):
+    """Grok completion that reports token usage."""
+    return {**grok_ok, "usage": {"prompt_tokens": 200, "completion_tokens": 40, "total_tokens": 240}}
+
+
+class TestParseUsage:
+    def test_gemini_and_openai_shapes(self, grok_reply):
+        assert parse_usage(GEMINI_OK) == (120, 30)
+        assert parse_usage(grok_reply) == (200, 40)
+
+    def test_missing_usage(self):
+        assert parse_usage({"choices": []}) == (None, None)
+        assert parse_usage(None) == (None, None)
+
+
+class TestUsageLog:
+    def test_log_written_only_when_configured(self, tmp_path):
+        path = tmp_path / "usage.jsonl"
+        record_usage("grok", "m", "ok", 0.5, 0.1, 10, 5)
+        assert not path.exists()
+        with patch.dict("os.environ", {"LLM_USAGE_LOG": str(path)}, clear=False):
+            record_usage("grok", "m", "ok", 0.5, 0.1, 10, 5)
+            record_usage("grok", "m", "error", 1.0)
+        flush_usage_log()
+        records = list(read_usage_log(path))
+        assert [r["outcome"] for r in records] == ["ok", "error"]
+        assert records[0]["prompt_tokens"] == 10 and records[0]["ttfb"] == 0.1
+
+    def test_written_off_the_calling_thread(self, tmp_path):
+        path = tmp_path / "usage.jsonl"
+        writers = []
+        real_open = open
+
+        def recording_open(*args, **kwargs):
+            writers.append(threading.current_thread().name)
+            return real_open(*args, **kwargs)
+
+        with patch.dict("os.environ", {"LLM_USAGE_LOG": str(path)}, clear=False), \
+                patch("backend.linelog.open", side_effect=recording_open, create=True):
+            record_usage("grok", "m", "ok", 0.5)
+            flush_usage_log()
+        assert writers == ["llm-usage-log"]
+        assert len(list(read_usage_log(path))) == 1
+
+    def test_read_skips_bad_lines_and_filters_by_time(self, tmp_path):
+        path = tmp_path / "usage.jsonl"
+        path.write_text(
+            json.dumps({"ts": 100, "provider": "grok"}) + "\nnot json\n" + json.dumps({"ts": 200, "provider": "grok"}) + "\n"
+        )
+        assert [r["ts"] for r in read_usage_log(path)] == [100, 200]
+        assert [r["ts"] for r in read_usage_log(path, since=150)] == [200]
+
+    def test_summarize(self):
+        records = [
+            {"provider": "grok", "model": "m", "outcome": "ok", "seconds": s, "ttfb": s / 2,
+             "prompt_tokens": 100, "completion_tokens": 20}
+            for s in (1.0, 2.0, 3.0)
+        ] + [{"provider": "grok", "model": "m", "outcome": "error", "seconds": 9.0}]
+        (row,) = summarize(records)
+        assert row["calls"] == 4 and row["errors"] == 1
+        assert row["prompt_tokens"] == 300 and row["avg_completion_tokens"] == 20
+        assert row["p50_seconds"] == 2.0 and row["p95_seconds"] == 3.0
+        assert row["p50_ttfb"] == 1.0
+
+
+class TestProviderCallsRecordUsage:
+    env = {"GROK_API_KEY": "k", "GEMINI_API_KEY": "k", "LLM_BREAKER": "false"}
+
+    def test_sync_call_counts_tokens_and_logs(self, tmp_path, grok_reply):
+        from backend.llm.client import _call_grok, _get_grok_config
+
+        path = tmp_path / "usage.jsonl"
+        pooled = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, json=grok_reply)))
+        with patch.dict("os.environ", {**self.env, "LLM_USAGE_LOG": str(path)}, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled):
+            model = _get_grok_config()[1]
+            before = LLM_TOKENS.value(provider="grok", model=model, kind="prompt")
+            _call_grok("s", "u")
+        flush_usage_log()
+        (record,) = read_usage_log(path)
+        assert record["provider"] == "grok" and record["outcome"] == "ok"
+        assert record["prompt_tokens"] == 200 and record["completion_tokens"] == 40
+        assert record["ttfb"] is not None and record["ttfb"] <= record["seconds"]
+        assert LLM_TOKENS.value(provider="grok", model=model, kind="prompt") - before == 200
+
+    def test_async_call_logs_gemini_usage(self, tmp_path):
+        from backend.llm.client import _call_gemini_async
+
+        path = tmp_path / "usage.jsonl"
+
+        async def run():
+            transport = httpx.MockTransport(lambda request: httpx.Response(200, json=GEMINI_OK))
+            async with httpx.AsyncClient(transport=transport) as pooled:
+                with patch("backend.llm.client.get_async_client", return_value=pooled):
+                    return await _call_gemini_async("s", "u")
+
+        with patch.dict("os.environ", {**self.env, "LLM_USAGE_LOG": str(path)}, clear=False):
+            result = asyncio.run(run())
+        assert "error" not in result
+        flush_usage_log()
+        (record,) = read_usage_log(path)
+        assert record["provider"] == "gemini"
+        assert (record["prompt_tokens"], record["completion_tokens"]) == (120, 30)
+
+    def test_failed_call_logged_as_error(self, tmp_path):
+        from backend.llm.client import _call_grok
+
+        path = tmp_path / "usage.jsonl"
+        pooled = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(400, text="bad")))
+        with patch.dict("os.environ", {**self.env, "LLM_USAGE_LOG": str(path)}, clear=False), \
+                patch("backend.llm.client.get_client", return_value=pooled):
+            assert "error" in _call_grok("s", "u")
+        flush_usage_log()
+        (record,) = read_usage_log(path)
+        assert record["outcome"] == "error" and record["prompt_tokens"] is None
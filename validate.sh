@@ -35,7 +35,7 @@ echo "[3/4] Checking GROK_API_KEY..."
 if grep -q "GROK_API_KEY=.\+" .env 2>/dev/null && ! grep -q "GROK_API_KEY=dummy-key-replace-me" .env 2>/dev/null; then
   echo "  -> GROK_API_KEY is set (not dummy)"
 else
-  echo "  -> WARNING: GROK_API_KEY is empty or still dummy (POST /recommendations will return 503)"
+  echo "  -> WARNING: GROK_API_KEY is empty or still dummy (POST /recommendations will serve the local ranking)"
 fi
 echo ""
 
@@ -45,7 +45,8 @@ if ! command -v uvicorn &>/dev/null; then
   echo "  -> Skipped (uvicorn not found)"
 else
   echo "  Starting server..."
-  uvicorn backend.main:app --host 127.0.0.1 --port 8000 2>/dev/null &
+  # No local fallback here, so a missing or dummy key shows up as a 503 below
+  RECOMMENDATIONS_DEGRADE=false uvicorn backend.main:app --host 127.0.0.1 --port 8000 2>/dev/null &
   SERVER_PID=$!
   sleep 3
   trap "kill $SERVER_PID 2>/dev/null" EXIT